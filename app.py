@@ -1,10 +1,39 @@
 import streamlit as st
 import json
 import os
-from groq import Groq
 from datetime import datetime
 import streamlit.components.v1 as components
-import base64
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from html import escape
+from knowledge_base import DATA_PATH, file_fingerprint, load_index
+from assistant import AdviceStream, complete
+from response_cache import DEFAULT_TTL, ResponseCache, cache_key, context_hash, profile_bucket
+from semantic_cache import SemanticCache
+from retrieval import DEFAULT_CONTEXT_BUDGET, Retriever, format_chunks
+from prompt_builder import DEFAULT_INPUT_BUDGET, HIGH, LOW, REQUIRED, PromptBuilder, log_usage
+from groq_pool import CircuitOpenError, PooledGroq
+from offline_answers import FAST_PATH_CONFIDENCE, OfflineAnswerEngine
+from single_flight import SingleFlight
+from geo_index import PLACES_PATH, format_distance, load_geo_index
+from map_clusters import CLUSTER_MAX_ZOOM, CLUSTER_MIN_ZOOM, load_cluster_tiles
+from map_server import start_map_server
+from tile_cache import CDN_BASE, TileCache, assets_vendored
+from session_store import PERSISTED_KEYS, decode_state, encode_state, make_session_store, new_session_token
+from sos_events import Dispatcher, EventLog, make_sink, new_incident_id
+from responders import load_responder_index
+from price_parser import LOCAL_CURRENCY, SERVICE_LABELS, format_amount
+from fare_model import SPEED_KMH, TYPICAL_TRIP_KM, build_fare_model, local_period
+from price_check import ITEM_LABELS, PER_NIGHT, PriceIndex
+from price_observations import Observation, ObservationStore
+from static_assets import BUILD_DIR, build_assets, publish
+from phrases import CATEGORY_LABELS, PHRASES_PATH, load_phrase_index
+from phrase_audio import PhraseAudio, spoken_text
+from photo_ocr import MAX_UPLOAD_BYTES, PhotoReader, price_lines, related_chunks
+from render_timing import RerunTimer, TimingStats
 
 # Page config
 st.set_page_config(
@@ -14,479 +43,78 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Load logo as base64
-def get_logo_base64():
-    try:
-        if os.path.exists("logo.png"):
-            with open("logo.png", "rb") as f:
-                return base64.b64encode(f.read()).decode()
-    except:
-        pass
-    return None
+# Log AI token usage and timings (SAFEWANDER_LOG_LEVEL=WARNING to silence)
+logging.basicConfig(level=os.getenv("SAFEWANDER_LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(message)s")
 
-LOGO_BASE64 = get_logo_base64()
+# Server-side session store - profile and SOS state survive reconnects and work across replicas.
+# The browser keeps only a random token, in the ?sid= URL parameter.
+SESSION_PARAM = "sid"
 
-# Custom CSS - Redesigned with Font Awesome, smaller fonts, better UX
-st.markdown("""
-<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.9.4/leaflet.css">
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;600;700&display=swap');
-    
-    * { 
-        font-family: 'Poppins', sans-serif;
-        margin: 0;
-        padding: 0;
-    }
-    
-    .main { padding: 0 !important; }
-    
-    /* Navigation Bar */
-    .navbar {
-        background: white;
-        padding: 0.8rem 1.5rem;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-        box-shadow: 0 2px 10px rgba(0,0,0,0.08);
-        position: sticky;
-        top: 0;
-        z-index: 1000;
-        border-radius: 0 0 15px 15px;
-        margin-bottom: 1rem;
-    }
-    
-    .nav-brand {
-        display: flex;
-        align-items: center;
-        gap: 0.8rem;
-    }
-    
-    .nav-logo {
-        height: 40px;
-        width: auto;
-    }
-    
-    .nav-title {
-        font-size: 1.3rem;
-        font-weight: 700;
-        color: #667eea;
-    }
-    
-    .nav-home {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        border-radius: 10px;
-        padding: 0.6rem 1rem;
-        cursor: pointer;
-        font-size: 0.9rem;
-        font-weight: 600;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-        transition: all 0.2s ease;
-    }
-    
-    .nav-home:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
-    }
-    
-    /* Hero Section - Smaller */
-    .hero-section {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 1.5rem 1.5rem;
-        text-align: center;
-        border-radius: 15px;
-        margin: 0 1rem 1.5rem 1rem;
-        box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-    }
-    
-    .hero-logo {
-        height: 50px;
-        margin-bottom: 0.5rem;
-    }
-    
-    .hero-title {
-        font-size: 1.8rem;
-        font-weight: 700;
-        margin-bottom: 0.3rem;
-    }
-    
-    .hero-subtitle {
-        font-size: 0.95rem;
-        opacity: 0.9;
-        font-weight: 400;
-    }
-    
-    /* Profile Section */
-    .quick-profile {
-        background: white;
-        border-radius: 15px;
-        padding: 1.5rem;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-        margin: 1rem;
-        max-width: 700px;
-        margin-left: auto;
-        margin-right: auto;
-    }
-    
-    .profile-title {
-        font-size: 1.3rem;
-        font-weight: 700;
-        color: #667eea;
-        margin-bottom: 1rem;
-        text-align: center;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        gap: 0.5rem;
-    }
-    
-    /* Feature Cards */
-    .dashboard-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-        gap: 1rem;
-        margin: 1rem;
-    }
-    
-    .feature-card {
-        background: white;
-        border-radius: 12px;
-        padding: 1.2rem;
-        box-shadow: 0 3px 12px rgba(0,0,0,0.08);
-        transition: all 0.2s ease;
-        cursor: pointer;
-        border-left: 4px solid #667eea;
-        text-align: center;
-    }
-    
-    .feature-card:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.25);
-    }
-    
-    .card-icon {
-        font-size: 1.8rem;
-        color: #667eea;
-        margin-bottom: 0.8rem;
-    }
-    
-    .card-title {
-        font-size: 1rem;
-        font-weight: 600;
-        color: #1e293b;
-        margin-bottom: 0.3rem;
-    }
-    
-    .card-desc {
-        color: #64748b;
-        font-size: 0.8rem;
-        line-height: 1.4;
-    }
-    
-    /* SOS Button */
-    .sos-button {
-        position: fixed;
-        bottom: 20px;
-        right: 20px;
-        z-index: 9999;
-        animation: pulse 2s infinite;
-    }
-    
-    @keyframes pulse {
-        0%, 100% { transform: scale(1); box-shadow: 0 0 0 0 rgba(239, 68, 68, 0.7); }
-        50% { transform: scale(1.05); box-shadow: 0 0 0 15px rgba(239, 68, 68, 0); }
-    }
-    
-    .sos-btn {
-        background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%);
-        color: white;
-        border: none;
-        border-radius: 50%;
-        width: 65px;
-        height: 65px;
-        font-size: 1.2rem;
-        font-weight: 700;
-        cursor: pointer;
-        box-shadow: 0 6px 20px rgba(239, 68, 68, 0.5);
-        transition: all 0.2s;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-    }
-    
-    .sos-btn:hover {
-        transform: scale(1.1);
-    }
-    
-    /* Map Container */
-    .map-container {
-        background: white;
-        border-radius: 15px;
-        padding: 1rem;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        margin: 1rem;
-    }
-    
-    .section-header {
-        font-size: 1.1rem;
-        font-weight: 600;
-        color: #667eea;
-        margin-bottom: 1rem;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-    
-    #map {
-        height: 400px;
-        border-radius: 12px;
-        border: 2px solid #667eea;
-    }
-    
-    /* Emergency Modal */
-    .emergency-modal {
-        background: white;
-        border-radius: 15px;
-        padding: 1.5rem;
-        box-shadow: 0 15px 40px rgba(0,0,0,0.2);
-        max-width: 500px;
-        margin: 1rem auto;
-    }
-    
-    .emergency-title {
-        font-size: 1.4rem;
-        font-weight: 700;
-        color: #ef4444;
-        text-align: center;
-        margin-bottom: 1rem;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        gap: 0.5rem;
-    }
-    
-    /* Phrase Cards */
-    .phrase-card {
-        background: linear-gradient(135deg, #ede9fe 0%, #ddd6fe 100%);
-        border-radius: 12px;
-        padding: 1rem;
-        margin: 0.8rem 0;
-        border-left: 4px solid #7c3aed;
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-    }
-    
-    .phrase-local {
-        font-size: 1.1rem;
-        font-weight: 700;
-        color: #5b21b6;
-    }
-    
-    .phrase-meaning {
-        font-size: 0.85rem;
-        color: #6d28d9;
-    }
-    
-    .phrase-audio {
-        background: #7c3aed;
-        color: white;
-        border: none;
-        border-radius: 50%;
-        width: 40px;
-        height: 40px;
-        cursor: pointer;
-        font-size: 1rem;
-        transition: all 0.2s;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-    }
-    
-    .phrase-audio:hover {
-        background: #5b21b6;
-        transform: scale(1.1);
-    }
-    
-    .phrase-audio:active {
-        transform: scale(0.95);
-    }
-    
-    /* Scam Checker */
-    .scam-checker {
-        background: linear-gradient(135deg, #fef3c7 0%, #fde68a 100%);
-        border-radius: 15px;
-        padding: 1.5rem;
-        border-left: 4px solid #f59e0b;
-        margin: 1rem;
-    }
-    
-    .scam-title {
-        font-size: 1.1rem;
-        font-weight: 600;
-        color: #92400e;
-        margin-bottom: 0.8rem;
-        display: flex;
-        align-items: center;
-        gap: 0.5rem;
-    }
-    
-    .price-check {
-        background: white;
-        border-radius: 12px;
-        padding: 1rem;
-        margin-top: 1rem;
-    }
-    
-    /* Alerts */
-    .alert-danger {
-        background: linear-gradient(135deg, #fee2e2 0%, #fecaca 100%);
-        border-left: 4px solid #ef4444;
-        padding: 1rem;
-        border-radius: 12px;
-        color: #991b1b;
-        font-size: 0.9rem;
-        margin: 0.8rem 0;
-    }
-    
-    .alert-success {
-        background: linear-gradient(135deg, #d1fae5 0%, #a7f3d0 100%);
-        border-left: 4px solid #10b981;
-        padding: 1rem;
-        border-radius: 12px;
-        color: #065f46;
-        font-size: 0.9rem;
-        margin: 0.8rem 0;
-    }
-    
-    /* Officer Card */
-    .officer-card {
-        background: white;
-        border-radius: 12px;
-        padding: 1rem;
-        margin: 0.8rem 0;
-        box-shadow: 0 3px 12px rgba(0,0,0,0.08);
-        display: flex;
-        gap: 1rem;
-        align-items: center;
-    }
-    
-    .officer-photo {
-        width: 60px;
-        height: 60px;
-        border-radius: 50%;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-size: 1.5rem;
-        color: white;
-    }
-    
-    .officer-name {
-        font-size: 1rem;
-        font-weight: 600;
-        color: #1e293b;
-    }
-    
-    .officer-badge {
-        color: #64748b;
-        font-size: 0.8rem;
-    }
-    
-    .eta-badge {
-        background: #10b981;
-        color: white;
-        padding: 0.4rem 0.8rem;
-        border-radius: 15px;
-        font-weight: 600;
-        font-size: 0.85rem;
-    }
-    
-    /* Cultural Grid */
-    .cultural-grid {
-        display: grid;
-        grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-        gap: 1rem;
-        margin: 1rem 0;
-    }
-    
-    .culture-card {
-        background: white;
-        border-radius: 12px;
-        padding: 1rem;
-        box-shadow: 0 3px 12px rgba(0,0,0,0.06);
-        border-top: 3px solid #667eea;
-    }
-    
-    .culture-icon {
-        font-size: 1.5rem;
-        color: #667eea;
-        margin-bottom: 0.5rem;
-    }
-    
-    .culture-title {
-        font-size: 0.95rem;
-        font-weight: 600;
-        color: #1e293b;
-        margin-bottom: 0.3rem;
-    }
-    
-    .culture-text {
-        color: #64748b;
-        font-size: 0.8rem;
-        line-height: 1.5;
-    }
-    
-    /* Buttons */
-    .stButton>button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        padding: 0.6rem 1.5rem;
-        border-radius: 25px;
-        font-weight: 600;
-        font-size: 0.9rem;
-        transition: all 0.2s ease;
-    }
-    
-    .stButton>button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.4);
-    }
-    
-    .stButton>button:active {
-        transform: translateY(0);
-    }
-    
-    /* Hide Streamlit elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    .stDeployButton {display: none;}
-    
-    /* Input styling */
-    .stTextInput>div>div>input {
-        border-radius: 10px;
-        border: 2px solid #e2e8f0;
-        font-size: 0.9rem;
-    }
-    
-    .stTextInput>div>div>input:focus {
-        border-color: #667eea;
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-    }
-    
-    .stSelectbox>div>div {
-        border-radius: 10px;
-    }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource
+def get_session_store():
+    return make_session_store()
+
+def restore_session():
+    if 'session_token' in st.session_state:
+        return
+    token = st.query_params.get(SESSION_PARAM)
+    blob = get_session_store().get(token) if token else None
+    if blob is None:
+        token = new_session_token()
+        st.query_params[SESSION_PARAM] = token
+    else:
+        for key, value in decode_state(blob).items():
+            st.session_state[key] = value
+    st.session_state.session_token = token
+    st.session_state.session_saved = blob
 
+def save_session():
+    """Write the persisted keys back to the store, only when they changed this run."""
+    if 'session_token' not in st.session_state:
+        return
+    blob = encode_state({key: st.session_state.get(key) for key in PERSISTED_KEYS})
+    if blob != st.session_state.session_saved:
+        get_session_store().put(st.session_state.session_token, blob)
+        st.session_state.session_saved = blob
+
+# Per-rerun section timings are logged; SAFEWANDER_TIMINGS=1 also shows them under the page
+SHOW_TIMINGS = os.getenv("SAFEWANDER_TIMINGS", "0") == "1"
+
+@st.cache_resource
+def get_timing_stats():
+    return TimingStats()
+
+def finish_timer(timer):
+    stats = get_timing_stats()
+    stats.record(timer)
+    if SHOW_TIMINGS:
+        st.caption(f"{timer.describe()} · {stats.describe()}")
+
+def timed_fragment(name):
+    """Run the function as an st.fragment, timed as a section of the current run.
+
+    When the fragment reruns on its own, main() is skipped, so it times
+    the rerun and saves the session itself.
+    """
+    def decorate(func):
+        @st.fragment
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            timer = st.session_state.get('rerun_timer')
+            alone = timer is None or timer.finished
+            if alone:
+                timer = RerunTimer("fragment")
+            try:
+                with timer.section(name):
+                    return func(*args, **kwargs)
+            finally:
+                if alone:
+                    save_session()
+                    finish_timer(timer)
+        return run
+    return decorate
+
+restore_session()
 
 # Initialize session state
 if 'profile_complete' not in st.session_state:
@@ -499,37 +127,53 @@ if 'sos_reason' not in st.session_state:
     st.session_state.sos_reason = None
 if 'active_feature' not in st.session_state:
     st.session_state.active_feature = None
+if 'advice_stream' not in st.session_state:
+    st.session_state.advice_stream = None
+if 'sos_incident' not in st.session_state:
+    st.session_state.sos_incident = None
+if 'sos_assignment' not in st.session_state:
+    st.session_state.sos_assignment = None
+
+# Load safety data - indexed once per database.json version, shared across sessions
+@st.cache_resource
+def _load_safety_index(fingerprint):
+    return load_index(DATA_PATH)
 
-# Load safety data
-@st.cache_data
 def load_safety_data():
-    if os.path.exists("dataset.json"):
-        with open("dataset.json", "r") as f:
-            return json.load(f)
-    return {
-        "countries": ["India", "Thailand", "Mexico", "USA", "Brazil"],
-        "transport_scams": [],
-        "emergency_numbers": {}
-    }
+    return _load_safety_index(file_fingerprint(DATA_PATH))
+
+# Police, hospital and embassy k-d trees - rebuilt only when places.csv changes
+@st.cache_resource
+def _geo_index(fingerprint):
+    return load_geo_index(PLACES_PATH)
+
+def get_geo_index():
+    return _geo_index(file_fingerprint(PLACES_PATH))
+
+# Initialize Groq - one pooled client per API key, shared by every session
+@st.cache_resource
+def _pooled_groq(api_key):
+    return PooledGroq(api_key=api_key, base_url=os.getenv("GROQ_BASE_URL"))
 
-# Initialize Groq
 def init_groq():
+    api_key = None
     try:
-        api_key = st.secrets.get("GROQ_API_KEY", os.getenv("GROQ_API_KEY"))
-        if api_key:
-            return Groq(api_key=api_key)
-    except:
+        api_key = st.secrets.get("GROQ_API_KEY")
+    except Exception:
         pass
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    if api_key:
+        return _pooled_groq(api_key)
     return None
 
-# Language codes for TTS
-LANGUAGE_CODES = {
-    'India': 'hi-IN',
-    'Thailand': 'th-TH',
-    'Mexico': 'es-MX',
-    'USA': 'en-US',
-    'Brazil': 'pt-BR'
-}
+# Stream AI answers token-by-token (set SAFEWANDER_STREAM=0 to wait for the full answer)
+STREAM_ADVICE = os.getenv("SAFEWANDER_STREAM", "1") != "0"
+
+# Token budget for retrieved local knowledge in the AI prompt
+RAG_CONTEXT_BUDGET = int(os.getenv("SAFEWANDER_RAG_BUDGET", DEFAULT_CONTEXT_BUDGET))
+
+# Total input token budget (system prompt + question) for each AI request
+PROMPT_BUDGET = int(os.getenv("SAFEWANDER_PROMPT_BUDGET", DEFAULT_INPUT_BUDGET))
 
 # Destinations
 DESTINATIONS = {
@@ -556,142 +200,11 @@ DESTINATIONS = {
     }
 }
 
-# Essential phrases by country
-ESSENTIAL_PHRASES = {
-    "India": [
-        ("Namaste", "नमस्ते", "Hello/Greetings"),
-        ("Dhanyavaad", "धन्यवाद", "Thank you"),
-        ("Madad karo", "मदद करो", "Help me"),
-        ("Police bulao", "पुलिस बुलाओ", "Call police"),
-        ("Kitna hai", "कितना है", "How much?"),
-        ("Bahut mehenga", "बहुत महंगा", "Too expensive"),
-        ("Ruko", "रुको", "Stop"),
-        ("Maaf karna", "माफ़ करना", "Sorry/Excuse me"),
-        ("Kaha hai", "कहाँ है", "Where is?"),
-        ("Hospital kaha hai", "अस्पताल कहाँ है", "Where is hospital?"),
-        ("Nahi chahiye", "नहीं चाहिए", "Don't want"),
-        ("Mujhe samajh nahi aaya", "मुझे समझ नहीं आया", "I don't understand"),
-        ("Theek hai", "ठीक है", "It's okay/Alright"),
-        ("Paani", "पानी", "Water"),
-        ("Bhuk lagi hai", "भूख लगी है", "I'm hungry")
-    ],
-    "Thailand": [
-        ("Sawasdee", "สวัสดี", "Hello"),
-        ("Khob khun", "ขอบคุณ", "Thank you"),
-        ("Chuay duay", "ช่วยด้วย", "Help!"),
-        ("Tao rai", "เท่าไหร่", "How much?"),
-        ("Paeng maak", "แพงมาก", "Too expensive"),
-        ("Mai ao", "ไม่เอา", "Don't want"),
-        ("Yut", "หยุด", "Stop"),
-        ("Khor thot", "ขอโทษ", "Sorry"),
-        ("Yuu tii nai", "อยู่ที่ไหน", "Where is?"),
-        ("Tamruat", "ตำรวจ", "Police"),
-        ("Rong phayaban", "โรงพยาบาล", "Hospital"),
-        ("Mai khao jai", "ไม่เข้าใจ", "Don't understand"),
-        ("Naam", "น้ำ", "Water"),
-        ("Hiu khao", "หิวข้าว", "Hungry"),
-        ("Kin aahan", "กินอาหาร", "Eat food")
-    ],
-    "Mexico": [
-        ("Hola", "Hola", "Hello"),
-        ("Gracias", "Gracias", "Thank you"),
-        ("Ayuda", "¡Ayuda!", "Help!"),
-        ("Cuanto cuesta", "¿Cuánto cuesta?", "How much?"),
-        ("Muy caro", "Muy caro", "Too expensive"),
-        ("No quiero", "No quiero", "Don't want"),
-        ("Alto", "¡Alto!", "Stop!"),
-        ("Lo siento", "Lo siento", "Sorry"),
-        ("Donde esta", "¿Dónde está?", "Where is?"),
-        ("Policia", "Policía", "Police"),
-        ("Hospital", "Hospital", "Hospital"),
-        ("No entiendo", "No entiendo", "Don't understand"),
-        ("Agua", "Agua", "Water"),
-        ("Tengo hambre", "Tengo hambre", "I'm hungry"),
-        ("Bano", "Baño", "Bathroom")
-    ],
-    "USA": [
-        ("Hello", "Hello", "Greeting"),
-        ("Thank you", "Thank you", "Thanks"),
-        ("Help", "Help!", "Emergency"),
-        ("How much", "How much?", "Price"),
-        ("Too expensive", "Too expensive", "Costly"),
-        ("No thanks", "No thanks", "Decline"),
-        ("Stop", "Stop", "Halt"),
-        ("Excuse me", "Excuse me", "Attention"),
-        ("Where is", "Where is?", "Location"),
-        ("Call police", "Call police", "Emergency"),
-        ("Hospital", "Hospital", "Medical"),
-        ("I dont understand", "I don't understand", "Confusion"),
-        ("Water", "Water", "Drink"),
-        ("Restroom", "Restroom", "Bathroom"),
-        ("Emergency", "Emergency", "Urgent help")
-    ],
-    "Brazil": [
-        ("Ola", "Olá", "Hello"),
-        ("Obrigado", "Obrigado/a", "Thank you"),
-        ("Socorro", "Socorro!", "Help!"),
-        ("Quanto custa", "Quanto custa?", "How much?"),
-        ("Muito caro", "Muito caro", "Too expensive"),
-        ("Nao quero", "Não quero", "Don't want"),
-        ("Pare", "Pare!", "Stop!"),
-        ("Desculpe", "Desculpe", "Sorry"),
-        ("Onde fica", "Onde fica?", "Where is?"),
-        ("Policia", "Polícia", "Police"),
-        ("Hospital", "Hospital", "Hospital"),
-        ("Nao entendo", "Não entendo", "Don't understand"),
-        ("Agua", "Água", "Water"),
-        ("Estou com fome", "Estou com fome", "I'm hungry"),
-        ("Banheiro", "Banheiro", "Bathroom")
-    ]
-}
-
-# Mock police data
-POLICE_STATIONS = {
-    "Delhi": [
-        {"name": "Connaught Place Police Station", "lat": 28.6315, "lng": 77.2167, "distance": "1.2 km"},
-        {"name": "India Gate Police Post", "lat": 28.6129, "lng": 77.2295, "distance": "2.5 km"},
-        {"name": "Chandni Chowk Police Station", "lat": 28.6506, "lng": 77.2303, "distance": "3.8 km"}
-    ],
-    "Mumbai": [
-        {"name": "Colaba Police Station", "lat": 18.9067, "lng": 72.8147, "distance": "1.5 km"},
-        {"name": "Marine Drive Police Station", "lat": 18.9432, "lng": 72.8236, "distance": "2.1 km"}
-    ],
-    "Bangkok": [
-        {"name": "Lumpini Police Station", "lat": 13.7308, "lng": 100.5418, "distance": "1.8 km"},
-        {"name": "Sukhumvit Police Station", "lat": 13.7367, "lng": 100.5609, "distance": "2.3 km"}
-    ]
-}
-
-# Country-specific mock officers
-MOCK_OFFICERS = {
-    "India": [
-        {"name": "Officer Priya Sharma", "badge": "DL-2847", "eta": "7 mins", "gender": "Female"},
-        {"name": "Officer Rajesh Kumar", "badge": "DL-3921", "eta": "5 mins", "gender": "Male"}
-    ],
-    "Thailand": [
-        {"name": "Officer Siriporn Chai", "badge": "BK-1124", "eta": "6 mins", "gender": "Female"},
-        {"name": "Officer Somchai Prasert", "badge": "BK-2231", "eta": "5 mins", "gender": "Male"}
-    ],
-    "Mexico": [
-        {"name": "Officer Maria Garcia", "badge": "MX-3345", "eta": "8 mins", "gender": "Female"},
-        {"name": "Officer Carlos Rodriguez", "badge": "MX-4421", "eta": "6 mins", "gender": "Male"}
-    ],
-    "USA": [
-        {"name": "Officer Sarah Johnson", "badge": "NY-5567", "eta": "5 mins", "gender": "Female"},
-        {"name": "Officer Michael Davis", "badge": "NY-6632", "eta": "4 mins", "gender": "Male"}
-    ],
-    "Brazil": [
-        {"name": "Officer Ana Silva", "badge": "RJ-7789", "eta": "7 mins", "gender": "Female"},
-        {"name": "Officer Pedro Santos", "badge": "RJ-8845", "eta": "6 mins", "gender": "Male"}
-    ]
-}
-
-
 # Navigation Bar Component
 def show_navbar():
-    logo_html = ""
-    if LOGO_BASE64:
-        logo_html = f'<img src="data:image/png;base64,{LOGO_BASE64}" class="nav-logo" alt="SafeWander">'
+    logo = logo_src()
+    if logo:
+        logo_html = f'<img src="{logo}" class="nav-logo" alt="SafeWander">'
     else:
         logo_html = '<i class="fa-solid fa-shield-halved" style="font-size:1.8rem;color:#667eea;"></i>'
     
@@ -706,6 +219,8 @@ def show_navbar():
 
 # Home button function
 def go_home():
+    if st.session_state.sos_active:
+        record_sos("cancelled")
     st.session_state.active_feature = None
     st.session_state.sos_active = False
     st.session_state.sos_reason = None
@@ -713,9 +228,9 @@ def go_home():
 # Quick Profile Form
 def show_quick_profile():
     # Hero with logo
-    logo_html = ""
-    if LOGO_BASE64:
-        logo_html = f'<img src="data:image/png;base64,{LOGO_BASE64}" class="hero-logo" alt="SafeWander">'
+    logo = logo_src()
+    if logo:
+        logo_html = f'<img src="{logo}" class="hero-logo" alt="SafeWander">'
     else:
         logo_html = '<i class="fa-solid fa-shield-halved" style="font-size:2.5rem;margin-bottom:0.5rem;"></i>'
     
@@ -761,94 +276,403 @@ def show_quick_profile():
         else:
             st.error("Please fill all required fields!")
 
-# Interactive Map Component
+# Interactive Map Component - static page, per-city data is injected as JSON
+POLICE_ICON_URL = "data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0IiBmaWxsPSIjMzY0OGY4Ij48cGF0aCBkPSJNMTIgMkM4LjEzIDIgNSA1LjEzIDUgOWMwIDUuMjUgNyAxMyA3IDEzczctNy43NSA3LTEzYzAtMy44Ny0zLjEzLTctNy03em0wIDkuNWMtMS4zOCAwLTIuNS0xLjEyLTIuNS0yLjVzMS4xMi0yLjUgMi41LTIuNSAyLjUgMS4xMiAyLjUgMi41LTEuMTIgMi41LTIuNSAyLjV6Ii8+PC9zdmc+"
+USER_ICON_URL = "data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0IiBmaWxsPSIjZWY0NDQ0Ij48cGF0aCBkPSJNMTIgMkM4LjEzIDIgNSA1LjEzIDUgOWMwIDUuMjUgNyAxMyA3IDEzczctNy43NSA3LTEzYzAtMy44Ny0zLjEzLTctNy03em0wIDkuNWMtMS4zOCAwLTIuNS0xLjEyLTIuNS0yLjVzMS4xMi0yLjUgMi41LTIuNSAyLjUgMS4xMiAyLjUgMi41LTEuMTIgMi41LTIuNSAyLjV6Ii8+PC9zdmc+"
+
+MAP_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <link rel="stylesheet" href="__ASSET_BASE__/leaflet/1.9.4/leaflet.css"/>
+    <link rel="stylesheet" href="__ASSET_BASE__/font-awesome/6.4.0/css/all.min.css">
+    <script src="__ASSET_BASE__/leaflet/1.9.4/leaflet.js"></script>
+    <style>
+        body { margin: 0; padding: 0; font-family: 'Poppins', sans-serif; }
+        #map { width: 100%; height: 400px; border-radius: 12px; }
+        .location-btn {
+            position: absolute;
+            top: 10px;
+            right: 10px;
+            z-index: 1000;
+            background: white;
+            border: 2px solid #667eea;
+            border-radius: 8px;
+            padding: 8px 12px;
+            cursor: pointer;
+            font-weight: 600;
+            color: #667eea;
+            font-size: 0.85rem;
+            display: flex;
+            align-items: center;
+            gap: 5px;
+        }
+        .location-btn:hover { background: #667eea; color: white; }
+        .cluster-count { background: transparent; border: none; box-shadow: none; font-weight: 700; color: #1e293b; }
+    </style>
+</head>
+<body>
+    <button class="location-btn" onclick="getLocation()"><i class="fa-solid fa-location-crosshairs"></i> My Location</button>
+    <div id="map"></div>
+    <script>
+        var DATA = __MAP_DATA__;
+        
+        function popup(title, detail) {
+            var el = document.createElement('div');
+            var b = document.createElement('b');
+            b.textContent = title;
+            el.appendChild(b);
+            el.appendChild(document.createElement('br'));
+            el.appendChild(document.createTextNode(detail));
+            return el;
+        }
+        
+        var map = L.map('map').setView(DATA.center, DATA.zoom);
+        
+        var baseLayer = L.tileLayer(DATA.tileLayer, {
+            attribution: '© OpenStreetMap',
+            maxZoom: 19
+        }).addTo(map);
+        
+        // The local server only has seeded tiles; the rest load from OpenStreetMap directly
+        if (DATA.tileFallback) {
+            baseLayer.on('tileerror', function(e) {
+                if (e.tile.dataset.fallback) return;
+                e.tile.dataset.fallback = '1';
+                e.tile.src = L.Util.template(DATA.tileFallback, {s: 'a', z: e.coords.z, x: e.coords.x, y: e.coords.y});
+            });
+        }
+        
+        // Only a known city centre gets the destination marker; otherwise the map shows the whole country
+        if (DATA.located) {
+            L.marker(DATA.center).addTo(map)
+                .bindPopup(popup(DATA.label, 'Your destination')).openPopup();
+        }
+        
+        var policeIcon = L.icon({
+            iconUrl: '__POLICE_ICON__',
+            iconSize: [30, 30], iconAnchor: [15, 30], popupAnchor: [0, -30]
+        });
+        var COLORS = {hospital: '#ef4444', embassy: '#667eea', cluster: '#f59e0b'};
+        
+        function placeMarker(lat, lng, kind) {
+            return kind === 'police'
+                ? L.marker([lat, lng], {icon: policeIcon})
+                : L.circleMarker([lat, lng], {radius: 8, color: COLORS[kind], fillColor: COLORS[kind], fillOpacity: 0.8});
+        }
+        
+        // p = [lat, lng, kind, name, distance from city centre]
+        var nearest = {};
+        var placeMarkers = DATA.places.map(function(p) {
+            nearest[p[0] + ',' + p[1]] = true;
+            return placeMarker(p[0], p[1], p[2]).addTo(map).bindPopup(popup(p[3], p[4] + ' from city centre'));
+        });
+        
+        // Everything else comes as zoom-level cluster tiles: f = [lat, lng, count, kind, label]
+        var tiles = DATA.tiles;
+        var clusterLayer = L.layerGroup().addTo(map);
+        
+        function clusterMarker(f) {
+            if (f[3] !== 'cluster') {
+                return placeMarker(f[0], f[1], f[3]).bindPopup(popup(f[4], f[3]));
+            }
+            var marker = L.circleMarker([f[0], f[1]], {
+                radius: Math.min(24, 8 + 3 * Math.log2(f[2])),
+                color: COLORS.cluster, fillColor: COLORS.cluster, fillOpacity: 0.6
+            }).bindTooltip(String(f[2]), {permanent: true, direction: 'center', className: 'cluster-count'});
+            marker.on('click', function() { map.setView([f[0], f[1]], Math.min(map.getZoom() + 2, DATA.maxZoom)); });
+            return marker;
+        }
+        
+        function visibleTiles() {
+            var z = Math.max(DATA.minZoom, Math.min(DATA.maxZoom, Math.round(map.getZoom())));
+            var b = map.getPixelBounds(), n = Math.pow(2, z), scale = map.getZoomScale(z, map.getZoom());
+            var keys = [];
+            for (var x = Math.floor(b.min.x * scale / 256); x <= Math.floor(b.max.x * scale / 256); x++) {
+                for (var y = Math.max(0, Math.floor(b.min.y * scale / 256)); y <= Math.min(n - 1, Math.floor(b.max.y * scale / 256)); y++) {
+                    keys.push(z + '/' + ((x % n) + n) % n + '/' + y);
+                }
+            }
+            return keys;
+        }
+        
+        function drawClusters() {
+            clusterLayer.clearLayers();
+            visibleTiles().forEach(function(key) {
+                (tiles[key] || []).forEach(function(f) {
+                    if (f[3] === 'cluster' || !nearest[f[0] + ',' + f[1]]) clusterLayer.addLayer(clusterMarker(f));
+                });
+            });
+        }
+        
+        function loadClusters() {
+            var missing = visibleTiles().filter(function(key) { return !(key in tiles); });
+            drawClusters();
+            if (!DATA.tileUrl) return;
+            missing.forEach(function(key) {
+                tiles[key] = [];
+                var zxy = key.split('/');
+                fetch(DATA.tileUrl.replace('{z}', zxy[0]).replace('{x}', zxy[1]).replace('{y}', zxy[2]))
+                    .then(function(r) { return r.ok ? r.json() : []; })
+                    .then(function(features) { tiles[key] = features; drawClusters(); })
+                    .catch(function() { delete tiles[key]; });
+            });
+        }
+        
+        map.on('moveend', loadClusters);
+        loadClusters();
+        
+        function distanceKm(lat1, lng1, lat2, lng2) {
+            var r = Math.PI / 180;
+            var a = Math.pow(Math.sin((lat2 - lat1) * r / 2), 2) +
+                Math.cos(lat1 * r) * Math.cos(lat2 * r) * Math.pow(Math.sin((lng2 - lng1) * r / 2), 2);
+            return 12742 * Math.asin(Math.min(1, Math.sqrt(a)));
+        }
+        
+        function formatDistance(km) {
+            return km < 1 ? Math.round(km * 1000) + ' m' : km.toFixed(1) + ' km';
+        }
+        
+        if (DATA.located) {
+            L.circle([DATA.center[0] + 0.01, DATA.center[1] + 0.01], {
+                color: '#10b981', fillColor: '#10b981', fillOpacity: 0.2, radius: 500
+            }).addTo(map).bindPopup(popup('Safe Zone', 'Tourist area'));
+        }
+        
+        var userMarker = null;
+        function getLocation() {
+            if (navigator.geolocation) {
+                navigator.geolocation.getCurrentPosition(function(pos) {
+                    if (userMarker) map.removeLayer(userMarker);
+                    var redIcon = L.icon({
+                        iconUrl: '__USER_ICON__',
+                        iconSize: [35, 35], iconAnchor: [17, 35]
+                    });
+                    userMarker = L.marker([pos.coords.latitude, pos.coords.longitude], {icon: redIcon}).addTo(map).bindPopup(popup('You are here!', '')).openPopup();
+                    map.setView([pos.coords.latitude, pos.coords.longitude], 15);
+                    DATA.places.forEach(function(p, i) {
+                        var km = distanceKm(pos.coords.latitude, pos.coords.longitude, p[0], p[1]);
+                        placeMarkers[i].setPopupContent(popup(p[3], formatDistance(km) + ' from you'));
+                    });
+                }, function(err) { alert("Location error: " + err.message); });
+            } else { alert("Geolocation not supported"); }
+        }
+    </script>
+</body>
+</html>
+""".replace("__POLICE_ICON__", POLICE_ICON_URL).replace("__USER_ICON__", USER_ICON_URL)
+
+# How many of each kind of place to show around the user, and how far to look
+NEARBY_PLACES = {"police": 5, "hospital": 3, "embassy": 2}
+NEARBY_RADIUS_KM = 50
+
+# Initial map zoom; cluster tiles around the destination at this zoom are embedded in the page
+MAP_ZOOM = 13
+# Cities without coordinates get a country-wide map instead
+COUNTRY_ZOOM = 5
+
+def city_coords(country, city):
+    """[lat, lng] of the city centre, or None for cities DESTINATIONS has no coordinates for."""
+    return DESTINATIONS.get(country, {}).get("coords", {}).get(city)
+
+def country_center(country):
+    coords = list(DESTINATIONS.get(country, {}).get("coords", {}).values())
+    if not coords:
+        return [20.0, 0.0]
+    return [sum(c[0] for c in coords) / len(coords), sum(c[1] for c in coords) / len(coords)]
+
+def nearby_places(lat, lng, kind, k, country):
+    """[(distance_km, Place)] in `country`, nearest first, from the shared k-d tree."""
+    return get_geo_index().nearest(kind, lat, lng, k, max_km=NEARBY_RADIUS_KM, country=country)
+
+# Used unless the local map server is running and browsers can reach it
+ONLINE_TILE_URL = "https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
+
+# Pre-download map tiles around every destination city in the background (SAFEWANDER_SEED_TILES=1)
+SEED_TILES = os.getenv("SAFEWANDER_SEED_TILES", "0") == "1"
+
+# Cluster tiles are built once per places.csv version and served to the map by a local HTTP server
+@st.cache_resource
+def _cluster_tiles(fingerprint):
+    return load_cluster_tiles(PLACES_PATH)
+
+@st.cache_resource
+def get_map_server():
+    tiles = TileCache()
+    server = start_map_server(tile_cache=tiles)
+    if server is None:
+        tiles.close()
+        return None
+    if SEED_TILES:
+        centers = [tuple(c) for d in DESTINATIONS.values() for c in d["coords"].values()]
+        threading.Thread(target=tiles.seed, args=(centers,), name="tile-seed", daemon=True).start()
+    return server
+
+def public_map_server():
+    """The map server, only if SAFEWANDER_MAP_URL tells browsers where to reach it; else None."""
+    server = get_map_server()
+    return server if server is not None and server.public else None
+
+# style.css is minified and logo.png copied once per process, under content-hashed names the
+# map server can serve as immutable files; unless browsers can reach the server both are inlined
+@st.cache_resource
+def _static_assets():
+    return build_assets()
+
+def get_static_assets():
+    """The built style and logo; rebuilt if the build directory was cleaned since."""
+    built = _static_assets()
+    root = os.path.dirname(BUILD_DIR)
+    if not all(os.path.exists(os.path.join(root, asset.name)) for asset in built.values() if asset):
+        _static_assets.clear()
+        built = _static_assets()
+    return built
+
+def static_base():
+    server = public_map_server()
+    return server.asset_base() if server is not None else None
+
+def inject_styles():
+    base = static_base()
+    icons = f"{base}/font-awesome/6.4.0/css/all.min.css" if base and assets_vendored() else f"{CDN_BASE}/font-awesome/6.4.0/css/all.min.css"
+    style = get_static_assets()["style"]
+    if base:
+        stylesheet = f'<link rel="stylesheet" href="{base}/{style.name}">'
+    else:
+        stylesheet = f'<style>{style.data.decode("utf-8")}</style>'
+    st.markdown(f'<link rel="stylesheet" href="{icons}">{stylesheet}', unsafe_allow_html=True)
+
+def logo_src():
+    logo = get_static_assets()["logo"]
+    if logo is None:
+        return None
+    base = static_base()
+    return f"{base}/{logo.name}" if base else logo.data_uri()
+
+def places_version():
+    return (file_fingerprint(PLACES_PATH) or "none").replace(":", "-")
+
+# Map page is built once per (country, city, places.csv version) and reused across reruns/sessions
+@st.cache_data(max_entries=256)
+def build_map_html(country, city, version):
+    coords = city_coords(country, city)
+    places = []
+    if coords is not None:
+        lat, lng = coords
+        zoom = MAP_ZOOM
+        for kind, k in NEARBY_PLACES.items():
+            for km, place in nearby_places(lat, lng, kind, k, country):
+                places.append([place.lat, place.lng, kind, place.name, format_distance(km)])
+    else:
+        lat, lng = country_center(country)
+        zoom = COUNTRY_ZOOM
+    clusters = _cluster_tiles(version)
+    server = public_map_server()
+    payload = {
+        "center": [lat, lng],
+        "located": coords is not None,
+        "label": f"{city}, {country}",
+        "zoom": zoom,
+        "minZoom": CLUSTER_MIN_ZOOM,
+        "maxZoom": CLUSTER_MAX_ZOOM,
+        "places": places,
+        "tiles": clusters.viewport(lat, lng, zoom),
+        "tileUrl": server.cluster_url(version) if server is not None else None,
+        "tileLayer": server.tile_url() if server is not None else ONLINE_TILE_URL,
+        "tileFallback": ONLINE_TILE_URL if server is not None else None,
+    }
+    asset_base = server.asset_base() if server is not None and assets_vendored() else CDN_BASE
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+    return MAP_TEMPLATE.replace("__ASSET_BASE__", asset_base).replace("__MAP_DATA__", data)
+
 def show_live_map():
     profile = st.session_state.profile
     city = profile.get('destination_city', 'Delhi')
     country = profile.get('destination_country', 'India')
-    
-    coords = DESTINATIONS.get(country, {}).get("coords", {}).get(city, [28.6139, 77.2090])
-    police = POLICE_STATIONS.get(city, [])
-    
-    map_html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.9.4/leaflet.css"/>
-        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-        <script src="https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.9.4/leaflet.js"></script>
-        <style>
-            body {{ margin: 0; padding: 0; font-family: 'Poppins', sans-serif; }}
-            #map {{ width: 100%; height: 400px; border-radius: 12px; }}
-            .location-btn {{
-                position: absolute;
-                top: 10px;
-                right: 10px;
-                z-index: 1000;
-                background: white;
-                border: 2px solid #667eea;
-                border-radius: 8px;
-                padding: 8px 12px;
-                cursor: pointer;
-                font-weight: 600;
-                color: #667eea;
-                font-size: 0.85rem;
-                display: flex;
-                align-items: center;
-                gap: 5px;
-            }}
-            .location-btn:hover {{ background: #667eea; color: white; }}
-        </style>
-    </head>
-    <body>
-        <button class="location-btn" onclick="getLocation()"><i class="fa-solid fa-location-crosshairs"></i> My Location</button>
-        <div id="map"></div>
-        <script>
-            var map = L.map('map').setView([{coords[0]}, {coords[1]}], 13);
-            
-            L.tileLayer('https://{{s}}.tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png', {{
-                attribution: '© OpenStreetMap',
-                maxZoom: 19
-            }}).addTo(map);
-            
-            L.marker([{coords[0]}, {coords[1]}]).addTo(map)
-                .bindPopup('<b>{city}, {country}</b><br>Your destination').openPopup();
-            
-            var policeIcon = L.icon({{
-                iconUrl: 'data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0IiBmaWxsPSIjMzY0OGY4Ij48cGF0aCBkPSJNMTIgMkM4LjEzIDIgNSA1LjEzIDUgOWMwIDUuMjUgNyAxMyA3IDEzczctNy43NSA3LTEzYzAtMy44Ny0zLjEzLTctNy03em0wIDkuNWMtMS4zOCAwLTIuNS0xLjEyLTIuNS0yLjVzMS4xMi0yLjUgMi41LTIuNSAyLjUgMS4xMiAyLjUgMi41LTEuMTIgMi41LTIuNSAyLjV6Ii8+PC9zdmc+',
-                iconSize: [30, 30], iconAnchor: [15, 30], popupAnchor: [0, -30]
-            }});
-            
-            {chr(10).join([f"L.marker([{p['lat']}, {p['lng']}], {{icon: policeIcon}}).addTo(map).bindPopup('<b>{p['name']}</b><br>{p['distance']}');" for p in police])}
-            
-            L.circle([{coords[0] + 0.01}, {coords[1] + 0.01}], {{
-                color: '#10b981', fillColor: '#10b981', fillOpacity: 0.2, radius: 500
-            }}).addTo(map).bindPopup('<b>Safe Zone</b><br>Tourist area');
-            
-            var userMarker = null;
-            function getLocation() {{
-                if (navigator.geolocation) {{
-                    navigator.geolocation.getCurrentPosition(function(pos) {{
-                        if (userMarker) map.removeLayer(userMarker);
-                        var redIcon = L.icon({{
-                            iconUrl: 'data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyNCIgaGVpZ2h0PSIyNCIgdmlld0JveD0iMCAwIDI0IDI0IiBmaWxsPSIjZWY0NDQ0Ij48cGF0aCBkPSJNMTIgMkM4LjEzIDIgNSA1LjEzIDUgOWMwIDUuMjUgNyAxMyA3IDEzczctNy43NSA3LTEzYzAtMy44Ny0zLjEzLTctNy03em0wIDkuNWMtMS4zOCAwLTIuNS0xLjEyLTIuNS0yLjVzMS4xMi0yLjUgMi41LTIuNSAyLjUgMS4xMiAyLjUgMi41LTEuMTIgMi41LTIuNSAyLjV6Ii8+PC9zdmc+',
-                            iconSize: [35, 35], iconAnchor: [17, 35]
-                        }});
-                        userMarker = L.marker([pos.coords.latitude, pos.coords.longitude], {{icon: redIcon}}).addTo(map).bindPopup('<b>You are here!</b>').openPopup();
-                        map.setView([pos.coords.latitude, pos.coords.longitude], 15);
-                    }}, function(err) {{ alert("Location error: " + err.message); }});
-                }} else {{ alert("Geolocation not supported"); }}
-            }}
-        </script>
-    </body>
-    </html>
-    """
-    components.html(map_html, height=420)
+    version = places_version()
+    server = public_map_server()
+    if server is not None:
+        server.publish(version, _cluster_tiles(version))
+    components.html(build_map_html(country, city, version), height=420)
+
+
+# SOS events are written durably before the UI reacts, then delivered by a background dispatcher
+@st.cache_resource
+def get_sos_pipeline():
+    log = EventLog()
+    return log, Dispatcher(log, make_sink()).start()
+
+def record_sos(kind, **fields):
+    """Append an SOS event for the current incident (a new one on activation) and wake the dispatcher."""
+    log, dispatcher = get_sos_pipeline()
+    if kind == "activated" or not st.session_state.sos_incident:
+        st.session_state.sos_incident = new_incident_id()
+    profile = st.session_state.profile
+    country = profile.get('destination_country', 'India')
+    city = profile.get('destination_city', 'Delhi')
+    coords = city_coords(country, city)
+    event = log.append(
+        st.session_state.sos_incident, kind,
+        session=st.session_state.get('session_token'),
+        profile={key: profile.get(key) for key in ('name', 'gender', 'age_range', 'destination_country', 'destination_city')},
+        # No device GPS on the server yet; the destination city centre stands in when it is known
+        coords=coords, coords_source="destination" if coords is not None else None,
+        **fields,
+    )
+    dispatcher.notify()
+    if kind == "cancelled":
+        release_responder()
+    return event
+
+# Responders are shared by every session, so two SOS requests never get the same officer.
+# Assignments still open in the SOS log (e.g. before a restart) keep their responders busy
+@st.cache_resource
+def get_responder_index():
+    index = load_responder_index()
+    log, _ = get_sos_pipeline()
+    index.restore(log.active_assignments(time.time() - index.lease))
+    return index
+
+def dispatch_responder():
+    """Reserve the nearest free responder (a female officer first if the traveller is female)."""
+    profile = st.session_state.profile
+    country = profile.get('destination_country', 'India')
+    coords = city_coords(country, profile.get('destination_city', 'Delhi'))
+    gender = 'Female' if profile.get('gender') == 'Female' else None
+    release_responder()
+    if coords is None:
+        # Distances from a made-up point would send the wrong officer; the modal gives the police number
+        record_sos("unassigned", cause="no coordinates for the destination city")
+        return
+    assignment = get_responder_index().assign(country, *coords, gender)
+    st.session_state.sos_assignment = assignment.as_dict() if assignment else None
+    record_sos("assigned", responder=st.session_state.sos_assignment)
+
+def release_responder():
+    assignment = st.session_state.sos_assignment
+    if assignment:
+        get_responder_index().release(assignment['id'])
+    st.session_state.sos_assignment = None
+
 
+# SOS button callbacks - they run before the rerun, so no second st.rerun() is needed
+def activate_sos():
+    record_sos("activated")
+    st.session_state.sos_active = True
+
+def choose_sos_reason(reason):
+    st.session_state.sos_reason = reason
+    record_sos("reason", reason=reason)
+    dispatch_responder()
+
+def cancel_sos():
+    record_sos("cancelled")
+    st.session_state.sos_active = False
+    st.session_state.sos_reason = None
 
 # SOS Emergency Handler
 def show_sos_modal():
-    data = load_safety_data()
+    kb = load_safety_data()
     profile = st.session_state.profile
     
     if not st.session_state.sos_reason:
@@ -864,13 +688,9 @@ def show_sos_modal():
         ]
         
         for label, reason, icon in reasons:
-            if st.button(f"{label}", key=reason, use_container_width=True):
-                st.session_state.sos_reason = reason
-                st.rerun()
+            st.button(f"{label}", key=reason, use_container_width=True, on_click=choose_sos_reason, args=(reason,))
         
-        if st.button("Cancel SOS", use_container_width=True):
-            st.session_state.sos_active = False
-            st.rerun()
+        st.button("Cancel SOS", use_container_width=True, on_click=cancel_sos)
         
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -880,30 +700,42 @@ def show_sos_modal():
         
         gender = profile.get('gender', 'Male')
         country = profile.get('destination_country', 'India')
+        emergency = kb.country(country).emergency
         
-        # Get country-specific officers
-        country_officers = MOCK_OFFICERS.get(country, MOCK_OFFICERS["India"])
+        city = profile.get('destination_city', 'Delhi')
+        coords = city_coords(country, city)
+        stations = nearby_places(*coords, "police", 1, country) if coords is not None else []
+        if stations:
+            km, station = stations[0]
+            nearest_station = f"Nearest station: {format_distance(km)} ({station.name})"
+        else:
+            nearest_station = f"Nearest station: call {emergency.get('police', '100')}"
         
-        if gender == 'Female':
-            officer = [o for o in country_officers if o['gender'] == 'Female'][0]
+        officer = st.session_state.sos_assignment
+        if officer is None and coords is None:
+            st.markdown(f'<div class="alert-danger"><i class="fa-solid fa-phone"></i> We can\'t locate responders in {city} - call police on <strong>{emergency.get("police", "100")}</strong></div>', unsafe_allow_html=True)
+        elif officer is None:
+            st.markdown(f'<div class="alert-danger"><i class="fa-solid fa-phone"></i> No responder is free nearby right now - call police on <strong>{emergency.get("police", "100")}</strong><br/><i class="fa-solid fa-building-shield"></i> {nearest_station}</div>', unsafe_allow_html=True)
+        elif gender == 'Female' and officer['matched_gender']:
             st.markdown('<div class="alert-success"><i class="fa-solid fa-venus"></i> Female officer dispatched as per your request</div>', unsafe_allow_html=True)
-        else:
-            officer = [o for o in country_officers if o['gender'] == 'Male'][0]
+        elif gender == 'Female':
+            st.markdown('<div class="alert-warning"><i class="fa-solid fa-venus"></i> No female officer is free nearby - the nearest available officer is on the way</div>', unsafe_allow_html=True)
         
-        st.markdown(f'''
-        <div class="officer-card">
-            <div class="officer-photo"><i class="fa-solid fa-user-shield"></i></div>
-            <div style="flex:1;">
-                <div class="officer-name">{officer['name']}</div>
-                <div class="officer-badge">Badge: {officer['badge']}</div>
-                <div style="margin-top:0.3rem;color:#64748b;font-size:0.8rem;">
-                    <i class="fa-solid fa-location-dot"></i> Location tracked | 
-                    <i class="fa-solid fa-building-shield"></i> Nearest station: 1.2 km
+        if officer is not None:
+            st.markdown(f'''
+            <div class="officer-card">
+                <div class="officer-photo"><i class="fa-solid fa-user-shield"></i></div>
+                <div style="flex:1;">
+                    <div class="officer-name">{officer['name']}</div>
+                    <div class="officer-badge">Badge: {officer['badge']} | Alert #{(st.session_state.sos_incident or '')[:8].upper()}</div>
+                    <div style="margin-top:0.3rem;color:#64748b;font-size:0.8rem;">
+                        <i class="fa-solid fa-location-dot"></i> Location tracked | 
+                        <i class="fa-solid fa-building-shield"></i> {nearest_station}
+                    </div>
                 </div>
+                <div class="eta-badge">ETA: {officer['eta_minutes']} mins</div>
             </div>
-            <div class="eta-badge">ETA: {officer['eta']}</div>
-        </div>
-        ''', unsafe_allow_html=True)
+            ''', unsafe_allow_html=True)
         
         st.markdown('<div class="alert-danger">', unsafe_allow_html=True)
         st.markdown('<strong><i class="fa-solid fa-exclamation-triangle"></i> WHILE YOU WAIT:</strong>', unsafe_allow_html=True)
@@ -912,12 +744,11 @@ def show_sos_modal():
             "stalking": "1. Move to a crowded public place\n2. DO NOT go to isolated areas\n3. Make eye contact with security\n4. Stay on well-lit roads",
             "theft": "1. Do NOT chase the thief\n2. Note the direction they fled\n3. Memorize their appearance\n4. Stay in public area",
             "unsafe": "1. Go to nearest public place\n2. Enter a shop/restaurant\n3. Ask staff to stay with you\n4. Share live location with friend",
-            "urgent": f"1. Stay calm and safe\n2. Call emergency: {data.get('emergency_numbers', {}).get(country, {}).get('police', '100')}\n3. Describe your surroundings\n4. Do NOT put yourself in danger"
+            "urgent": f"1. Stay calm and safe\n2. Call emergency: {emergency.get('police', '100')}\n3. Describe your surroundings\n4. Do NOT put yourself in danger"
         }
         st.markdown(instructions.get(st.session_state.sos_reason, "Stay calm and wait for help."))
         st.markdown('</div>', unsafe_allow_html=True)
         
-        emergency = data.get("emergency_numbers", {}).get(country, {})
         if emergency:
             st.markdown('<p style="font-weight:600;margin-top:1rem;font-size:0.9rem;"><i class="fa-solid fa-phone"></i> Emergency Numbers:</p>', unsafe_allow_html=True)
             cols = st.columns(len(emergency))
@@ -925,35 +756,172 @@ def show_sos_modal():
                 with cols[i]:
                     st.markdown(f'<div style="text-align:center;padding:0.8rem;background:#fee2e2;border-radius:8px;"><strong style="font-size:0.8rem;">{service.title()}</strong><br/><span style="font-size:1.1rem;color:#ef4444;font-weight:700;">{number}</span></div>', unsafe_allow_html=True)
         
-        if st.button("I'm Safe Now - Cancel SOS", use_container_width=True):
-            st.session_state.sos_active = False
-            st.session_state.sos_reason = None
-            st.rerun()
+        st.button("I'm Safe Now - Cancel SOS", use_container_width=True, on_click=cancel_sos)
         
         st.markdown('</div>', unsafe_allow_html=True)
 
+CURRENCY_SYMBOLS = {"India": "₹", "Thailand": "฿", "Mexico": "$", "USA": "$", "Brazil": "R$"}
+
+# Per-city tariffs parsed from database.json; route estimates are cached inside the model
+@st.cache_resource
+def _fare_model(fingerprint):
+    return build_fare_model(load_safety_data())
+
+def get_fare_model():
+    return _fare_model(file_fingerprint(DATA_PATH))
+
+# Reference prices for lodging, food and shopping, one table per country
+@st.cache_resource
+def _price_index(fingerprint):
+    return PriceIndex(load_safety_data(), get_fare_model())
+
+def get_price_index():
+    return _price_index(file_fingerprint(DATA_PATH))
+
+# Every checked price feeds rolling per-city quantiles; recording happens on a background thread
+@st.cache_resource
+def get_price_observations():
+    return ObservationStore().start()
+
+def record_price(check, country, city, query):
+    """Log the quote once per distinct query (reruns re-submit the same text), tagged with the session
+    so the store can cap how many of one traveller's reports count."""
+    if st.session_state.get('price_query_recorded') == query:
+        return
+    st.session_state.price_query_recorded = query
+    # Quantiles are per currency; quotes in another currency are left out
+    if check.observed_value is None or check.currency != LOCAL_CURRENCY.get(country):
+        return
+    get_price_observations().record(Observation(
+        country, city, check.item, check.category, check.amount, check.currency, check.observed_value, time.time(),
+        st.session_state.get('session_token')))
+
+SCAM_ADVICE = {
+    "transport": ["Show this screen to the driver", "Refuse and use app-based rides instead",
+                  "Insist on meter usage", "Walk away and find another option"],
+    "accommodation": ["Show your booking confirmation", "Call the hotel directly, not a number the driver gives you",
+                      "Book through an official platform", "Walk away and find another place"],
+    "food": ["Ask for the menu with printed prices", "Check the bill before paying",
+             "Eat where locals eat", "Buy water at a convenience store"],
+    "shopping": ["Never buy for resale", "Compare with two other shops",
+                 "Agree on the price before anything is made or handed over", "Walk away"],
+}
+
+TRIP_AROUND_TOWN = f"Around town (~{TYPICAL_TRIP_KM:.0f} km)"
+
+def trip_destinations(country, city):
+    """{label: (lat, lng)} for the trip picker: other destination cities, then nearby hospitals and embassies.
+
+    Empty when the city has no coordinates: there is nothing to measure a trip from.
+    """
+    here = city_coords(country, city)
+    if here is None:
+        return {}
+    options = {}
+    for other, coords in DESTINATIONS.get(country, {}).get("coords", {}).items():
+        if other != city:
+            options[other] = tuple(coords)
+    for kind in ("hospital", "embassy"):
+        for km, place in nearby_places(*here, kind, 2, country):
+            options[f"{place.name} ({format_distance(km)})"] = (place.lat, place.lng)
+    return options
+
+def estimate_fare(country, city, service, parsed, destination):
+    """Expected fare for the trip: a distance or duration in the query wins, then the picked destination."""
+    model = get_fare_model()
+    km = parsed.quantities.get("km")
+    if km is None and "minutes" in parsed.quantities:
+        km = parsed.quantities["minutes"] * SPEED_KMH["day"] / 60
+    if km is not None:
+        return model.estimate_km(country, city, service, km, local_period(country, city))
+    origin = city_coords(country, city)
+    if destination is not None and origin is not None:
+        return model.estimate(country, city, service, tuple(origin), destination)
+    return model.estimate_km(country, city, service, TYPICAL_TRIP_KM, local_period(country, city))
+
+# Photos of menus, fare boards and signs are read by tesseract in worker processes (photo_ocr.py)
+# How long a run waits for the OCR result before offering to check back
+OCR_WAIT = 20
+
+@st.cache_resource
+def get_photo_reader():
+    return PhotoReader()
+
+# Short verdict labels for prices read from a photo
+SCAN_VERDICTS = {
+    "scam": ("#991b1b", "fa-circle-exclamation", "Scam"),
+    "high": ("#92400e", "fa-triangle-exclamation", "High"),
+    "fair": ("#065f46", "fa-check-circle", "Fair"),
+    "warning": ("#92400e", "fa-triangle-exclamation", "Known scam"),
+    "unknown": ("#64748b", "fa-circle-question", "No reference"),
+}
+
+def check_scanned_price(line):
+    st.session_state.scam_query = line
+
+def show_photo_scan(country, check_price):
+    """OCR an uploaded menu, fare board or sign, check its prices, and match it to phrases and customs."""
+    reader = get_photo_reader()
+    with st.expander("Scan a menu, fare board or sign"):
+        if not reader.available:
+            st.caption("Photo scanning needs Tesseract OCR on the server (see packages.txt).")
+            return
+        photo = st.file_uploader("Photo", type=["png", "jpg", "jpeg", "webp"], key="scan_photo", label_visibility="collapsed")
+        if photo is None:
+            return
+        data = photo.getvalue()
+        if len(data) > MAX_UPLOAD_BYTES:
+            st.warning(f"Photo is too large - please upload one under {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+            return
+        _, job = reader.submit(data, country)
+        try:
+            with st.spinner("Reading the photo..."):
+                result = job.result(timeout=OCR_WAIT)
+        except FutureTimeout:
+            st.info("Still reading the photo - check back in a moment.")
+            st.button("Check again", key="scan_refresh")
+            return
+        except Exception as e:
+            logging.getLogger("safewander.ocr").warning("OCR failed: %s", e)
+            st.warning("Couldn't read this photo. Try a sharper, well-lit picture.")
+            return
+        if not result.lines:
+            st.info("No text found in this photo.")
+            return
+        
+        lines = price_lines(result.text, country)
+        if lines:
+            st.markdown('<p style="font-weight:600;font-size:0.9rem;margin:0.5rem 0;"><i class="fa-solid fa-tags"></i> Prices in the photo</p>', unsafe_allow_html=True)
+        for idx, line in enumerate(lines):
+            color, icon, label = SCAN_VERDICTS[check_price(line).verdict]
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(f'<p style="margin:0.3rem 0;font-size:0.85rem;"><span style="color:{color};font-weight:600;"><i class="fa-solid {icon}"></i> {label}</span> &middot; {escape(line)}</p>', unsafe_allow_html=True)
+            with col2:
+                st.button("Check", key=f"scan_check_{idx}", on_click=check_scanned_price, args=(line,), use_container_width=True)
+        
+        index = get_phrase_index()
+        phrases = index.find(index.language(country), result.text)
+        if phrases:
+            words = " &middot; ".join(f"<strong>{escape(p.script)}</strong> = {escape(p.meaning)}" for p in phrases)
+            st.markdown(f'<p style="margin:0.5rem 0;font-size:0.85rem;"><i class="fa-solid fa-language"></i> {words}</p>', unsafe_allow_html=True)
+        kb = load_safety_data()
+        for chunk in related_chunks(get_retriever(kb).index(country), result.text, ("cultural_guidelines",)):
+            st.markdown(f'<p style="margin:0.3rem 0;font-size:0.8rem;color:#64748b;"><i class="fa-solid fa-landmark"></i> {escape(chunk.text.lstrip("- "))}</p>', unsafe_allow_html=True)
+        
+        st.caption("Text read from the photo")
+        st.text("\n".join(result.lines))
+
 # Scam Price Checker - SMART VERSION
 def show_scam_checker():
-    import re
-    data = load_safety_data()
+    kb = load_safety_data()
     profile = st.session_state.profile
     country = profile.get('destination_country', 'India')
     city = profile.get('destination_city', 'Delhi')
     
-    # Price reference data by country
-    PRICE_THRESHOLDS = {
-        "India": {"currency": "₹", "auto_normal": 150, "auto_high": 300, "taxi_normal": 200, "taxi_high": 400},
-        "Thailand": {"currency": "฿", "auto_normal": 100, "auto_high": 200, "taxi_normal": 150, "taxi_high": 300},
-        "Mexico": {"currency": "$", "auto_normal": 10, "auto_high": 25, "taxi_normal": 15, "taxi_high": 40},
-        "USA": {"currency": "$", "auto_normal": 15, "auto_high": 40, "taxi_normal": 25, "taxi_high": 60},
-        "Brazil": {"currency": "R$", "auto_normal": 20, "auto_high": 50, "taxi_normal": 30, "taxi_high": 80}
-    }
-    
-    thresholds = PRICE_THRESHOLDS.get(country, PRICE_THRESHOLDS["India"])
-    currency = thresholds["currency"]
+    currency = CURRENCY_SYMBOLS.get(country, "₹")
     
-    scams = data.get("transport_scams", [])
-    relevant = [s for s in scams if s.get("country") == country]
+    relevant = kb.country(country).city_scams(city)
     
     st.markdown('<div class="scam-checker">', unsafe_allow_html=True)
     st.markdown('<div class="scam-title"><i class="fa-solid fa-magnifying-glass-dollar"></i> Real-Time Scam Price Checker</div>', unsafe_allow_html=True)
@@ -961,49 +929,78 @@ def show_scam_checker():
     
     query = st.text_input("What are they charging you?", 
         placeholder=f"e.g., Auto wants {currency}500 or Taxi charging {currency}1000",
-        label_visibility="collapsed")
+        label_visibility="collapsed", key="scam_query")
+    destinations = trip_destinations(country, city)
+    trip = st.selectbox("Trip to", [TRIP_AROUND_TOWN, *destinations], key="scam_trip")
+    
+    def check_price(text):
+        check = get_price_index().check(text, country, city,
+            fare=lambda service, parsed: estimate_fare(country, city, service, parsed, destinations.get(trip)))
+        if check.verdict != "warning":
+            # Once enough travellers have reported prices here, judge against their p90
+            check = check.with_quantiles(get_price_observations().quantiles(country, city, check.item))
+        return check
+    
+    show_photo_scan(country, check_price)
     
     if query:
-        # Extract any number from the query
-        numbers = re.findall(r'\d+', query.replace(',', ''))
+        check = check_price(query)
+        record_price(check, country, city, query)
+        label = SERVICE_LABELS.get(check.item) or ITEM_LABELS.get(check.item, "")
         
-        if numbers:
-            amount = int(numbers[0])
-            query_lower = query.lower()
-            
-            # Determine service type
-            is_taxi = any(word in query_lower for word in ['taxi', 'cab', 'uber', 'ola', 'grab', 'car'])
-            normal_rate = thresholds["taxi_normal"] if is_taxi else thresholds["auto_normal"]
-            high_rate = thresholds["taxi_high"] if is_taxi else thresholds["auto_high"]
-            service_type = "Taxi/Cab" if is_taxi else "Auto/Rickshaw"
-            
-            st.markdown('<div class="price-check">', unsafe_allow_html=True)
+        st.markdown('<div class="price-check">', unsafe_allow_html=True)
+        if check.amount is None:
+            st.markdown(f'<p style="color:#64748b;font-size:0.85rem;">Please include an amount (e.g., "{currency}300", "1.5k" or "three hundred")</p>', unsafe_allow_html=True)
+        elif check.verdict == "warning":
+            # A known scam for this item, but no fair price to compare with
+            for scam in check.scams[:2]:
+                st.markdown(f'''<div class="alert-warning">
+                <h4 style="color:#92400e;margin:0 0 0.5rem 0;font-size:1rem;"><i class="fa-solid fa-triangle-exclamation"></i> KNOWN SCAM: {scam.get("scam_type", "Scam")}</h4>
+                <p style="margin:0.3rem 0;font-size:0.85rem;color:#92400e;"><strong>They're charging:</strong> {currency}{format_amount(check.amount)}</p>
+                <p style="margin:0.3rem 0;font-size:0.85rem;color:#92400e;">{scam.get("description", "")}</p>
+                <p style="margin:0.3rem 0;font-size:0.85rem;color:#92400e;"><strong>Advice:</strong> {scam.get("safety_advice", "")}</p>
+                </div>''', unsafe_allow_html=True)
+        elif check.item is None:
+            st.markdown(f'<p style="color:#64748b;font-size:0.85rem;">What is the price for? Add it to the amount (e.g., "auto {currency}300", "hotel {currency}2000" or "dinner for two {currency}900")</p>', unsafe_allow_html=True)
+        elif check.verdict == "unknown":
+            st.markdown(f'<p style="color:#64748b;font-size:0.85rem;">No price reference for {label.lower()} prices in {country} yet - compare with two or three other offers before agreeing.</p>', unsafe_allow_html=True)
+        else:
+            amount = format_amount(check.amount)
+            normal_rate, high_rate = format_amount(check.low), format_amount(check.high)
+            rate_range = f"{currency}{normal_rate}" + (f"-{high_rate}" if high_rate != normal_rate else "")
+            if check.estimate is not None:
+                estimate = check.estimate
+                rate_note = f"~{format_distance(estimate.km)}, ~{estimate.minutes} min" + (", late-night rates" if estimate.period == "night" else "")
+            else:
+                rate_note = "per night" if check.item in PER_NIGHT else "each"
+                if check.unit_amount != check.amount:
+                    amount += f" ({currency}{format_amount(round(check.unit_amount))} {rate_note})"
+            if check.live_count:
+                rate_note += f", from {check.live_count} recent traveller reports"
             
-            if amount > high_rate * 2:
-                # Definite scam - more than 2x high rate
-                overcharge_pct = int((amount / normal_rate - 1) * 100)
+            if check.verdict == "scam":
+                # Definite scam - more than 2x the top of the normal range
+                overcharge_pct = int((check.unit_amount / check.low - 1) * 100)
                 st.markdown(f'''<div class="alert-danger">
                 <h4 style="color:#991b1b;margin:0 0 0.5rem 0;font-size:1rem;"><i class="fa-solid fa-circle-exclamation"></i> SCAM ALERT!</h4>
                 <p style="margin:0.3rem 0;font-size:0.85rem;"><strong>They're charging:</strong> {currency}{amount}</p>
-                <p style="margin:0.3rem 0;font-size:0.85rem;"><strong>Normal {service_type} rate:</strong> {currency}{normal_rate}-{high_rate}</p>
+                <p style="margin:0.3rem 0;font-size:0.85rem;"><strong>Normal {label} price:</strong> {rate_range} ({rate_note})</p>
                 <p style="margin:0.3rem 0;font-size:0.85rem;"><strong>Overcharge:</strong> ~{overcharge_pct}%!</p>
                 </div>''', unsafe_allow_html=True)
                 
+                advice = SCAM_ADVICE.get(check.category, SCAM_ADVICE["transport"])
                 st.markdown(f'''<p style="margin-top:0.8rem;font-size:0.85rem;"><strong><i class="fa-solid fa-check"></i> What to do:</strong></p>
                 <ul style="font-size:0.8rem;color:#64748b;margin:0.5rem 0;">
-                    <li>Show this screen to the driver</li>
-                    <li>Refuse and use app-based rides instead</li>
-                    <li>Insist on meter usage</li>
-                    <li>Walk away and find another option</li>
+                    {"".join(f"<li>{tip}</li>" for tip in advice)}
                 </ul>''', unsafe_allow_html=True)
                 
-            elif amount > high_rate:
-                # Suspicious - above high rate
+            elif check.verdict == "high":
+                # Suspicious - above the normal range
                 st.markdown(f'''<div class="alert-danger" style="background:linear-gradient(135deg, #fef3c7 0%, #fde68a 100%);border-color:#f59e0b;">
                 <h4 style="color:#92400e;margin:0 0 0.5rem 0;font-size:1rem;"><i class="fa-solid fa-triangle-exclamation"></i> SUSPICIOUS PRICE</h4>
                 <p style="margin:0.3rem 0;font-size:0.85rem;color:#92400e;"><strong>They're charging:</strong> {currency}{amount}</p>
-                <p style="margin:0.3rem 0;font-size:0.85rem;color:#92400e;"><strong>Normal {service_type} rate:</strong> {currency}{normal_rate}-{high_rate}</p>
-                <p style="margin:0.3rem 0;font-size:0.85rem;color:#92400e;">This seems high. Negotiate or check distance.</p>
+                <p style="margin:0.3rem 0;font-size:0.85rem;color:#92400e;"><strong>Normal {label} price:</strong> {rate_range} ({rate_note})</p>
+                <p style="margin:0.3rem 0;font-size:0.85rem;color:#92400e;">This seems high. Negotiate or compare with other offers.</p>
                 </div>''', unsafe_allow_html=True)
                 
             else:
@@ -1011,15 +1008,14 @@ def show_scam_checker():
                 st.markdown(f'''<div class="alert-success">
                 <h4 style="color:#065f46;margin:0 0 0.5rem 0;font-size:1rem;"><i class="fa-solid fa-check-circle"></i> FAIR PRICE</h4>
                 <p style="margin:0.3rem 0;font-size:0.85rem;"><strong>They're charging:</strong> {currency}{amount}</p>
-                <p style="margin:0.3rem 0;font-size:0.85rem;"><strong>Normal {service_type} rate:</strong> {currency}{normal_rate}-{high_rate}</p>
+                <p style="margin:0.3rem 0;font-size:0.85rem;"><strong>Normal {label} price:</strong> {rate_range} ({rate_note})</p>
                 <p style="margin:0.3rem 0;font-size:0.85rem;">This price looks reasonable!</p>
                 </div>''', unsafe_allow_html=True)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-        else:
-            st.markdown('<div class="price-check">', unsafe_allow_html=True)
-            st.markdown(f'<p style="color:#64748b;font-size:0.85rem;">Please include an amount (e.g., "{currency}300" or "300 rupees")</p>', unsafe_allow_html=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown('</div>', unsafe_allow_html=True)
+        
+        # Scams about what they're paying for come first
+        if check.category != "transport":
+            relevant = check.scams + tuple(s for s in relevant if s not in check.scams)
     
     # Show common scams
     if relevant:
@@ -1029,8 +1025,7 @@ def show_scam_checker():
             <div style="background:white;padding:0.8rem;border-radius:8px;margin:0.5rem 0;font-size:0.85rem;">
                 <strong>{scam.get("scam_type", "Scam")}</strong><br/>
                 <small style="color:#64748b;">{scam.get("description", "")[:80]}...</small><br/>
-                <span style="color:#10b981;">Normal: {scam.get("normal_rate", "N/A")}</span> | 
-                <span style="color:#ef4444;">Scam: {scam.get("scam_rate", "N/A")}</span>
+                {f'<span style="color:#10b981;">Normal: {scam.get("normal_rate")}</span> | <span style="color:#ef4444;">Scam: {scam.get("scam_rate", "N/A")}</span>' if scam.get("normal_rate") else f'<span style="color:#64748b;">{scam.get("safety_advice", "")}</span>'}
             </div>
             ''', unsafe_allow_html=True)
     
@@ -1038,139 +1033,232 @@ def show_scam_checker():
 
 
 # Essential Phrases with WORKING Text-to-Speech
+# One page of phrase cards: a static page per (phrases, rendered clips), built once and cached.
+# Buttons play the pre-rendered clip (fetched on first tap, then from the browser cache) and fall
+# back to the browser's speech synthesis for phrases without one.
+PHRASES_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <link rel="stylesheet" href="__ASSET_BASE__/font-awesome/6.4.0/css/all.min.css">
+    <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap" rel="stylesheet">
+    <style>
+        * { font-family: 'Poppins', sans-serif; margin: 0; padding: 0; box-sizing: border-box; }
+        body { background: transparent; }
+        .phrase-card {
+            background: linear-gradient(135deg, #ede9fe 0%, #ddd6fe 100%);
+            border-radius: 12px;
+            padding: 1rem;
+            margin: 0.6rem 0;
+            border-left: 4px solid #7c3aed;
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+        }
+        .phrase-local {
+            font-size: 1.1rem;
+            font-weight: 700;
+            color: #5b21b6;
+        }
+        .phrase-meaning {
+            font-size: 0.85rem;
+            color: #6d28d9;
+        }
+        .phrase-audio {
+            background: #7c3aed;
+            color: white;
+            border: none;
+            border-radius: 50%;
+            width: 45px;
+            height: 45px;
+            cursor: pointer;
+            font-size: 1.1rem;
+            transition: all 0.2s;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            flex-shrink: 0;
+        }
+        .phrase-audio:hover {
+            background: #5b21b6;
+            transform: scale(1.1);
+        }
+        .phrase-audio:active {
+            transform: scale(0.95);
+        }
+        .phrase-audio.speaking {
+            background: #5b21b6;
+            animation: pulse 0.5s infinite;
+        }
+        @keyframes pulse {
+            0%, 100% { opacity: 1; transform: scale(1); }
+            50% { opacity: 0.7; transform: scale(1.05); }
+        }
+    </style>
+</head>
+<body>
+    __PHRASE_CARDS__
+    <script>
+    let current = null;
+
+    function stopSpeaking() {
+        if (current) { current.pause(); current = null; }
+        if ('speechSynthesis' in window) window.speechSynthesis.cancel();
+        document.querySelectorAll('.phrase-audio').forEach(btn => btn.classList.remove('speaking'));
+    }
+
+    function speakWithBrowser(button) {
+        if (!('speechSynthesis' in window)) {
+            button.classList.remove('speaking');
+            alert('Text-to-speech not supported. Try Chrome or Edge browser.');
+            return;
+        }
+        const utterance = new SpeechSynthesisUtterance(button.dataset.text);
+        utterance.lang = button.dataset.lang;
+        utterance.rate = 0.7;
+        utterance.onend = () => button.classList.remove('speaking');
+        utterance.onerror = (e) => {
+            console.error('Speech error:', e);
+            button.classList.remove('speaking');
+        };
+        window.speechSynthesis.speak(utterance);
+    }
+
+    function speakPhrase(button) {
+        stopSpeaking();
+        button.classList.add('speaking');
+        if (!button.dataset.audio) {
+            speakWithBrowser(button);
+            return;
+        }
+        // Clips are only requested when tapped; the server marks them immutable
+        const audio = new Audio(button.dataset.audio);
+        current = audio;
+        audio.onended = () => button.classList.remove('speaking');
+        audio.onerror = () => speakWithBrowser(button);
+        audio.play().catch(() => speakWithBrowser(button));
+    }
+    </script>
+</body>
+</html>
+"""
+
+# Render missing phrase clips in the background at startup (needs espeak-ng and ffmpeg). Clips are
+# served by the map server, so like the bundles they are only used when SAFEWANDER_MAP_URL is set
+RENDER_PHRASE_AUDIO = os.getenv("SAFEWANDER_PHRASE_AUDIO", "1") == "1"
+
+# Phrase cards shown per page
+PHRASES_PER_PAGE = 8
+
+# Phrase book - indexed once per phrases.json version, shared across sessions
+@st.cache_resource
+def _phrase_index(fingerprint):
+    return load_phrase_index(PHRASES_PATH)
+
+def get_phrase_index():
+    return _phrase_index(file_fingerprint(PHRASES_PATH))
+
+@st.cache_resource
+def get_phrase_audio():
+    audio = PhraseAudio()
+    if RENDER_PHRASE_AUDIO and audio.available and public_map_server() is not None:
+        threading.Thread(target=audio.render_all, args=(get_phrase_index(),), name="phrase-audio", daemon=True).start()
+    return audio
+
+def phrase_card(phrase, audio_url):
+    audio = f' data-audio="{escape(audio_url)}"' if audio_url else ""
+    return f'''
+    <div class="phrase-card">
+        <div>
+            <div class="phrase-local">{escape(phrase.local)}</div>
+            <div class="phrase-meaning">{escape(phrase.script)} = {escape(phrase.meaning)}</div>
+        </div>
+        <button class="phrase-audio" data-text="{escape(spoken_text(phrase))}" data-lang="{phrase.lang}"{audio} onclick="speakPhrase(this)" title="Click to hear pronunciation">
+            <i class="fa-solid fa-volume-high"></i>
+        </button>
+    </div>'''
+
+def phrase_clips(phrases, asset_base):
+    """Rendered clip paths for `phrases`; all None without a public asset base (the page then speaks them)."""
+    if not asset_base:
+        return (None,) * len(phrases)
+    audio = get_phrase_audio()
+    return tuple(audio.rendered(spoken_text(p), p.lang) for p in phrases)
+
+@st.cache_data(max_entries=256)
+def build_phrase_bundle(version, ids, clips, asset_base):
+    """The html for one page of phrase cards; `clips` are the rendered clip paths."""
+    phrases = get_phrase_index().get(ids)
+    cards = "".join(
+        phrase_card(phrase, f"{asset_base}/{clip}" if asset_base and clip else None)
+        for phrase, clip in zip(phrases, clips)
+    )
+    icons = asset_base if asset_base and assets_vendored() else CDN_BASE
+    return PHRASES_TEMPLATE.replace("__ASSET_BASE__", icons).replace("__PHRASE_CARDS__", cards)
+
+def publish_phrase_bundle(html, lang):
+    """Static path of the bundle file. Not cached: publish is a no-op while the file exists and
+    writes it again if the build directory was cleaned."""
+    return publish(html.encode("utf-8"), f"phrases-{lang.lower()}", "html", BUILD_DIR, "text/html").name
+
+def reset_phrase_page():
+    st.session_state.phrase_page = 0
+
+def turn_phrase_page(step):
+    st.session_state.phrase_page = st.session_state.get('phrase_page', 0) + step
+
 def show_phrases():
     profile = st.session_state.profile
     country = profile.get('destination_country', 'India')
-    phrases = ESSENTIAL_PHRASES.get(country, [])
-    lang_code = LANGUAGE_CODES.get(country, 'en-US')
+    index = get_phrase_index()
+    lang_code = index.language(country)
     
-    st.markdown(f'<div class="section-header"><i class="fa-solid fa-language"></i> 15 Essential Phrases for {country}</div>', unsafe_allow_html=True)
+    st.markdown(f'<div class="section-header"><i class="fa-solid fa-language"></i> Essential Phrases for {country}</div>', unsafe_allow_html=True)
     st.markdown('<p style="color:#64748b;font-size:0.8rem;margin-bottom:1rem;">Click the speaker button to hear pronunciation</p>', unsafe_allow_html=True)
     
-    # Build all phrase cards HTML
-    phrases_html = ""
-    for idx, (local, script, meaning) in enumerate(phrases):
-        # Escape single quotes for JavaScript
-        local_escaped = local.replace("'", "\\'")
-        phrases_html += f'''
-        <div class="phrase-card">
-            <div>
-                <div class="phrase-local">{local}</div>
-                <div class="phrase-meaning">{script} = {meaning}</div>
-            </div>
-            <button class="phrase-audio" onclick="speakPhrase('{local_escaped}', '{lang_code}')" title="Click to hear pronunciation">
-                <i class="fa-solid fa-volume-high"></i>
-            </button>
-        </div>
-        '''
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        query = st.text_input("Search phrases", placeholder="e.g. doctor, allergic, taxi", key="phrase_query", on_change=reset_phrase_page)
+    with col2:
+        categories = {"All phrases": None, **{CATEGORY_LABELS[c]: c for c in index.categories(lang_code)}}
+        category = st.selectbox("Category", list(categories), key="phrase_category", on_change=reset_phrase_page)
     
-    # Everything in ONE components.html so JS and buttons are in same context
-    components.html(f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
-        <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap" rel="stylesheet">
-        <style>
-            * {{ font-family: 'Poppins', sans-serif; margin: 0; padding: 0; box-sizing: border-box; }}
-            body {{ background: transparent; }}
-            .phrase-card {{
-                background: linear-gradient(135deg, #ede9fe 0%, #ddd6fe 100%);
-                border-radius: 12px;
-                padding: 1rem;
-                margin: 0.6rem 0;
-                border-left: 4px solid #7c3aed;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-            }}
-            .phrase-local {{
-                font-size: 1.1rem;
-                font-weight: 700;
-                color: #5b21b6;
-            }}
-            .phrase-meaning {{
-                font-size: 0.85rem;
-                color: #6d28d9;
-            }}
-            .phrase-audio {{
-                background: #7c3aed;
-                color: white;
-                border: none;
-                border-radius: 50%;
-                width: 45px;
-                height: 45px;
-                cursor: pointer;
-                font-size: 1.1rem;
-                transition: all 0.2s;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                flex-shrink: 0;
-            }}
-            .phrase-audio:hover {{
-                background: #5b21b6;
-                transform: scale(1.1);
-            }}
-            .phrase-audio:active {{
-                transform: scale(0.95);
-            }}
-            .phrase-audio.speaking {{
-                background: #5b21b6;
-                animation: pulse 0.5s infinite;
-            }}
-            @keyframes pulse {{
-                0%, 100% {{ opacity: 1; transform: scale(1); }}
-                50% {{ opacity: 0.7; transform: scale(1.05); }}
-            }}
-        </style>
-    </head>
-    <body>
-        {phrases_html}
-        <script>
-        function speakPhrase(text, langCode) {{
-            if ('speechSynthesis' in window) {{
-                // Cancel any ongoing speech
-                window.speechSynthesis.cancel();
-                
-                const utterance = new SpeechSynthesisUtterance(text);
-                utterance.lang = langCode;
-                utterance.rate = 0.7;
-                utterance.pitch = 1.0;
-                utterance.volume = 1.0;
-                
-                // Find the button that was clicked
-                const buttons = document.querySelectorAll('.phrase-audio');
-                buttons.forEach(btn => btn.classList.remove('speaking'));
-                event.currentTarget.classList.add('speaking');
-                
-                utterance.onend = function() {{
-                    event.currentTarget.classList.remove('speaking');
-                }};
-                
-                utterance.onerror = function(e) {{
-                    console.error('Speech error:', e);
-                    event.currentTarget.classList.remove('speaking');
-                }};
-                
-                // Speak immediately
-                window.speechSynthesis.speak(utterance);
-            }} else {{
-                alert('Text-to-speech not supported. Try Chrome or Edge browser.');
-            }}
-        }}
-        </script>
-    </body>
-    </html>
-    """, height=len(phrases) * 75 + 20)
+    # Only the current page is looked up and rendered; the search itself is a few dict lookups
+    ids = index.search(lang_code, query, categories.get(category))
+    if not ids:
+        st.info("No phrases match your search. Try another word or category.")
+        return
+    phrases, page, pages = index.page(ids, st.session_state.get('phrase_page', 0), PHRASES_PER_PAGE)
+    st.session_state.phrase_page = page
+    
+    # Bundles and clips need the map server to be reachable from the browser (SAFEWANDER_MAP_URL);
+    # a clip rendered since the last run changes the key, so the bundle picks it up
+    base = static_base()
+    clips = phrase_clips(phrases, base)
+    html = build_phrase_bundle(index.fingerprint, tuple(p.id for p in phrases), clips, base)
+    height = len(phrases) * 75 + 20
+    if base:
+        # The page is a cacheable file on the asset server; each rerun only sends its URL
+        components.iframe(f"{base}/{publish_phrase_bundle(html, lang_code)}", height=height)
+    else:
+        components.html(html, height=height)
+    
+    if pages > 1:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("Previous", key="phrase_prev", disabled=page == 0, on_click=turn_phrase_page, args=(-1,), use_container_width=True)
+        with col2:
+            st.markdown(f'<p style="text-align:center;color:#64748b;font-size:0.8rem;">Page {page + 1} of {pages} · {len(ids)} phrases</p>', unsafe_allow_html=True)
+        with col3:
+            st.button("Next", key="phrase_next", disabled=page == pages - 1, on_click=turn_phrase_page, args=(1,), use_container_width=True)
 
 # Cultural Guide
 def show_cultural_guide():
-    data = load_safety_data()
+    kb = load_safety_data()
     profile = st.session_state.profile
     country = profile.get('destination_country', 'India')
     
-    cultural = next((c for c in data.get("cultural_guidelines", []) if c.get("country") == country), {})
+    cultural = kb.country(country).cultural
     
     # Country-specific Do's and Don'ts
     DOS_DONTS = {
@@ -1260,19 +1348,52 @@ def show_cultural_guide():
 
 
 # Main Dashboard
+def open_feature(feature):
+    st.session_state.active_feature = feature
+
+# Dashboard feature cards - static HTML, built once at import
+FEATURE_CARDS = (
+    ("map", "map_btn", "Open Map", "fa-map-location-dot", "Live Safety Map", "Police stations & safe zones"),
+    ("scam", "scam_btn", "Check Prices", "fa-magnifying-glass-dollar", "Scam Checker", "Check if you're being scammed"),
+    ("phrases", "phrase_btn", "Learn Phrases", "fa-language", "Essential Phrases", "15 life-saving words"),
+    ("culture", "culture_btn", "View Guide", "fa-earth-americas", "Cultural Guide", "Do's and Don'ts"),
+)
+FEATURE_CARD_HTML = {
+    feature: f'''
+        <div class="feature-card">
+            <div class="card-icon"><i class="fa-solid {icon}"></i></div>
+            <div class="card-title">{title}</div>
+            <div class="card-desc">{desc}</div>
+        </div>
+        '''
+    for feature, _, _, icon, title, desc in FEATURE_CARDS
+}
+
+# Dashboard - navbar and home button; the body below them is a fragment
 def show_dashboard():
-    profile = st.session_state.profile
-    data = load_safety_data()
+    kb = load_safety_data()
     
     # Navigation bar with home button
     show_navbar()
     
+    if not kb.loaded:
+        st.warning("Local safety database (database.json) not found - scam and area data unavailable.")
+    
     # Home button in sidebar area
     col1, col2, col3 = st.columns([1, 6, 1])
     with col3:
-        if st.button("🏠", key="home_btn", help="Go to Home"):
-            go_home()
-            st.rerun()
+        st.button("🏠", key="home_btn", help="Go to Home", on_click=go_home)
+    
+    show_dashboard_body()
+
+# Switching features, the SOS flow and the scam checker rerun only this part
+@timed_fragment("dashboard")
+def show_dashboard_body():
+    profile = st.session_state.profile
+    kb = load_safety_data()
+    
+    # Any answer still streaming from a previous run is abandoned on navigation
+    cancel_advice_stream()
     
     # Show SOS modal if active
     if st.session_state.sos_active:
@@ -1283,9 +1404,7 @@ def show_dashboard():
     if st.session_state.active_feature:
         col1, col2 = st.columns([1, 8])
         with col1:
-            if st.button("← Back", key="back_btn"):
-                st.session_state.active_feature = None
-                st.rerun()
+            st.button("← Back", key="back_btn", on_click=open_feature, args=(None,))
         
         if st.session_state.active_feature == 'map':
             st.markdown('<div class="map-container">', unsafe_allow_html=True)
@@ -1314,55 +1433,10 @@ def show_dashboard():
     # Feature cards - instant switching
     st.markdown('<div class="dashboard-grid">', unsafe_allow_html=True)
     
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown('''
-        <div class="feature-card">
-            <div class="card-icon"><i class="fa-solid fa-map-location-dot"></i></div>
-            <div class="card-title">Live Safety Map</div>
-            <div class="card-desc">Police stations & safe zones</div>
-        </div>
-        ''', unsafe_allow_html=True)
-        if st.button("Open Map", key="map_btn", use_container_width=True):
-            st.session_state.active_feature = 'map'
-            st.rerun()
-    
-    with col2:
-        st.markdown('''
-        <div class="feature-card">
-            <div class="card-icon"><i class="fa-solid fa-magnifying-glass-dollar"></i></div>
-            <div class="card-title">Scam Checker</div>
-            <div class="card-desc">Check if you're being scammed</div>
-        </div>
-        ''', unsafe_allow_html=True)
-        if st.button("Check Prices", key="scam_btn", use_container_width=True):
-            st.session_state.active_feature = 'scam'
-            st.rerun()
-    
-    with col3:
-        st.markdown('''
-        <div class="feature-card">
-            <div class="card-icon"><i class="fa-solid fa-language"></i></div>
-            <div class="card-title">Essential Phrases</div>
-            <div class="card-desc">15 life-saving words</div>
-        </div>
-        ''', unsafe_allow_html=True)
-        if st.button("Learn Phrases", key="phrase_btn", use_container_width=True):
-            st.session_state.active_feature = 'phrases'
-            st.rerun()
-    
-    with col4:
-        st.markdown('''
-        <div class="feature-card">
-            <div class="card-icon"><i class="fa-solid fa-earth-americas"></i></div>
-            <div class="card-title">Cultural Guide</div>
-            <div class="card-desc">Do's and Don'ts</div>
-        </div>
-        ''', unsafe_allow_html=True)
-        if st.button("View Guide", key="culture_btn", use_container_width=True):
-            st.session_state.active_feature = 'culture'
-            st.rerun()
+    for col, (feature, key, label, *_) in zip(st.columns(4), FEATURE_CARDS):
+        with col:
+            st.markdown(FEATURE_CARD_HTML[feature], unsafe_allow_html=True)
+            st.button(label, key=key, use_container_width=True, on_click=open_feature, args=(feature,))
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -1376,9 +1450,7 @@ def show_dashboard():
     ''', unsafe_allow_html=True)
     
     # Hidden SOS button for Streamlit
-    if st.button("SOS", key="sos_main", help="Emergency Help"):
-        st.session_state.sos_active = True
-        st.rerun()
+    st.button("SOS", key="sos_main", help="Emergency Help", on_click=activate_sos)
     
     # AI Assistant section with RAG
     st.markdown("---")
@@ -1393,96 +1465,181 @@ def show_dashboard():
     
     if st.button("Get Personalized Advice", use_container_width=True):
         if question:
+            country = profile.get('destination_country', 'India')
+            city = profile.get('destination_city', 'Delhi')
+            offline = get_offline_engine(kb).answer(country, city, question)
             groq_client = init_groq()
-            with st.spinner("Analyzing with local knowledge..."):
-                if groq_client:
-                    try:
-                        # RAG: Build context from dataset.json
-                        country = profile.get('destination_country', 'India')
-                        city = profile.get('destination_city', 'Delhi')
-                        
-                        # Get relevant scams for this country
-                        scams = [s for s in data.get("transport_scams", []) if s.get("country") == country]
-                        scam_context = "\n".join([f"- {s.get('scam_type')}: {s.get('description')} Safety: {s.get('safety_advice', '')}" for s in scams[:3]])
-                        
-                        # Get harassment safety info
-                        harassment = data.get("harassment_safety", [])
-                        harassment_context = "\n".join([f"- {h.get('situation')}: {', '.join(h.get('immediate_actions', [])[:3])}" for h in harassment[:2]])
-                        
-                        # Get cultural guidelines
-                        cultural = next((c for c in data.get("cultural_guidelines", []) if c.get("country") == country), {})
-                        cultural_context = f"Dress: {cultural.get('dress', 'N/A')}. Gestures: {cultural.get('gestures', 'N/A')}. Etiquette: {cultural.get('etiquette', 'N/A')}"
-                        
-                        # Get emergency numbers
-                        emergency = data.get("emergency_numbers", {}).get(country, {})
-                        emergency_context = ", ".join([f"{k}: {v}" for k, v in emergency.items()])
-                        
-                        # Get area warnings
-                        area_warnings = next((a for a in data.get("area_specific_warnings", []) if a.get("location") == city), {})
-                        area_context = f"Avoid: {area_warnings.get('avoid_areas', 'N/A')}. Safe areas: {area_warnings.get('safe_areas', 'N/A')}"
-                        
-                        # Get food safety
-                        food = next((f for f in data.get("food_safety", []) if f.get("country") == country), {})
-                        food_context = food.get("guidelines", "Be cautious with street food")
+            if offline.confidence >= FAST_PATH_CONFIDENCE:
+                show_offline_answer(offline, "Instant answer from local safety data")
+            elif groq_client:
+                try:
+                    messages, prompt_report = build_advice_messages(kb, profile, question)
+                    cache = get_response_cache(kb.fingerprint)
+                    key = advice_cache_key(profile, question, messages)
+                    scope = advice_scope(kb, profile)
+                    record_question(profile, question)
+                    advice = cache.get(key)
+                    similar, score = (None, 0.0) if advice else get_semantic_cache().lookup(scope, question)
+                    if advice:
+                        st.markdown(f'<div class="alert-success">{advice}</div>', unsafe_allow_html=True)
+                        st.caption(f"Instant answer from cache · hit rate {cache.hit_rate:.0%}")
+                    elif similar:
+                        st.markdown(f'<div class="alert-success">{similar}</div>', unsafe_allow_html=True)
+                        st.caption(f"Instant answer to a similar question ({score:.0%} match)")
+                    else:
+                        # Only one LLM call per identical in-flight question; its answer feeds both caches
+                        semantic = get_semantic_cache()
+                        def store_answer(text, usage):
+                            log_usage(prompt_report, usage)
+                            cache.put(key, text)
+                            semantic.add(scope, question, text)
                         
-                        # Build RAG context
-                        rag_context = f"""
-LOCAL SAFETY KNOWLEDGE FOR {city}, {country}:
+                        flights = get_single_flight()
+                        if STREAM_ADVICE:
+                            stream = flights.stream(key, lambda: AdviceStream(groq_client, messages), store_answer)
+                            show_streamed_advice(stream)
+                            shared = not stream.leader
+                        else:
+                            def ask_groq():
+                                text, usage = complete(groq_client, messages)
+                                store_answer(text, usage)
+                                return text
+                            with st.spinner("Analyzing with local knowledge..."):
+                                before = flights.stats["coalesced"]
+                                advice = flights.do(key, ask_groq)
+                                shared = flights.stats["coalesced"] > before
+                            st.markdown(f'<div class="alert-success">{advice}</div>', unsafe_allow_html=True)
+                        if shared:
+                            st.caption(f"Shared a live answer with travellers asking the same question · {flights.stats['coalesced']} calls saved")
+                except CircuitOpenError:
+                    show_offline_answer(offline, "AI is temporarily unavailable - answered from local safety data")
+                except Exception as e:
+                    logging.getLogger("safewander.groq").warning("AI request failed: %s", e)
+                    show_offline_answer(offline, "AI is temporarily unavailable - answered from local safety data")
+            else:
+                show_offline_answer(offline, "Answered from local safety data. Add GROQ_API_KEY to Streamlit secrets for personalised AI advice")
 
-COMMON SCAMS:
-{scam_context}
+# AI Assistant - BM25 retriever over every database.json section, built once per version
+@st.cache_resource
+def _retriever(fingerprint):
+    return Retriever(load_safety_data())
 
-HARASSMENT SAFETY:
-{harassment_context}
+def get_retriever(kb):
+    return _retriever(kb.fingerprint)
 
-CULTURAL GUIDELINES:
-{cultural_context}
+# AI Assistant - build the RAG prompt for a question within the input token budget
+def build_advice_messages(kb, profile, question):
+    # RAG: retrieve the chunks most relevant to the question within the context budget
+    country = profile.get('destination_country', 'India')
+    city = profile.get('destination_city', 'Delhi')
+    chunks = get_retriever(kb).retrieve(country, city, question, budget=RAG_CONTEXT_BUDGET)
+    knowledge = format_chunks(chunks) or "No specific local entries matched this question."
+    
+    # Emergency numbers are always included - they are short and critical
+    emergency = kb.country(country).emergency
+    emergency_context = ", ".join([f"{k}: {v}" for k, v in emergency.items()]) or "N/A"
+    
+    prompt = PromptBuilder(budget=PROMPT_BUDGET)
+    prompt.add("role", "You are SafeWander AI, a travel safety expert.", REQUIRED)
+    prompt.add("profile", f"""USER PROFILE:
+- Gender: {profile.get('gender')}
+- Age: {profile.get('age_range')}
+- Location: {city}, {country}""", HIGH)
+    prompt.add("knowledge", f"LOCAL SAFETY KNOWLEDGE FOR {city}, {country}:\n\n{knowledge}", LOW)
+    prompt.add("emergency", f"EMERGENCY NUMBERS:\n{emergency_context}", REQUIRED)
+    prompt.add("instructions", "Use the above local knowledge to provide specific, actionable safety advice. Reference specific scams, emergency numbers, and local tips when relevant. Keep response concise but helpful.", REQUIRED)
+    return prompt.build(question)
 
-EMERGENCY NUMBERS:
-{emergency_context}
+# AI Assistant - deterministic answers from local data (fast path and fallback)
+@st.cache_resource
+def _offline_engine(fingerprint):
+    kb = load_safety_data()
+    return OfflineAnswerEngine(kb, get_retriever(kb))
 
-AREA SAFETY:
-{area_context}
+def get_offline_engine(kb):
+    return _offline_engine(kb.fingerprint)
 
-FOOD SAFETY:
-{food_context}
-"""
-                        
-                        # System prompt with RAG context
-                        system_prompt = f"""You are SafeWander AI, a travel safety expert. 
+def show_offline_answer(offline, note):
+    st.markdown(offline.text)
+    st.caption(note)
 
-USER PROFILE:
-- Name: {profile.get('name')}
-- Gender: {profile.get('gender')}
-- Age: {profile.get('age_range')}
-- Location: {city}, {country}
-
-{rag_context}
-
-Use the above local knowledge to provide specific, actionable safety advice. Reference specific scams, emergency numbers, and local tips when relevant. Keep response concise but helpful."""
-
-                        response = groq_client.chat.completions.create(
-                            messages=[
-                                {"role": "system", "content": system_prompt},
-                                {"role": "user", "content": question}
-                            ],
-                            model="llama-3.3-70b-versatile",
-                            temperature=0.6,
-                            max_tokens=400
-                        )
-                        advice = response.choices[0].message.content
-                        st.markdown(f'<div class="alert-success">{advice}</div>', unsafe_allow_html=True)
-                    except Exception as e:
-                        st.error(f"AI temporarily unavailable. Please try the other features!")
-                else:
-                    st.warning("Add GROQ_API_KEY to Streamlit secrets for AI features")
+# AI Assistant - answer cache shared by all sessions (LRU + SQLite)
+@st.cache_resource
+def _response_cache():
+    return ResponseCache(ttl=int(os.getenv("SAFEWANDER_CACHE_TTL", DEFAULT_TTL)))
+
+def get_response_cache(kb_version):
+    cache = _response_cache()
+    if cache.kb_version != kb_version:
+        cache.set_kb_version(kb_version)
+    return cache
+
+def advice_cache_key(profile, question, messages):
+    return cache_key(
+        profile.get('destination_country'),
+        profile.get('destination_city'),
+        profile_bucket(profile),
+        question,
+        context_hash(messages[0]["content"]),
+    )
+
+# AI Assistant - paraphrased questions reuse answers from the same city/profile scope
+@st.cache_resource
+def get_semantic_cache():
+    return SemanticCache()
+
+def advice_scope(kb, profile):
+    return (profile.get('destination_country'), profile.get('destination_city'), profile_bucket(profile), kb.fingerprint)
+
+# AI Assistant - optional question log for offline cache benchmarks (python semantic_cache.py LOG)
+QUESTION_LOG = os.getenv("SAFEWANDER_QUESTION_LOG")
+
+def record_question(profile, question):
+    if not QUESTION_LOG:
+        return
+    try:
+        with open(QUESTION_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"city": profile.get('destination_city'), "question": question}) + "\n")
+    except OSError:
+        pass
+
+# AI Assistant - concurrent identical questions share one in-flight Groq call
+@st.cache_resource
+def get_single_flight():
+    return SingleFlight()
+
+# AI Assistant - render tokens as they arrive
+def show_streamed_advice(stream):
+    st.session_state.advice_stream = stream
+    try:
+        st.write_stream(stream)
+    finally:
+        stream.close()
+    if stream.ttft is not None:
+        st.caption(f"First token in {stream.ttft * 1000:.0f} ms · full answer in {stream.total:.1f} s")
+    return stream
+
+def cancel_advice_stream():
+    stream = st.session_state.get('advice_stream')
+    if stream is not None:
+        stream.cancel()
+        st.session_state.advice_stream = None
 
 # Main App
 def main():
-    if not st.session_state.profile_complete:
-        show_quick_profile()
-    else:
-        show_dashboard()
+    timer = st.session_state.rerun_timer = RerunTimer("full")
+    # st.rerun() raises, so persist in finally to also catch state set just before a rerun
+    try:
+        with timer.section("styles"):
+            inject_styles()
+        if not st.session_state.profile_complete:
+            with timer.section("profile"):
+                show_quick_profile()
+        else:
+            show_dashboard()
+    finally:
+        save_session()
+        finish_timer(timer)
 
 if __name__ == "__main__":
     main()
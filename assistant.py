@@ -0,0 +1,88 @@
+import time
+
+# Model settings for the AI Safety Assistant
+MODEL = "llama-3.3-70b-versatile"
+TEMPERATURE = 0.6
+MAX_TOKENS = 400
+
+
+class AdviceStream:
+    """Iterates over completion tokens as they arrive from Groq.
+
+    Records time-to-first-token and total time, and closes the underlying
+    HTTP stream when cancelled (e.g. Streamlit stops the script because the
+    user navigated away mid-answer).
+    """
+
+    def __init__(self, client, messages, model=MODEL, temperature=TEMPERATURE, max_tokens=MAX_TOKENS):
+        self.client = client
+        self.messages = messages
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.started = None
+        self.ttft = None
+        self.total = None
+        self.cancelled = False
+        self.text = ""
+        self.usage = None
+        self._response = None
+
+    def __iter__(self):
+        self.started = time.perf_counter()
+        self._response = self.client.chat.completions.create(
+            messages=self.messages,
+            model=self.model,
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+        )
+        try:
+            for chunk in self._response:
+                if self.cancelled:
+                    break
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                    self.usage = x_groq.usage
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if not token:
+                    continue
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - self.started
+                self.text += token
+                yield token
+        except GeneratorExit:
+            self.cancelled = True
+            raise
+        finally:
+            self.total = time.perf_counter() - self.started
+            self.close()
+
+    def cancel(self):
+        self.cancelled = True
+        self.close()
+
+    def close(self):
+        response, self._response = self._response, None
+        if response is not None and hasattr(response, "close"):
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    @property
+    def completed(self):
+        return self.total is not None and not self.cancelled
+
+
+def complete(client, messages, model=MODEL, temperature=TEMPERATURE, max_tokens=MAX_TOKENS):
+    """Blocking (non-streaming) completion. Returns (text, usage)."""
+    response = client.chat.completions.create(
+        messages=messages,
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+    return response.choices[0].message.content, response.usage
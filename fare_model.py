@@ -0,0 +1,239 @@
+import random
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from geo_index import ROAD_FACTOR, haversine_km
+from price_parser import classify_service
+
+# A flat "per trip" price is taken to cover a typical ride of this length; longer rides scale up
+TYPICAL_TRIP_KM = 5.0
+# Meters charge at least this distance
+MIN_CHARGED_KM = 1.5
+# Late-night rides (local time) may cost up to this much more
+NIGHT_HOURS = (23, 5)
+NIGHT_SURCHARGE = 1.5
+# App cabs can surge at any hour; their upper bound allows for it
+APP_CAB_SURGE = 1.8
+# Average road speed by time of day, for the trip duration shown next to the estimate
+RUSH_HOURS = ((8, 10), (17, 20))
+SPEED_KMH = {"rush": 15.0, "day": 25.0, "night": 35.0}
+
+# Routes are cached on coordinates rounded to ~100 m
+ROUTE_PRECISION = 3
+ROUTE_CACHE_SIZE = 4096
+
+# Closest comparable services, in order, when a city has no tariff of its own
+SIMILAR_SERVICES = {"taxi": ("app_cab",), "app_cab": ("taxi",), "auto": ("tuk_tuk", "taxi"), "tuk_tuk": ("auto", "taxi")}
+
+TIMEZONES = {"India": "Asia/Kolkata", "Thailand": "Asia/Bangkok", "Mexico": "America/Mexico_City",
+             "USA": "America/New_York", "Brazil": "America/Sao_Paulo"}
+CITY_TIMEZONES = {"Cancun": "America/Cancun", "Playa del Carmen": "America/Cancun", "Chicago": "America/Chicago",
+                  "Los Angeles": "America/Los_Angeles", "Las Vegas": "America/Los_Angeles",
+                  "San Francisco": "America/Los_Angeles"}
+
+_RANGE = re.compile(r"(\d[\d,]*(?:\.\d+)?)(?:\s*[-–]\s*[^\d\s]{0,3}\s*(\d[\d,]*(?:\.\d+)?))?")
+_PER_KM = re.compile(r"/\s*km|per\s+km|a\s+km")
+_BASE = re.compile(r"\b(?:base|minimum|flag ?fall)\b")
+# Point-to-point quotes ("$10-15 to hotel zone", "JFK to Manhattan") don't generalise to other trips
+_ROUTE_QUOTE = re.compile(r"\bto\b")
+
+
+@dataclass(frozen=True)
+class Tariff:
+    service: str
+    per_km: tuple = None  # (low, high)
+    base: float = 0.0
+    per_trip: tuple = None  # (low, high) for a TYPICAL_TRIP_KM ride
+    source: str = ""
+
+    def fare(self, km):
+        if self.per_km:
+            charged = max(km, MIN_CHARGED_KM)
+            return self.base + self.per_km[0] * charged, self.base + self.per_km[1] * charged
+        scale = max(1.0, km / TYPICAL_TRIP_KM)
+        return self.per_trip[0] * scale, self.per_trip[1] * scale
+
+
+@dataclass(frozen=True)
+class FareEstimate:
+    low: float
+    high: float
+    km: float
+    minutes: int
+    period: str  # "day", "rush" or "night"
+    tariff: Tariff
+
+    def verdict(self, amount):
+        """"fair", "high" (above the range) or "scam" (more than twice its top)."""
+        if amount > self.high * 2:
+            return "scam"
+        if amount > self.high:
+            return "high"
+        return "fair"
+
+
+def _number(text):
+    return float(text.replace(",", ""))
+
+
+def price_range(text):
+    """(low, high, start) for the first "15-20" / "₹300-800" / "20" in the text, or None."""
+    match = _RANGE.search(text)
+    if match is None:
+        return None
+    low = _number(match.group(1))
+    return low, _number(match.group(2)) if match.group(2) else low, match.start()
+
+
+def parse_rates(text, service=None):
+    """Tariffs from free text like "₹15-20 per km, base fare ₹25" or "Tuk-tuk 100-200฿, Grab 50-150฿".
+
+    Each comma-separated part names its own service, or inherits `service`
+    (the scam entry it came from). Parts for services the app doesn't price
+    (metro, jet ski...) are skipped.
+    """
+    found = {}
+    base = {}
+    for part in re.split(r",|\bor\b", text or ""):
+        part_service = classify_service(part) or service
+        found_range = price_range(part)
+        if part_service is None or found_range is None:
+            continue
+        low, high, _ = found_range
+        lowered = part.lower()
+        if _BASE.search(lowered):
+            base[part_service] = low
+        elif _PER_KM.search(lowered):
+            found[part_service] = {"per_km": (low, high)}
+        elif not _ROUTE_QUOTE.search(lowered) and "flat" not in lowered:
+            found.setdefault(part_service, {"per_trip": (low, high)})
+    return [Tariff(s, base=base.get(s, 0.0), source=text, **kw) for s, kw in found.items()]
+
+
+def local_period(country, city, when=None):
+    """"night", "rush" or "day" at the destination's local time."""
+    try:
+        zone = ZoneInfo(CITY_TIMEZONES.get(city) or TIMEZONES.get(country, "UTC"))
+    except ZoneInfoNotFoundError:
+        zone = None
+    hour = (when or datetime.now(zone)).hour
+    start, end = NIGHT_HOURS
+    if hour >= start or hour < end:
+        return "night"
+    if any(a <= hour < b for a, b in RUSH_HOURS):
+        return "rush"
+    return "day"
+
+
+class FareModel:
+    """Expected fare ranges from per-city tariffs, trip distance and time of day.
+
+    Tariffs are parsed once from database.json: the normal rates quoted in
+    a city's transport scams, then the country-wide price_reference. Route
+    estimates are kept in an LRU keyed on rounded coordinates, service and
+    period, so repeat checks are a dict lookup.
+    """
+
+    def __init__(self, tariffs, cache_size=ROUTE_CACHE_SIZE):
+        self.tariffs = tariffs  # (country, city or None, service) -> Tariff
+        self.cache_size = cache_size
+        self._routes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tariffs)
+
+    def tariff(self, country, city, service):
+        """The most local tariff for the service, or a similar service's; None if there is none."""
+        for candidate in (service, *SIMILAR_SERVICES.get(service, ())):
+            for key in ((country, city, candidate), (country, None, candidate)):
+                found = self.tariffs.get(key)
+                if found is not None:
+                    return found
+        return None
+
+    def estimate_km(self, country, city, service, km, period="day"):
+        tariff = self.tariff(country, city, service)
+        if tariff is None:
+            return None
+        low, high = tariff.fare(km)
+        if period == "night" and tariff.service != "app_cab":
+            high *= NIGHT_SURCHARGE
+        if tariff.service == "app_cab":
+            high *= APP_CAB_SURGE
+        minutes = max(1, round(km / SPEED_KMH[period] * 60))
+        return FareEstimate(round(low), round(high), km, minutes, period, tariff)
+
+    def estimate(self, country, city, service, origin, destination, when=None):
+        """Fare range for a ride between two (lat, lng) points, cached per route."""
+        period = local_period(country, city, when)
+        key = (country, city, service, period,
+               *(round(v, ROUTE_PRECISION) for v in (*origin, *destination)))
+        with self._lock:
+            cached = self._routes.get(key)
+            if cached is not None:
+                self._routes.move_to_end(key)
+                return cached
+        km = haversine_km(*origin, *destination) * ROAD_FACTOR
+        result = self.estimate_km(country, city, service, km, period)
+        with self._lock:
+            self._routes[key] = result
+            if len(self._routes) > self.cache_size:
+                self._routes.popitem(last=False)
+        return result
+
+
+def build_fare_model(index):
+    """FareModel from a knowledge_base.SafetyIndex."""
+    tariffs = {}
+    for country in index.countries:
+        data = index.country(country)
+        for tariff in parse_rates(data.prices.get("transport", "")):
+            tariffs.setdefault((country, None, tariff.service), tariff)
+        for scam in data.transport_scams:
+            service = classify_service(scam.get("scam_type", ""))
+            for tariff in parse_rates(scam.get("normal_rate") or "", service):
+                # "Phuket/Pattaya" applies to both cities
+                for city in (scam.get("location") or "").split("/"):
+                    tariffs.setdefault((country, city.strip(), tariff.service), tariff)
+    return FareModel(tariffs)
+
+
+def load_fare_model():
+    from knowledge_base import load_index
+    return build_fare_model(load_index())
+
+
+def benchmark(count=20_000, routes=500, seed=7):
+    """Random Delhi rides, `routes` distinct ones repeated: cold vs cached estimate time."""
+    rng = random.Random(seed)
+    model = load_fare_model()
+    trips = [((28.6139 + rng.uniform(-0.1, 0.1), 77.2090 + rng.uniform(-0.1, 0.1)),
+              (28.6139 + rng.uniform(-0.1, 0.1), 77.2090 + rng.uniform(-0.1, 0.1)),
+              rng.choice(("auto", "taxi", "app_cab"))) for _ in range(routes)]
+    when = datetime(2024, 1, 1, 14)
+    started = time.perf_counter()
+    for origin, destination, service in trips:
+        model.estimate("India", "Delhi", service, origin, destination, when)
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(count):
+        origin, destination, service = rng.choice(trips)
+        model.estimate("India", "Delhi", service, origin, destination, when)
+    warm = time.perf_counter() - started
+    return {
+        "tariffs": len(model),
+        "routes": routes,
+        "cold_us": round(cold / routes * 1e6, 1),
+        "cached_us": round(warm / count * 1e6, 1),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark(*(int(v) for v in sys.argv[1:3])))
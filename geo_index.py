@@ -0,0 +1,191 @@
+import csv
+import heapq
+import math
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+# Station, hospital and embassy points (kind,country,city,name,lat,lng)
+PLACES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "places.csv")
+
+EARTH_RADIUS_KM = 6371.0088
+# Roads wind: a trip is about this much longer than the straight line between its ends
+ROAD_FACTOR = 1.4
+KINDS = ("police", "hospital", "embassy")
+
+
+@dataclass(frozen=True)
+class Place:
+    kind: str
+    country: str
+    city: str
+    name: str
+    lat: float
+    lng: float
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def format_distance(km):
+    return f"{km * 1000:.0f} m" if km < 1 else f"{km:.1f} km"
+
+
+def _unit_vector(lat, lng):
+    p, l = math.radians(lat), math.radians(lng)
+    return (math.cos(p) * math.cos(l), math.cos(p) * math.sin(l), math.sin(p))
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class KDTree:
+    """Implicit 3-D k-d tree over points on the unit sphere.
+
+    Euclidean (chord) distance between unit vectors is monotonic in the
+    great-circle distance, so nearest neighbours in 3-D are exactly the
+    nearest by haversine, with no special cases at the poles or antimeridian.
+    Ranges of LEAF_SIZE points or fewer are scanned linearly.
+    """
+
+    LEAF_SIZE = 16
+
+    def __init__(self, places):
+        places = list(places)
+        lat = np.radians(np.array([p.lat for p in places], dtype=np.float64))
+        lng = np.radians(np.array([p.lng for p in places], dtype=np.float64))
+        xyz = np.column_stack((np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)))
+        order = np.arange(len(places))
+        self.axes = {}
+        # Iterative to stay clear of the recursion limit on large inputs
+        stack = [(0, len(places))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= self.LEAF_SIZE:
+                continue
+            span = order[lo:hi]
+            coords = xyz[span]
+            axis = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+            mid = (lo + hi) // 2
+            order[lo:hi] = span[np.argpartition(coords[:, axis], mid - lo)]
+            self.axes[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+        self.points = xyz[order].tolist()
+        self.places = [places[i] for i in order]
+
+    def __len__(self):
+        return len(self.places)
+
+    def nearest(self, lat, lng, k=3, max_km=None, accept=None):
+        """Return up to k (distance_km, Place) pairs ordered by distance.
+
+        `accept(place)` optionally filters candidates (e.g. only available
+        responders) without rebuilding the tree.
+        """
+        if not self.places or k <= 0:
+            return []
+        tx, ty, tz = _unit_vector(lat, lng)
+        limit = 2 * math.sin(min(max_km / (2 * EARTH_RADIUS_KM), math.pi / 2)) if max_km else 2.0
+        best = []  # max-heap of (-squared chord, index)
+        bound = limit * limit
+        points, places, axes, leaf = self.points, self.places, self.axes, self.LEAF_SIZE
+
+        def consider(i):
+            nonlocal bound
+            x, y, z = points[i]
+            dist = (x - tx) ** 2 + (y - ty) ** 2 + (z - tz) ** 2
+            if dist <= bound and (accept is None or accept(places[i])):
+                if len(best) < k:
+                    heapq.heappush(best, (-dist, i))
+                elif dist < -best[0][0]:
+                    heapq.heapreplace(best, (-dist, i))
+                if len(best) == k:
+                    bound = min(bound, -best[0][0])
+
+        stack = [(0, len(points))]
+        target = (tx, ty, tz)
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= leaf:
+                for i in range(lo, hi):
+                    consider(i)
+                continue
+            mid = (lo + hi) // 2
+            consider(mid)
+            axis = axes[mid]
+            diff = target[axis] - points[mid][axis]
+            near, far = ((mid + 1, hi), (lo, mid)) if diff > 0 else ((lo, mid), (mid + 1, hi))
+            if diff * diff <= bound:
+                stack.append(far)
+            stack.append(near)
+        ordered = sorted((-d, i) for d, i in best)
+        return [(_chord_to_km(math.sqrt(d)), self.places[i]) for d, i in ordered]
+
+
+class GeoIndex:
+    """One k-d tree per place kind (police, hospital, embassy)."""
+
+    def __init__(self, places):
+        grouped = {}
+        for place in places:
+            grouped.setdefault(place.kind, []).append(place)
+        self.trees = {kind: KDTree(items) for kind, items in grouped.items()}
+
+    def nearest(self, kind, lat, lng, k=3, max_km=None, country=None):
+        """Nearest places of `kind`, optionally only those in `country` (a station across a border is no help)."""
+        tree = self.trees.get(kind)
+        if tree is None:
+            return []
+        accept = (lambda place: place.country == country) if country else None
+        return tree.nearest(lat, lng, k, max_km, accept)
+
+    def __len__(self):
+        return sum(len(tree) for tree in self.trees.values())
+
+
+def load_places(path=PLACES_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return [Place(row["kind"], row["country"], row["city"], row["name"], float(row["lat"]), float(row["lng"]))
+                for row in csv.DictReader(f)]
+
+
+def load_geo_index(path=PLACES_PATH):
+    return GeoIndex(load_places(path))
+
+
+def benchmark(count=200_000, queries=2_000, seed=7):
+    """Build over `count` random points in India's bounding box and time k=3 queries."""
+    rng = random.Random(seed)
+    places = [Place("police", "India", "", f"P{i}", rng.uniform(8, 35), rng.uniform(68, 97)) for i in range(count)]
+    started = time.perf_counter()
+    tree = KDTree(places)
+    build = time.perf_counter() - started
+    timings = []
+    for _ in range(queries):
+        lat, lng = rng.uniform(8, 35), rng.uniform(68, 97)
+        started = time.perf_counter()
+        tree.nearest(lat, lng, 3)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "points": count,
+        "build_s": round(build, 2),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "p99_ms": round(timings[int(len(timings) * 0.99)] * 1000, 3),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from types import SimpleNamespace
+
+import httpx
+from groq import APIConnectionError, APIStatusError, APITimeoutError, AsyncGroq, Groq
+
+logger = logging.getLogger("safewander.groq")
+
+MAX_CONCURRENT = int(os.getenv("SAFEWANDER_GROQ_CONCURRENCY", "16"))
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+REQUEST_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+BREAKER_FAILURES = 5
+BREAKER_COOLDOWN = 30.0
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Groq while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive errors; lets one trial call through after `cooldown`."""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.consecutive = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open":
+                raise CircuitOpenError("Groq circuit open")
+            if state == "half-open":
+                # Only one trial call; everyone else keeps failing fast
+                self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive += 1
+            if self.consecutive >= self.failures:
+                if self.opened_at is None:
+                    logger.warning("circuit opened after %s consecutive failures", self.consecutive)
+                self.opened_at = time.monotonic()
+
+
+def _retryable(error):
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, error=None):
+    """Full-jitter exponential backoff, honouring Retry-After when the server sends it."""
+    hinted = _retry_after(error) if error is not None else None
+    if hinted is not None:
+        return min(hinted, BACKOFF_CAP)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class _GuardedStream:
+    """Holds a concurrency slot until the streamed response is exhausted or closed.
+
+    The breaker hears about the call when the stream ends: a stream that
+    opens and then fails mid-answer is a failure. One the reader closes
+    early (a cancelled answer) counts as neither.
+    """
+
+    def __init__(self, stream, release, breaker):
+        self._stream = stream
+        self._release = release
+        self._breaker = breaker
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        except Exception:
+            self._breaker.record_failure()
+            raise
+        else:
+            self._breaker.record_success()
+        finally:
+            self.close()
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is not None:
+            try:
+                self._stream.close()
+            finally:
+                release()
+
+
+class _AsyncGuardedStream:
+    """_GuardedStream for `acreate`: holds an asyncio slot until the stream ends or is closed."""
+
+    def __init__(self, stream, release, breaker):
+        self._stream = stream
+        self._release = release
+        self._breaker = breaker
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception:
+            self._breaker.record_failure()
+            raise
+        else:
+            self._breaker.record_success()
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        release, self._release = self._release, None
+        if release is not None:
+            try:
+                await self._stream.close()
+            finally:
+                release()
+
+
+class PooledGroq:
+    """Process-wide Groq client with keep-alive pooling, bounded concurrency,
+    jittered retries on 429/5xx and a circuit breaker.
+
+    Exposes `chat.completions.create(...)` like the SDK client so it can be
+    passed anywhere a `Groq` instance is expected. `acreate` is the asyncio
+    variant on an httpx.AsyncClient; each event loop gets its own client and
+    semaphore, since neither can be shared across loops.
+    """
+
+    def __init__(self, api_key, base_url=None, max_concurrent=MAX_CONCURRENT,
+                 max_retries=MAX_RETRIES, breaker=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker()
+        self.limits = httpx.Limits(max_connections=max_concurrent, max_keepalive_connections=max_concurrent)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._async = weakref.WeakKeyDictionary()  # event loop -> (AsyncGroq, asyncio.Semaphore)
+        self.client = Groq(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+            http_client=httpx.Client(limits=self.limits, timeout=REQUEST_TIMEOUT),
+        )
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.breaker.before_call()
+        attempt = 0
+        while True:
+            self._slots.acquire()
+            try:
+                result = self.client.chat.completions.create(**kwargs)
+            except Exception as error:
+                self._slots.release()
+                if not self._should_retry(error, attempt):
+                    raise
+                time.sleep(backoff_delay(attempt, error))
+                attempt += 1
+                continue
+            if kwargs.get("stream"):
+                return _GuardedStream(result, self._slots.release, self.breaker)
+            self._slots.release()
+            self.breaker.record_success()
+            return result
+
+    async def acreate(self, **kwargs):
+        self.breaker.before_call()
+        client, slots = self._async_client()
+        attempt = 0
+        while True:
+            await slots.acquire()
+            try:
+                result = await client.chat.completions.create(**kwargs)
+            except Exception as error:
+                slots.release()
+                if not self._should_retry(error, attempt):
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, error))
+                attempt += 1
+                continue
+            if kwargs.get("stream"):
+                return _AsyncGuardedStream(result, slots.release, self.breaker)
+            slots.release()
+            self.breaker.record_success()
+            return result
+
+    def _should_retry(self, error, attempt):
+        if not _retryable(error):
+            return False
+        if attempt >= self.max_retries:
+            # One failure per call, once its retries are used up
+            self.breaker.record_failure()
+            return False
+        logger.info("retrying Groq call (attempt %s): %s", attempt + 1, error)
+        return True
+
+    def _async_client(self):
+        loop = asyncio.get_running_loop()
+        found = self._async.get(loop)
+        if found is None:
+            client = AsyncGroq(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(limits=self.limits, timeout=REQUEST_TIMEOUT),
+            )
+            found = self._async[loop] = (client, asyncio.Semaphore(self.limits.max_connections))
+        return found
+
+    async def aclose(self):
+        """Close the async client of the running event loop."""
+        found = self._async.pop(asyncio.get_running_loop(), None)
+        if found is not None:
+            await found[0].close()
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+# Default knowledge base shipped with the app
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "database.json")
+
+# Sections in database.json that hold one list entry per country / city
+SCAM_SECTIONS = ("transport_scams", "accommodation_scams", "shopping_scams")
+
+_EMPTY = MappingProxyType({})
+
+
+def _empty():
+    return _EMPTY
+
+
+def freeze(value):
+    """Recursively convert dicts/lists into read-only mappings/tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
+class CountrySlice:
+    """Everything the UI needs for one country, precomputed at load time."""
+    country: str
+    transport_scams: tuple = ()
+    accommodation_scams: tuple = ()
+    shopping_scams: tuple = ()
+    cultural: MappingProxyType = field(default_factory=_empty)
+    food: MappingProxyType = field(default_factory=_empty)
+    emergency: MappingProxyType = field(default_factory=_empty)
+    prices: MappingProxyType = field(default_factory=_empty)
+    area_warnings: MappingProxyType = field(default_factory=_empty)  # city -> warning entry
+    scams_by_city: MappingProxyType = field(default_factory=_empty)  # city -> transport scams
+
+    def area_warning(self, city):
+        return self.area_warnings.get(city, _EMPTY)
+
+    def city_scams(self, city):
+        """Transport scams for a city first, then the rest of the country."""
+        local = self.scams_by_city.get(city, ())
+        return local + tuple(s for s in self.transport_scams if s.get("location") != city)
+
+
+@dataclass(frozen=True)
+class SafetyIndex:
+    """Immutable, pre-indexed view of database.json keyed by country and city."""
+    countries: tuple = ()
+    harassment: tuple = ()
+    by_country: MappingProxyType = field(default_factory=_empty)
+    city_to_country: MappingProxyType = field(default_factory=_empty)
+    fingerprint: str = ""
+    source: str = None
+    raw: MappingProxyType = field(default_factory=_empty, repr=False)
+
+    def country(self, name):
+        """O(1) lookup; unknown countries get an empty slice instead of KeyError."""
+        found = self.by_country.get(name)
+        if found is None:
+            return CountrySlice(country=name)
+        return found
+
+    def country_for_city(self, city):
+        return self.city_to_country.get(city)
+
+    @property
+    def loaded(self):
+        return self.source is not None
+
+
+def _group(entries, key="country"):
+    grouped = {}
+    for entry in entries:
+        grouped.setdefault(entry.get(key), []).append(entry)
+    return grouped
+
+
+def build_index(data, source=None, fingerprint=""):
+    """Build a SafetyIndex from the parsed database.json structure."""
+    data = freeze(data)
+    countries = list(data.get("countries", ()))
+
+    scams = {section: _group(data.get(section, ())) for section in SCAM_SECTIONS}
+    cultural = {c.get("country"): c for c in data.get("cultural_guidelines", ())}
+    food = {f.get("country"): f for f in data.get("food_safety", ())}
+    emergency = data.get("emergency_numbers", _EMPTY)
+    prices = data.get("price_reference", _EMPTY)
+    areas = _group(data.get("area_specific_warnings", ()))
+
+    # Countries that only appear inside a section still get a slice
+    for source_map in (cultural, food, emergency, prices, areas, *scams.values()):
+        for name in source_map:
+            if name and name not in countries:
+                countries.append(name)
+
+    by_country = {}
+    city_to_country = {}
+    for name in countries:
+        transport = tuple(scams["transport_scams"].get(name, ()))
+        area_map = {a.get("location"): a for a in areas.get(name, ())}
+        by_city = {}
+        for scam in transport:
+            by_city.setdefault(scam.get("location"), []).append(scam)
+        for city in list(area_map) + list(by_city):
+            if city:
+                city_to_country.setdefault(city, name)
+        by_country[name] = CountrySlice(
+            country=name,
+            transport_scams=transport,
+            accommodation_scams=tuple(scams["accommodation_scams"].get(name, ())),
+            shopping_scams=tuple(scams["shopping_scams"].get(name, ())),
+            cultural=cultural.get(name, _EMPTY),
+            food=food.get(name, _EMPTY),
+            emergency=emergency.get(name, _EMPTY),
+            prices=prices.get(name, _EMPTY),
+            area_warnings=MappingProxyType(area_map),
+            scams_by_city=MappingProxyType({k: tuple(v) for k, v in by_city.items()}),
+        )
+
+    return SafetyIndex(
+        countries=tuple(countries),
+        harassment=tuple(data.get("harassment_safety", ())),
+        by_country=MappingProxyType(by_country),
+        city_to_country=MappingProxyType(city_to_country),
+        fingerprint=fingerprint,
+        source=source,
+        raw=data,
+    )
+
+
+def file_fingerprint(path=DATA_PATH):
+    """Cheap change detector used as a cache key (mtime + size)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def load_index(path=DATA_PATH):
+    """Read and index database.json. Returns an empty index if the file is missing."""
+    if not os.path.exists(path):
+        return build_index({})
+    with open(path, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw.decode("utf-8"))
+    return build_index(data, source=path, fingerprint=hashlib.sha1(raw).hexdigest())
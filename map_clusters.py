@@ -0,0 +1,162 @@
+import json
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from geo_index import KINDS, PLACES_PATH, Place, load_places
+
+# Quadtree depth of the precomputed Morton codes (zoom 20 is ~30 cm per tile pixel)
+CODE_ZOOM = 20
+# Each tile is split into GRID x GRID cluster cells (64 px cells on 256 px tiles)
+GRID = 4
+CLUSTER_MIN_ZOOM = 3
+# From this zoom up every place is sent as its own marker
+CLUSTER_MAX_ZOOM = 16
+MAX_ZOOM = 19
+TILE_CACHE_SIZE = 2048
+MAX_LAT = 85.05112878
+
+
+def _spread_bits(v):
+    """Interleave zeros between the low 32 bits of v (uint64 array)."""
+    v = v & np.uint64(0xFFFFFFFF)
+    for shift, mask in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF),
+                        (4, 0x0F0F0F0F0F0F0F0F), (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def mercator(lat, lng):
+    """Web Mercator position in [0, 1) x [0, 1) for arrays of degrees."""
+    lat = np.clip(lat, -MAX_LAT, MAX_LAT)
+    x = (np.asarray(lng) + 180.0) / 360.0
+    s = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return np.clip(x, 0, 1 - 1e-12), np.clip(y, 0, 1 - 1e-12)
+
+
+def tile_of(lat, lng, zoom):
+    x, y = mercator(np.array([lat]), np.array([lng]))
+    n = 2 ** zoom
+    return int(x[0] * n), int(y[0] * n)
+
+
+class ClusterTiles:
+    """Zoom-level marker clusters served as small per-tile JSON documents.
+
+    Places are sorted once by their Morton (quadkey) code, so the points of
+    any tile at any zoom are one contiguous slice found by binary search.
+    A tile groups its slice into a GRID x GRID cell grid and sends one
+    feature per cell, so the size of a tile stays bounded however many
+    places it covers. Built tiles are kept in an LRU.
+
+    Feature format: [lat, lng, count, kind, label]. kind is "cluster" for
+    groups, where label summarises the kinds ("3 police, 1 hospital").
+    """
+
+    def __init__(self, places, cache_size=TILE_CACHE_SIZE):
+        places = list(places)
+        lat = np.array([p.lat for p in places], dtype=np.float64)
+        lng = np.array([p.lng for p in places], dtype=np.float64)
+        x, y = mercator(lat, lng)
+        scale = float(2 ** CODE_ZOOM)
+        codes = _spread_bits((x * scale).astype(np.uint64)) | (_spread_bits((y * scale).astype(np.uint64)) << np.uint64(1))
+        order = np.argsort(codes, kind="stable")
+        self.codes = codes[order]
+        self.lat = lat[order]
+        self.lng = lng[order]
+        kind_ids = {kind: i for i, kind in enumerate(KINDS)}
+        self.kinds = np.array([kind_ids.get(places[i].kind, len(KINDS)) for i in order], dtype=np.int64)
+        self.places = [places[i] for i in order]
+        self.cache_size = cache_size
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.places)
+
+    def _slice(self, z, x, y):
+        shift = np.uint64(2 * (CODE_ZOOM - z))
+        key = _spread_bits(np.array([x], dtype=np.uint64)) | (_spread_bits(np.array([y], dtype=np.uint64)) << np.uint64(1))
+        lo = int(np.searchsorted(self.codes, key[0] << shift, side="left"))
+        hi = int(np.searchsorted(self.codes, (key[0] + np.uint64(1)) << shift, side="left"))
+        return lo, hi
+
+    def features(self, z, x, y):
+        if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return []
+        lo, hi = self._slice(z, x, y)
+        if lo == hi:
+            return []
+        if z >= CLUSTER_MAX_ZOOM or hi - lo == 1:
+            return [[p.lat, p.lng, 1, p.kind, p.name] for p in self.places[lo:hi]]
+        cells = self.codes[lo:hi] >> np.uint64(2 * (CODE_ZOOM - z - int(math.log2(GRID))))
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(cells)) + 1))
+        counts = np.diff(np.append(starts, hi - lo))
+        lat_mean = np.add.reduceat(self.lat[lo:hi], starts) / counts
+        lng_mean = np.add.reduceat(self.lng[lo:hi], starts) / counts
+        out = []
+        for i, start in enumerate(starts.tolist()):
+            count = int(counts[i])
+            if count == 1:
+                p = self.places[lo + start]
+                out.append([p.lat, p.lng, 1, p.kind, p.name])
+                continue
+            by_kind = np.bincount(self.kinds[lo + start:lo + start + count], minlength=len(KINDS) + 1)
+            label = ", ".join(f"{n} {kind}" for kind, n in zip(KINDS, by_kind.tolist()) if n)
+            out.append([round(float(lat_mean[i]), 6), round(float(lng_mean[i]), 6), count, "cluster", label])
+        return out
+
+    def tile_json(self, z, x, y):
+        """The tile as a compact JSON string (cached)."""
+        key = (z, x, y)
+        with self._lock:
+            cached = self._tiles.get(key)
+            if cached is not None:
+                self._tiles.move_to_end(key)
+                return cached
+        data = json.dumps(self.features(z, x, y), ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._tiles[key] = data
+            if len(self._tiles) > self.cache_size:
+                self._tiles.popitem(last=False)
+        return data
+
+    def viewport(self, lat, lng, zoom, radius=1):
+        """{"z/x/y": features} for the tiles around a point, to embed in the first page load."""
+        cx, cy = tile_of(lat, lng, zoom)
+        n = 2 ** zoom
+        tiles = {}
+        for x in range(cx - radius, cx + radius + 1):
+            for y in range(max(0, cy - radius), min(n, cy + radius + 1)):
+                tiles[f"{zoom}/{x % n}/{y}"] = self.features(zoom, x % n, y)
+        return tiles
+
+
+def load_cluster_tiles(path=PLACES_PATH):
+    return ClusterTiles(load_places(path))
+
+
+def benchmark(count=200_000, seed=7):
+    """Build over `count` random places in India's bounding box and time tile builds per zoom."""
+    rng = np.random.default_rng(seed)
+    lats, lngs = rng.uniform(8, 35, count), rng.uniform(68, 97, count)
+    kinds = rng.choice(KINDS, count)
+    places = [Place(k, "India", "", f"P{i}", a, b) for i, (k, a, b) in enumerate(zip(kinds, lats, lngs))]
+    started = time.perf_counter()
+    tiles = ClusterTiles(places, cache_size=0)
+    result = {"points": count, "build_s": round(time.perf_counter() - started, 2)}
+    for zoom in (5, 8, 11, 14):
+        x, y = tile_of(21.0, 78.0, zoom)
+        started = time.perf_counter()
+        body = tiles.tile_json(zoom, x, y)
+        result[f"z{zoom}"] = {"ms": round((time.perf_counter() - started) * 1000, 2), "bytes": len(body)}
+    return result
+
+
+if __name__ == "__main__":
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
@@ -0,0 +1,133 @@
+import logging
+import mimetypes
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tile_cache import ASSET_DIR
+
+logger = logging.getLogger("safewander.map_server")
+
+HOST = os.getenv("SAFEWANDER_MAP_HOST", "127.0.0.1")
+PORT = int(os.getenv("SAFEWANDER_MAP_PORT", "8502"))
+# URL the browser uses to reach this server (differs from HOST:PORT behind a proxy). Pages only
+# point at the server when it is set: HOST is this machine, and a remote visitor's localhost is their own
+PUBLIC_URL = os.getenv("SAFEWANDER_MAP_URL")
+
+# Cluster tile and asset URLs are versioned, so they never change once served
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Raster map tiles may be refreshed upstream; let the browser reuse them for a day
+TILE_MAX_AGE = "public, max-age=86400"
+
+CLUSTER_ROUTE = re.compile(r"^/clusters/([\w.-]+)/(\d+)/(\d+)/(\d+)\.json$")
+TILE_ROUTE = re.compile(r"^/tiles/(\d+)/(\d+)/(\d+)\.png$")
+STATIC_PREFIX = "/static/"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "SafeWanderMap/1.0"
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        match = CLUSTER_ROUTE.match(path)
+        if match:
+            self._cluster(match.group(1), *(int(v) for v in match.groups()[1:]))
+            return
+        match = TILE_ROUTE.match(path)
+        if match:
+            self._tile(*(int(v) for v in match.groups()))
+            return
+        if path.startswith(STATIC_PREFIX):
+            self._static(path[len(STATIC_PREFIX):])
+            return
+        self.send_error(404)
+
+    def _cluster(self, version, z, x, y):
+        tiles = self.server.layers.get(version)
+        if tiles is None:
+            self.send_error(404)
+            return
+        self._send(tiles.tile_json(z, x, y).encode("utf-8"), "application/json", IMMUTABLE)
+
+    def _tile(self, z, x, y):
+        # Cached tiles only: fetching on a miss would make this an open bulk proxy for the upstream
+        data = self.server.tile_cache.tile(z, x, y, fetch=False) if self.server.tile_cache is not None else None
+        if data is None:
+            self.send_error(404)
+            return
+        self._send(data, "image/png", TILE_MAX_AGE)
+
+    def _static(self, name):
+        root = os.path.realpath(self.server.asset_dir)
+        target = os.path.realpath(os.path.join(root, name))
+        if not target.startswith(root + os.sep) or not os.path.isfile(target):
+            self.send_error(404)
+            return
+        with open(target, "rb") as f:
+            body = f.read()
+        self._send(body, mimetypes.guess_type(target)[0] or "application/octet-stream", IMMUTABLE)
+
+    def _send(self, body, content_type, cache_control):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", cache_control)
+        # The map runs in a sandboxed srcdoc iframe, whose origin is "null"
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class MapServer:
+    """Small threaded HTTP server the Live Safety Map fetches tiles from.
+
+    Runs in a daemon thread next to Streamlit and serves:
+    - /clusters/<version>/<z>/<x>/<y>.json  marker clusters (see map_clusters)
+    - /tiles/<z>/<x>/<y>.png                seeded raster tiles from the offline TileCache (never fetched)
+    - /static/<path>                        vendored Leaflet and Font Awesome files
+    """
+
+    def __init__(self, host=HOST, port=PORT, public_url=PUBLIC_URL, tile_cache=None, asset_dir=ASSET_DIR):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        # False when browsers were not told how to reach the server (SAFEWANDER_MAP_URL unset)
+        self.public = public_url is not None
+        self.public_url = (public_url or f"http://localhost:{self.httpd.server_address[1]}").rstrip("/")
+        self.httpd.daemon_threads = True
+        self.httpd.layers = {}
+        self.httpd.tile_cache = tile_cache
+        self.httpd.asset_dir = asset_dir
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="map-server", daemon=True)
+        self.thread.start()
+        logger.info("map server listening on %s:%s", host, self.httpd.server_address[1])
+
+    def publish(self, version, tiles):
+        # Only the latest version is kept; old pages fall back to their embedded tiles
+        self.httpd.layers = {version: tiles}
+
+    def cluster_url(self, version):
+        return f"{self.public_url}/clusters/{version}/{{z}}/{{x}}/{{y}}.json"
+
+    def tile_url(self):
+        return f"{self.public_url}/tiles/{{z}}/{{x}}/{{y}}.png"
+
+    def asset_base(self):
+        return f"{self.public_url}/static"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.httpd.tile_cache is not None:
+            self.httpd.tile_cache.close()
+
+
+def start_map_server(host=HOST, port=PORT, public_url=PUBLIC_URL, tile_cache=None):
+    """Start the server, or return None if the port is taken (the map then falls back to CDNs)."""
+    try:
+        return MapServer(host, port, public_url, tile_cache)
+    except OSError as error:
+        logger.warning("map server not started on %s:%s: %s", host, port, error)
+        return None
@@ -0,0 +1,204 @@
+import os
+from dataclasses import dataclass
+
+from retrieval import Retriever
+from semantic_cache import tokenize
+
+# Questions classified at or above this confidence skip the LLM entirely
+FAST_PATH_CONFIDENCE = float(os.getenv("SAFEWANDER_FAST_PATH_CONFIDENCE", "0.85"))
+
+# Keywords per intent as travellers write them, with their weight; common inflections are listed
+# because the stemmer only strips simple suffixes ("mugged" -> "mugg", "mug" -> "mug")
+INTENT_WORDS = {
+    "emergency": {
+        "emergency": 2, "emergencies": 2, "number": 1, "numbers": 1, "call": 1, "police": 1, "ambulance": 2,
+        "hospital": 2, "hospitals": 2, "helpline": 2, "helplines": 2, "hotline": 2, "dial": 2, "phone": 1,
+        "injury": 2, "injured": 2, "accident": 2, "doctor": 1, "fire": 1,
+    },
+    "harassment": {
+        "follow": 2, "following": 2, "followed": 2, "harass": 2, "harassed": 2, "harassing": 2, "harassment": 2,
+        "touch": 2, "touched": 2, "touching": 2, "grope": 2, "groped": 2, "groping": 2, "stalk": 2, "stalked": 2,
+        "stalker": 2, "stalking": 2, "spiked": 2, "spiking": 2, "drink": 1, "drugged": 1, "rob": 2, "robbed": 2,
+        "robbery": 2, "mug": 2, "mugged": 2, "mugging": 2, "stole": 2, "stolen": 2, "theft": 2, "thief": 2,
+        "thieves": 2, "attack": 2, "attacked": 2, "assault": 2, "assaulted": 2, "creep": 1, "creepy": 1,
+        "stare": 1, "staring": 1, "pickpocket": 2, "pickpockets": 2, "pickpocketed": 2,
+    },
+    "scam": {
+        "scam": 2, "scams": 2, "scammed": 2, "overcharge": 2, "overcharged": 2, "overcharging": 2, "fare": 1,
+        "fares": 1, "meter": 2, "taxi": 1, "auto": 1, "rickshaw": 1, "tuk": 1, "uber": 1, "cab": 1, "driver": 1,
+        "price": 1, "prices": 1, "expensive": 1, "cheat": 2, "cheated": 2, "fake": 1, "gem": 2, "gems": 2,
+        "hotel": 1, "tour": 1, "tours": 1, "shop": 1, "shopping": 1, "commission": 2, "rip": 1, "ripped": 1,
+        "tout": 2, "touts": 2,
+    },
+    "food": {
+        "food": 2, "eat": 2, "eating": 2, "street": 1, "water": 1, "drink": 1, "restaurant": 1, "stomach": 2,
+        "sick": 1, "fruit": 1, "meal": 2, "meals": 2, "vegetarian": 1, "diarrhea": 2, "cuisine": 2, "snack": 1,
+        "snacks": 1,
+    },
+    "area": {
+        "area": 2, "areas": 2, "neighborhood": 2, "neighbourhood": 2, "avoid": 1, "walk": 1, "walking": 1,
+        "night": 1, "late": 1, "dark": 1, "metro": 1, "district": 2, "beach": 1, "stay": 1, "staying": 1, "go": 1,
+    },
+}
+
+
+def _stemmed(words):
+    """{stem: weight} as semantic_cache.tokenize emits them; stopwords drop out."""
+    table = {}
+    for word, weight in words.items():
+        for term in tokenize(word):
+            table[term] = max(weight, table.get(term, 0))
+    return table
+
+
+INTENT_KEYWORDS = {intent: _stemmed(words) for intent, words in INTENT_WORDS.items()}
+
+# harassment_safety entries by their "situation", with the words that pick them; BM25 alone can't
+# ("mugged" appears nowhere in the "Street robbery attempt" entry)
+SITUATION_WORDS = {
+    "Being followed": ("follow", "following", "followed", "stalk", "stalked", "stalker", "stalking"),
+    "Unwanted touching/harassment": ("harass", "harassed", "harassing", "harassment", "touch", "touched",
+                                     "touching", "grope", "groped", "groping", "creep", "creepy", "stare",
+                                     "staring"),
+    "Drink spiking concern": ("spiked", "spiking", "drink", "drugged"),
+    "Street robbery attempt": ("rob", "robbed", "robbery", "mug", "mugged", "mugging", "stole", "stolen",
+                               "theft", "thief", "thieves", "attack", "attacked", "assault", "assaulted",
+                               "pickpocket", "pickpockets", "pickpocketed"),
+}
+SITUATION_KEYWORDS = {situation: frozenset(_stemmed(dict.fromkeys(words, 1))) for situation, words
+                      in SITUATION_WORDS.items()}
+
+INTENT_SECTIONS = {
+    "scam": ("transport_scams", "accommodation_scams", "shopping_scams"),
+    "harassment": ("harassment_safety",),
+    "food": ("food_safety", "price_reference"),
+    "area": ("area_specific_warnings",),
+}
+
+
+@dataclass(frozen=True)
+class OfflineAnswer:
+    intent: str
+    confidence: float
+    text: str
+
+
+def classify(question):
+    """Return (intent, confidence) from weighted keyword hits; confidence is the winner's share."""
+    scores = dict.fromkeys(INTENT_KEYWORDS, 0)
+    for term in tokenize(question):
+        for intent, keywords in INTENT_KEYWORDS.items():
+            scores[intent] += keywords.get(term, 0)
+    total = sum(scores.values())
+    if not total:
+        return None, 0.0
+    intent = max(scores, key=scores.get)
+    # A single weak keyword is never enough to be confident
+    confidence = scores[intent] / total if scores[intent] >= 2 else 0.0
+    return intent, confidence
+
+
+def _bullets(items):
+    return "\n".join(f"- {item}" for item in items if item)
+
+
+class OfflineAnswerEngine:
+    """Deterministic answers composed from the indexed knowledge base (no network)."""
+
+    def __init__(self, kb, retriever=None):
+        self.kb = kb
+        self.retriever = retriever or Retriever(kb)
+
+    def answer(self, country, city, question):
+        intent, confidence = classify(question)
+        compose = getattr(self, f"_{intent}", None) if intent else None
+        text = compose(country, city, question) if compose else None
+        if not text:
+            # No entry matched the question itself, so the composed answer can't be trusted to fit it
+            intent, confidence, text = "general", 0.0, self._general(country, city, question)
+        return OfflineAnswer(intent, confidence, text + self._emergency_footer(country, intent))
+
+    def _ranked(self, country, city, question, sections, limit):
+        """Entries in `sections` that share a term with the question, best BM25 score first."""
+        index = self.retriever.index(country)
+        scores = index.scores(question)
+        candidates = [i for i, chunk in enumerate(index.chunks) if chunk.section in sections and scores.get(i)]
+        candidates.sort(key=lambda i: (scores.get(i, 0.0), index.chunks[i].city == city), reverse=True)
+        return [index.chunks[i].entry for i in candidates[:limit]]
+
+    def _emergency(self, country, city, question):
+        numbers = self.kb.country(country).emergency
+        if not numbers:
+            return None
+        lines = [f"**{service.replace('_', ' ').title()}:** {number}" for service, number in numbers.items()]
+        return f"**Emergency numbers in {country}:**\n" + _bullets(lines)
+
+    def _situation(self, question):
+        """The harassment_safety entry whose situation keywords the question hits most, or None."""
+        terms = set(tokenize(question))
+        best, hits = None, 0
+        for entry in self.kb.harassment:
+            found = len(terms & SITUATION_KEYWORDS.get(entry.get("situation"), frozenset()))
+            if found > hits:
+                best, hits = entry, found
+        return best
+
+    def _harassment(self, country, city, question):
+        entry = self._situation(question)
+        if entry is None:
+            entries = self._ranked(country, city, question, INTENT_SECTIONS["harassment"], 1)
+            if not entries:
+                return None
+            entry = entries[0]
+        steps = entry.get("immediate_actions") or entry.get("prevention") or ()
+        text = f"**{entry.get('situation')} - what to do now:**\n{_bullets(steps)}"
+        if entry.get("symptoms"):
+            text += f"\n\n**Watch for:** {entry['symptoms']}"
+        return text
+
+    def _scam(self, country, city, question):
+        scams = self._ranked(country, city, question, INTENT_SECTIONS["scam"], 2)
+        parts = []
+        for scam in scams:
+            lines = [scam.get("description")]
+            if scam.get("normal_rate"):
+                lines.append(f"Normal rate: {scam['normal_rate']}")
+            if scam.get("red_flags"):
+                lines.append(f"Red flags: {', '.join(scam['red_flags'])}")
+            lines.append(scam.get("safety_advice"))
+            where = f" ({scam['location']})" if scam.get("location") else ""
+            parts.append(f"**{scam.get('scam_type', 'Scam')}{where}**\n{_bullets(lines)}")
+        return "\n\n".join(parts) or None
+
+    def _food(self, country, city, question):
+        local = self.kb.country(country)
+        if not local.food:
+            return None
+        tips = [tip.strip().rstrip(".") for tip in local.food.get("guidelines", "").split(". ")]
+        text = f"**Food safety in {country}:**\n{_bullets(tips)}"
+        if local.food.get("safe_options"):
+            text += f"\n\n**Safer choices:** {local.food['safe_options']}"
+        if local.prices.get("food"):
+            text += f"\n\n**Typical prices:** {local.prices['food']}"
+        return text
+
+    def _area(self, country, city, question):
+        area = self.kb.country(country).area_warning(city)
+        if not area:
+            return None
+        return (f"**Area safety in {city}:**\n"
+                + _bullets([f"Avoid: {area.get('avoid_areas', 'N/A')}",
+                            f"Safer areas: {area.get('safe_areas', 'N/A')}",
+                            f"Timing: {area.get('timing', 'N/A')}"]))
+
+    def _general(self, country, city, question):
+        chunks = self.retriever.retrieve(country, city, question, budget=250)
+        if not chunks:
+            return f"No specific local entries for {city}, {country}. Stay in busy, well-lit areas and keep emergency numbers handy."
+        return "**From our local safety data:**\n" + "\n".join(chunk.text for chunk in chunks)
+
+    def _emergency_footer(self, country, intent):
+        if intent == "emergency":
+            return ""
+        police = self.kb.country(country).emergency.get("police")
+        return f"\n\n**In danger? Call police: {police}**" if police else ""
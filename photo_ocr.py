@@ -0,0 +1,187 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from price_parser import parse_query
+
+logger = logging.getLogger("safewander.ocr")
+
+# Tesseract language packs (packages.txt) for each destination's signs and menus; English is always added
+OCR_LANGUAGES = {"India": ("hin",), "Thailand": ("tha",), "Mexico": ("spa",), "USA": (), "Brazil": ("por",)}
+
+# Photos are downscaled so the longer side is at most this many pixels: phone photos are 3-4x
+# larger than tesseract needs for menu-sized text, and its run time grows with the area
+MAX_SIDE = 1600
+MAX_UPLOAD_BYTES = 15 * 1024 * 1024
+# Page segmentation: fully automatic, which handles menus and boards with several columns
+PAGE_SEGMENTATION = "3"
+OCR_TIMEOUT = 60
+
+WORKERS = 2
+CACHE_SIZE = 128
+
+# Lines with a price that are checked against the scam checker, top to bottom
+MAX_PRICE_LINES = 12
+# Numbers on boards that aren't prices: phone numbers, opening hours, dates
+_NOT_PRICE = re.compile(
+    r"\b(?:tel|phone|call|hotline|whatsapp|open|hours)\b|โทร|\d{1,2}[:.]\d{2}\s*(?:[-–]|am|pm|hrs?\b)"
+    r"|\d{2,4}[\s-]\d{3}[\s-]\d{3,4}|\d{1,2}/\d{1,2}/\d{2,4}", re.I)
+
+
+@dataclass(frozen=True)
+class OcrText:
+    text: str
+    languages: tuple
+    width: int  # of the downscaled image tesseract read
+    height: int
+    seconds: float
+
+    @property
+    def lines(self):
+        return [line.strip() for line in self.text.splitlines() if line.strip()]
+
+
+def prepare_image(data, max_side=MAX_SIDE):
+    """Upright, grayscale, downscaled PNG bytes and their size. Runs in the worker process."""
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert("L")
+        image.thumbnail((max_side, max_side))
+        out = io.BytesIO()
+        image.save(out, format="PNG")
+        return out.getvalue(), image.size
+
+
+def read_image(data, languages, tesseract, max_side=MAX_SIDE):
+    """OCR one photo: downscale, then pipe it through the tesseract CLI. Runs in the worker process."""
+    started = time.perf_counter()
+    png, (width, height) = prepare_image(data, max_side)
+    command = [tesseract, "stdin", "stdout", "-l", "+".join(languages), "--psm", PAGE_SEGMENTATION]
+    done = subprocess.run(command, input=png, capture_output=True, check=True, timeout=OCR_TIMEOUT)
+    return OcrText(done.stdout.decode("utf-8", "replace"), tuple(languages), width, height,
+                   time.perf_counter() - started)
+
+
+def installed_languages(tesseract):
+    try:
+        done = subprocess.run([tesseract, "--list-langs"], capture_output=True, check=True, timeout=10)
+    except (OSError, subprocess.SubprocessError) as error:
+        logger.warning("could not list tesseract languages: %s", error)
+        return frozenset()
+    # The first line is a header ("List of available languages ...")
+    return frozenset(line.strip() for line in done.stdout.decode().splitlines()[1:] if line.strip())
+
+
+def image_key(data, languages):
+    return f"{hashlib.sha256(data).hexdigest()}:{'+'.join(languages)}"
+
+
+class PhotoReader:
+    """Tesseract OCR in a process pool, deduplicated and cached by image hash.
+
+    `submit` returns at once with a Future: decoding, downscaling and
+    tesseract all run in worker processes, so neither the script thread nor
+    other sessions wait on the GIL. The same photo uploaded again (by anyone)
+    gets the cached result, or joins the job already running for it.
+    """
+
+    def __init__(self, workers=WORKERS, cache_size=CACHE_SIZE, tesseract=None, max_side=MAX_SIDE):
+        self.tesseract = tesseract or shutil.which("tesseract")
+        self.installed = installed_languages(self.tesseract) if self.tesseract else frozenset()
+        self.workers = workers
+        self.cache_size = cache_size
+        self.max_side = max_side
+        self._pool = None
+        self._jobs = OrderedDict()  # image key -> Future
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return bool(self.tesseract and "eng" in self.installed)
+
+    def languages(self, country):
+        return tuple(lang for lang in ("eng", *OCR_LANGUAGES.get(country, ())) if lang in self.installed)
+
+    def submit(self, data, country):
+        """(image key, Future of OcrText) for a photo; finished and running jobs are reused."""
+        languages = self.languages(country)
+        key = image_key(data, languages)
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                self._jobs.move_to_end(key)
+                return key, future
+            if self._pool is None:
+                # Spawned, not forked: the Streamlit process has threads a fork would copy mid-state
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            future = self._jobs[key] = self._pool.submit(read_image, data, languages, self.tesseract, self.max_side)
+            while len(self._jobs) > self.cache_size:
+                self._jobs.popitem(last=False)
+        return key, future
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def price_lines(text, country, limit=MAX_PRICE_LINES):
+    """OCR lines that quote a price ("Pad Thai 60", "Airport ... ₹450"), for the scam checker."""
+    found = []
+    for line in text.splitlines():
+        line = line.strip()
+        if len(line) < 2 or _NOT_PRICE.search(line) or parse_query(line, country).amount is None:
+            continue
+        found.append(line)
+        if len(found) >= limit:
+            break
+    return found
+
+
+def related_chunks(bm25, text, sections, limit=2):
+    """The retrieval chunks in `sections` (e.g. cultural guidelines) that best match the OCR text."""
+    scores = bm25.scores(text)
+    ranked = sorted((doc_id for doc_id in scores if bm25.chunks[doc_id].section in sections),
+                    key=scores.get, reverse=True)
+    return [bm25.chunks[doc_id] for doc_id in ranked[:limit]]
+
+
+def benchmark(path, country="India", repeat=3):
+    """Time OCR of one photo cold (worker start + tesseract) and again from the cache."""
+    with open(path, "rb") as f:
+        data = f.read()
+    reader = PhotoReader()
+    if not reader.available:
+        return {"error": "tesseract with the eng language pack is not installed"}
+    started = time.perf_counter()
+    result = reader.submit(data, country)[1].result()
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(repeat):
+        reader.submit(data, country)[1].result()
+    cached = (time.perf_counter() - started) / repeat
+    reader.close()
+    return {
+        "languages": "+".join(result.languages),
+        "size": f"{result.width}x{result.height}",
+        "ocr_s": round(result.seconds, 2),
+        "cold_s": round(cold, 2),
+        "cached_ms": round(cached * 1000, 3),
+        "lines": len(result.lines),
+        "price_lines": price_lines(result.text, country),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python photo_ocr.py PHOTO [COUNTRY]")
+    print(benchmark(*sys.argv[1:3]))
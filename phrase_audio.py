@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tile_cache import ASSET_DIR
+
+logger = logging.getLogger("safewander.phrases")
+
+# Rendered clips live under the map server's /static root, at /static/phrases/<hash>.mp3
+AUDIO_DIR = os.path.join(ASSET_DIR, "phrases")
+
+# espeak-ng voice for language codes where it isn't just the language ("es-419" for Latin American Spanish)
+VOICES = {"es-MX": "es-419", "en-US": "en-us", "pt-BR": "pt-br"}
+# Words per minute; slower than espeak's 175 so travellers can repeat along (the browser used rate 0.7)
+SPEED_WPM = 130
+# Mono speech compresses well at low bitrates: a phrase is a few KB
+BITRATE = "32k"
+SAMPLE_RATE = 22050
+# Part of every file name, so changing the engine settings re-renders everything
+RENDER_VERSION = f"espeak-ng/{SPEED_WPM}/{BITRATE}/{SAMPLE_RATE}"
+RENDER_TIMEOUT = 30
+WORKERS = 4
+
+HASH_LENGTH = 16
+
+
+def spoken_text(phrase):
+    """What the engine reads: the native script (first form of "Obrigado/a"), or the romanized form."""
+    return phrase.script.split("/")[0] if phrase.script else phrase.local
+
+
+def voice(lang):
+    return VOICES.get(lang) or lang.split("-")[0].lower()
+
+
+def audio_name(text, lang):
+    """Content-addressed file name: the same phrase and voice always map to the same cacheable URL."""
+    key = f"{RENDER_VERSION}|{lang}|{text}".encode("utf-8")
+    return f"{hashlib.sha256(key).hexdigest()[:HASH_LENGTH]}.mp3"
+
+
+class PhraseAudio:
+    """Offline pronunciations, rendered once with espeak-ng and encoded to mp3 with ffmpeg.
+
+    Rendering is a build step (`python phrase_audio.py`) or a background job
+    started by the app; lookups only check whether a file exists. With
+    either tool missing nothing is rendered and the page falls back to the
+    browser's speech synthesis.
+    """
+
+    def __init__(self, audio_dir=AUDIO_DIR, espeak=None, ffmpeg=None):
+        self.audio_dir = audio_dir
+        self.espeak = espeak or shutil.which("espeak-ng") or shutil.which("espeak")
+        self.ffmpeg = ffmpeg or shutil.which("ffmpeg")
+
+    @property
+    def available(self):
+        return bool(self.espeak and self.ffmpeg)
+
+    def path(self, text, lang):
+        return os.path.join(self.audio_dir, audio_name(text, lang))
+
+    def rendered(self, text, lang):
+        """Path under the /static root ("phrases/<hash>.mp3") if the clip exists, else None."""
+        name = audio_name(text, lang)
+        if os.path.exists(os.path.join(self.audio_dir, name)):
+            return f"{os.path.basename(self.audio_dir)}/{name}"
+        return None
+
+    def render(self, text, lang):
+        """Render one clip unless it already exists. Returns its path, or None on failure."""
+        target = self.path(text, lang)
+        if os.path.exists(target):
+            return target
+        if not self.available:
+            return None
+        os.makedirs(self.audio_dir, exist_ok=True)
+        partial = f"{target}.{os.getpid()}.tmp"
+        speak = [self.espeak, "-v", voice(lang), "-s", str(SPEED_WPM), "--stdout", text]
+        encode = [self.ffmpeg, "-nostdin", "-loglevel", "error", "-y", "-i", "pipe:0",
+                  "-ac", "1", "-ar", str(SAMPLE_RATE), "-b:a", BITRATE, "-f", "mp3", partial]
+        try:
+            wav = subprocess.run(speak, capture_output=True, check=True, timeout=RENDER_TIMEOUT).stdout
+            subprocess.run(encode, input=wav, capture_output=True, check=True, timeout=RENDER_TIMEOUT)
+            os.replace(partial, target)
+        except (OSError, subprocess.SubprocessError) as error:
+            logger.warning("could not render %r (%s): %s", text, lang, error)
+            if os.path.exists(partial):
+                os.remove(partial)
+            return None
+        return target
+
+    def render_all(self, index, languages=None, workers=WORKERS):
+        """Render every missing clip in a phrases.PhraseIndex, optionally only for `languages`.
+
+        Returns {"rendered", "failed"}.
+        """
+        jobs = [(spoken_text(p), p.lang) for p in index.phrases if not languages or p.lang in languages]
+        # espeak and ffmpeg do the work in their own processes, so threads are enough to overlap them
+        with ThreadPoolExecutor(workers) as pool:
+            results = list(pool.map(lambda job: self.render(*job), jobs))
+        return {"rendered": sum(1 for r in results if r), "failed": sum(1 for r in results if not r)}
+
+
+if __name__ == "__main__":
+    from phrases import load_phrase_index
+    audio = PhraseAudio()
+    if not audio.available:
+        sys.exit("espeak-ng and ffmpeg are needed to render phrase audio (see packages.txt)")
+    index = load_phrase_index()
+    # Arguments are countries ("Thailand") or language codes ("th-TH")
+    languages = {index.countries.get(arg, arg) for arg in sys.argv[1:]}
+    started = time.perf_counter()
+    stats = audio.render_all(index, languages)
+    print({**stats, "seconds": round(time.perf_counter() - started, 1), "dir": audio.audio_dir})
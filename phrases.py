@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from types import MappingProxyType
+
+# Phrase book shipped with the app: languages, the language spoken in each country, and phrase rows
+PHRASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrases.json")
+# Layout of phrases.json this code reads; bump it with any change to the row format
+FORMAT_VERSION = 1
+
+# Fallback language for countries phrases.json doesn't list
+DEFAULT_LANGUAGE = "en-US"
+
+CATEGORIES = ("emergency", "police", "medical", "allergy", "transport", "basics", "shopping", "food")
+CATEGORY_LABELS = {
+    "emergency": "Emergency", "police": "Police", "medical": "Medical", "allergy": "Allergies",
+    "transport": "Transport", "basics": "Basics", "shopping": "Bargaining", "food": "Food & drink",
+}
+
+
+@dataclass(frozen=True)
+class Phrase:
+    id: int
+    lang: str  # BCP 47 code, as the browser's Web Speech API expects
+    local: str  # romanized
+    script: str  # native script
+    meaning: str
+    category: str
+
+
+def fold(text):
+    """Lowercase and drop accents from Latin letters ("Policía" -> "policia").
+
+    Combining marks after non-Latin letters are kept: in Devanagari and
+    Thai they are vowel signs, not accents.
+    """
+    out = []
+    for ch in unicodedata.normalize("NFKD", text.casefold()):
+        if unicodedata.combining(ch) and out and out[-1] <= "ɏ":
+            continue
+        out.append(ch)
+    return unicodedata.normalize("NFC", "".join(out))
+
+
+def terms(text):
+    """Words of letters, digits and marks (\\w alone splits Devanagari and Thai at their vowel signs)."""
+    words, current = [], []
+    for ch in fold(text):
+        if ch.isalnum() or unicodedata.category(ch).startswith("M"):
+            current.append(ch)
+        elif current:
+            words.append("".join(current))
+            current = []
+    if current:
+        words.append("".join(current))
+    return words
+
+
+class PhraseIndex:
+    """Every phrase in one tuple, with id lists per language and category and a term index for search.
+
+    Id lists are compact arrays in file order. Each language has its own
+    sorted vocabulary and postings, so a search only touches that language:
+    each query term is looked up as a prefix ("allerg" finds "allergic"),
+    the postings are intersected and filtered by category.
+    """
+
+    def __init__(self, phrases, countries, language_names, fingerprint=""):
+        self.phrases = tuple(phrases)
+        self.countries = MappingProxyType(dict(countries))  # country -> language
+        self.language_names = MappingProxyType(dict(language_names))
+        self.fingerprint = fingerprint
+        by_language, by_category, postings = {}, {}, {}
+        for phrase in self.phrases:
+            by_language.setdefault(phrase.lang, array("I")).append(phrase.id)
+            by_category.setdefault((phrase.lang, phrase.category), array("I")).append(phrase.id)
+            text = " ".join((phrase.local, phrase.script, phrase.meaning, phrase.category,
+                             CATEGORY_LABELS.get(phrase.category, "")))
+            language_postings = postings.setdefault(phrase.lang, {})
+            for term in set(terms(text)):
+                language_postings.setdefault(term, array("I")).append(phrase.id)
+        self.by_language = MappingProxyType(by_language)
+        self.by_category = MappingProxyType(by_category)
+        self.postings = MappingProxyType(postings)  # language -> term -> ids
+        self.vocabulary = MappingProxyType({lang: tuple(sorted(p)) for lang, p in postings.items()})
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def language(self, country):
+        return self.countries.get(country, DEFAULT_LANGUAGE)
+
+    def categories(self, lang):
+        """Categories that have phrases in `lang`, in display order."""
+        return [c for c in CATEGORIES if (lang, c) in self.by_category]
+
+    def _matching(self, lang, prefix):
+        vocabulary, postings = self.vocabulary.get(lang, ()), self.postings.get(lang, {})
+        found = set()
+        for position in range(bisect_left(vocabulary, prefix), len(vocabulary)):
+            term = vocabulary[position]
+            if not term.startswith(prefix):
+                break
+            found.update(postings[term])
+        return found
+
+    def search(self, lang, query="", category=None):
+        """Ids of the phrases in `lang` matching every query term and the category, in file order."""
+        scope = self.by_category.get((lang, category), ()) if category else self.by_language.get(lang, ())
+        words = terms(query or "")
+        if not words:
+            return tuple(scope)
+        matched = None
+        for word in words:
+            found = self._matching(lang, word)
+            matched = found if matched is None else matched & found
+            if not matched:
+                return ()
+        return tuple(i for i in scope if i in matched)
+
+    def find(self, lang, text, limit=5):
+        """Phrases in `lang` whose native script or romanized form appears in `text` (e.g. a sign's OCR)."""
+        words = " " + " ".join(terms(text)) + " "
+        found = []
+        for phrase in self.get(self.by_language.get(lang, ())):
+            for form in (phrase.script, phrase.local):
+                needle = " ".join(terms(form))
+                if len(needle) < 3:
+                    continue
+                # Thai has no spaces between words, so only Latin forms need whole-word matches
+                latin = all(ch <= "ɏ" for ch in needle)
+                if (f" {needle} " in words) if latin else (needle in words):
+                    found.append(phrase)
+                    break
+            if len(found) >= limit:
+                break
+        return found
+
+    def get(self, ids):
+        return [self.phrases[i] for i in ids]
+
+    def page(self, ids, number, size):
+        """(phrases on page `number`, clamped to the last page, and the page count)."""
+        pages = max(1, -(-len(ids) // size))
+        number = min(max(number, 0), pages - 1)
+        return self.get(ids[number * size:(number + 1) * size]), number, pages
+
+
+def build_phrase_index(data, fingerprint=""):
+    version = data.get("version")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"phrases.json has format version {version}, expected {FORMAT_VERSION}")
+    fields = data.get("fields", ["local", "script", "meaning", "category"])
+    phrases, names = [], {}
+    for lang, entry in data.get("languages", {}).items():
+        names[lang] = entry.get("name", lang)
+        for row in entry.get("phrases", []):
+            values = dict(zip(fields, row))
+            phrases.append(Phrase(len(phrases), lang, values["local"], values.get("script") or values["local"],
+                                  values.get("meaning", ""), values.get("category", "basics")))
+    return PhraseIndex(phrases, data.get("countries", {}), names, fingerprint)
+
+
+def load_phrase_index(path=PHRASES_PATH):
+    """Read and index phrases.json. Returns an empty index if the file is missing."""
+    if not os.path.exists(path):
+        return build_phrase_index({"version": FORMAT_VERSION})
+    with open(path, "rb") as f:
+        raw = f.read()
+    return build_phrase_index(json.loads(raw.decode("utf-8")), hashlib.sha1(raw).hexdigest())
+
+
+def benchmark(languages=40, per_language=400, queries=5_000, seed=7):
+    """Build and search time on a synthetic phrase book of languages x per_language phrases."""
+    rng = random.Random(seed)
+    words = [w for p in load_phrase_index().phrases for w in terms(p.meaning)] or ["help"]
+    data = {"version": FORMAT_VERSION, "languages": {
+        f"l{n}": {"phrases": [[f"p{n}-{i}", "", " ".join(rng.choices(words, k=4)), rng.choice(CATEGORIES)]
+                              for i in range(per_language)]}
+        for n in range(languages)
+    }}
+    started = time.perf_counter()
+    index = build_phrase_index(data)
+    built = time.perf_counter() - started
+    started = time.perf_counter()
+    hits = 0
+    for _ in range(queries):
+        lang = f"l{rng.randrange(languages)}"
+        hits += len(index.search(lang, rng.choice(words)[:4], rng.choice((None, *CATEGORIES))))
+    searched = time.perf_counter() - started
+    return {
+        "phrases": len(index),
+        "terms": sum(len(v) for v in index.vocabulary.values()),
+        "build_ms": round(built * 1000, 1),
+        "search_us": round(searched / queries * 1e6, 1),
+        "avg_hits": round(hits / queries, 1),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark(*(int(v) for v in sys.argv[1:3])))
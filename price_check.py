@@ -0,0 +1,238 @@
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+
+from fare_model import TYPICAL_TRIP_KM, price_range
+from price_parser import KeywordTrie, normalize, parse_query
+
+# Rides are priced by the fare model; everything else against price_reference
+RIDE_SERVICES = ("taxi", "app_cab", "auto", "tuk_tuk")
+CATEGORIES = ("transport", "accommodation", "food", "shopping", "tours")
+
+# What a price is being asked for. Keys are reference items, grouped by category
+ITEMS = {
+    "hostel": "accommodation", "hotel": "accommodation",
+    "street_food": "food", "restaurant": "food", "water": "food",
+    "gems": "shopping", "tailor": "shopping", "pharmacy": "shopping", "photo": "shopping", "beach_vendor": "shopping",
+}
+ITEM_LABELS = {
+    "hostel": "Hostel bed", "hotel": "Hotel room", "street_food": "Street food", "restaurant": "Restaurant meal",
+    "water": "Water", "gems": "Gems/jewellery", "tailor": "Tailor/suit", "pharmacy": "Pharmacy",
+    "photo": "Photo with characters", "beach_vendor": "Beach vendor",
+}
+ITEM_KEYWORDS = {
+    "hostel": ("hostel", "dorm", "dorm bed", "bunk", "albergue", "hostal", "โฮสเทล"),
+    "hotel": ("hotel", "budget hotel", "room", "guesthouse", "guest house", "resort", "homestay", "airbnb", "vrbo",
+              "pousada", "posada", "cuarto", "habitación", "quarto", "โรงแรม", "ห้อง", "होटल", "कमरा", "lodge"),
+    "street_food": ("street", "street food", "stall", "snack", "snacks", "chai", "samosa", "tacos", "taco", "fast food",
+                    "pad thai", "som tam", "pastel", "coxinha", "burger", "hot dog", "อาหาร"),
+    "restaurant": ("restaurant", "meal", "dinner", "lunch", "menu", "thali", "restaurante", "ร้านอาหาร", "खाना"),
+    "water": ("water", "bottle of water", "water bottle", "agua", "água", "น้ำ", "น้ำเปล่า", "पानी"),
+    "gems": ("gem", "gems", "gemstone", "jewel", "jewels", "jewelry", "jewellery", "sapphire", "ruby", "emerald",
+             "gem shop", "พลอย"),
+    "tailor": ("tailor", "suit", "suits", "custom suit", "ตัดสูท"),
+    "pharmacy": ("pharmacy", "farmacia", "farmácia", "medicine", "medication", "pills", "drugs"),
+    "photo": ("photo", "photos", "picture", "selfie", "character", "characters", "costume"),
+    "beach_vendor": ("beach vendor", "vendor", "vendors", "coconut", "caipirinha", "beach chair"),
+}
+ITEM_TRIE = KeywordTrie((kw, item) for item, words in ITEM_KEYWORDS.items() for kw in words)
+# With several matches ("hotel restaurant", "street vendor") the most specific item wins
+_ITEM_RANK = {item: rank for rank, item in enumerate(
+    ("gems", "tailor", "pharmacy", "photo", "hostel", "water", "beach_vendor", "restaurant", "street_food", "hotel"))}
+
+# Prices that count for one night / one person
+PER_NIGHT = ("hostel", "hotel")
+PER_PERSON = ("hostel", "street_food", "restaurant", "water", "photo")
+
+SCAM_FACTOR = 2.0
+
+
+def classify_item(text):
+    found = [value for _, _, value in ITEM_TRIE.scan(normalize(text))]
+    return min(found, key=_ITEM_RANK.get) if found else None
+
+
+@dataclass(frozen=True)
+class Reference:
+    item: str
+    low: float = None
+    high: float = None
+    source: str = ""
+    # Scam entries from database.json that mention this item, most relevant first
+    scams: tuple = ()
+
+
+@dataclass(frozen=True)
+class PriceCheck:
+    category: str  # None when the query doesn't say what the price is for
+    item: str  # a reference item, or a ride service for transport
+    verdict: str  # "fair", "high", "scam", "warning" (known scam, no price range) or "unknown"
+    amount: float = None
+    unit_amount: float = None  # amount per night / person when the query says how many
+    low: float = None
+    high: float = None
+    source: str = ""  # the price_reference text the range came from
+    scams: tuple = ()
+    estimate: object = None  # fare_model.FareEstimate for rides
+    currency: str = None
+    # > 0 when low/high are live traveller-reported quantiles instead of the static reference
+    live_count: int = 0
+
+    @property
+    def observed_value(self):
+        """What gets aggregated across travellers: the per-night/person price, or per km for rides."""
+        if self.unit_amount is None:
+            return None
+        return self.unit_amount / self.estimate.km if self.estimate is not None else self.unit_amount
+
+    def with_quantiles(self, quantiles):
+        """Re-judge against live p10-p90 (per km for rides, scaled to this trip).
+
+        The static reference stays the ceiling: reports can narrow the range,
+        but never make a price above it look fair.
+        """
+        if quantiles is None or self.unit_amount is None:
+            return self
+        scale = self.estimate.km if self.estimate is not None else 1.0
+        low, high = round(quantiles.p10 * scale), round(quantiles.p90 * scale)
+        if self.high is not None:
+            high = min(high, self.high)
+            low = min(low, high)
+        return replace(self, low=low, high=high, verdict=judge(self.unit_amount, low, high), live_count=quantiles.count)
+
+
+def judge(amount, low, high):
+    if amount > high * SCAM_FACTOR:
+        return "scam"
+    if amount > high:
+        return "high"
+    return "fair"
+
+
+def _mentions(scam):
+    text = " ".join(str(scam.get(k, "")) for k in ("scam_type", "description"))
+    return {item for _, _, item in ITEM_TRIE.scan(normalize(text))}
+
+
+def build_reference_table(country_slice):
+    """{item: Reference} for one country: price_reference ranges plus every scam that mentions the item."""
+    ranges = {}
+    for category in ("food", "accommodation"):
+        text = country_slice.prices.get(category, "")
+        for part in re.split(r",", text):
+            found = price_range(part)
+            item = classify_item(part[:found[2]]) if found else None
+            if item is not None:
+                ranges.setdefault(item, (found[0], found[1], part.strip()))
+    mentions = {}
+    sections = (country_slice.shopping_scams, country_slice.accommodation_scams, country_slice.transport_scams)
+    for scams in sections:
+        for scam in scams:
+            for item in _mentions(scam):
+                mentions.setdefault(item, []).append(scam)
+    # Accommodation scams concern every kind of stay even when they only say "hotel"
+    for item in PER_NIGHT:
+        for scam in country_slice.accommodation_scams:
+            if scam not in mentions.get(item, ()):
+                mentions.setdefault(item, []).append(scam)
+    table = {}
+    for item in ITEMS:
+        low, high, source = ranges.get(item, (None, None, ""))
+        table[item] = Reference(item, low, high, source, tuple(mentions.get(item, ())))
+    return MappingProxyType(table)
+
+
+class PriceIndex:
+    """Per-country reference tables for every price category, built once per data version.
+
+    A check is one parse of the query, a dict lookup and a comparison; rides
+    are handed to the fare model, whose route estimates are cached.
+    """
+
+    def __init__(self, safety_index, fare_model):
+        self.fare_model = fare_model
+        self.tables = MappingProxyType({
+            country: build_reference_table(safety_index.country(country)) for country in safety_index.countries
+        })
+
+    def reference(self, country, item):
+        return self.tables.get(country, MappingProxyType({})).get(item)
+
+    def check(self, query, country, city, fare=None):
+        """Judge the price in `query`. `fare(service, parsed)` returns a FareEstimate for rides."""
+        parsed = parse_query(query, country)
+        return replace(self._check(parsed, query, country, city, fare), currency=parsed.currency)
+
+    def _check(self, parsed, query, country, city, fare):
+        item = classify_item(query)
+        service = parsed.service
+        # "tuk-tuk to the gem shop 20000" is about the gems; "hotel taxi 500" is a ride
+        if service in RIDE_SERVICES and (item is None or ITEMS[item] != "shopping"):
+            return self._check_ride(parsed, service, country, city, fare)
+        if item is None and service == "hotel":
+            item = "hotel"
+        if item is None:
+            if service is None:
+                # A bare amount ("SIM card 500") can't be judged against any one reference
+                return PriceCheck(None, None, "unknown", parsed.amount)
+            return PriceCheck("tours", service, "unknown", parsed.amount, parsed.amount)
+        reference = self.reference(country, item)
+        scams = reference.scams if reference else ()
+        if parsed.amount is None:
+            return PriceCheck(ITEMS[item], item, "unknown", scams=scams)
+        unit_amount = parsed.amount
+        if item in PER_NIGHT and parsed.quantities.get("nights"):
+            unit_amount /= parsed.quantities["nights"]
+        if item in PER_PERSON and parsed.quantities.get("people"):
+            unit_amount /= parsed.quantities["people"]
+        if reference is None or reference.high is None:
+            verdict = "warning" if scams else "unknown"
+            return PriceCheck(ITEMS[item], item, verdict, parsed.amount, unit_amount, scams=scams)
+        return PriceCheck(ITEMS[item], item, judge(unit_amount, reference.low, reference.high), parsed.amount,
+                          unit_amount, reference.low, reference.high, reference.source, scams)
+
+    def _check_ride(self, parsed, service, country, city, fare):
+        if parsed.amount is None:
+            return PriceCheck("transport", service, "unknown")
+        if fare is not None:
+            estimate = fare(service, parsed)
+        else:
+            estimate = self.fare_model.estimate_km(country, city, service, parsed.quantities.get("km", TYPICAL_TRIP_KM))
+        if estimate is None:
+            return PriceCheck("transport", service, "unknown", parsed.amount)
+        return PriceCheck("transport", service, estimate.verdict(parsed.amount), parsed.amount, parsed.amount,
+                          estimate.low, estimate.high, estimate=estimate)
+
+
+def load_price_index():
+    from fare_model import build_fare_model
+    from knowledge_base import load_index
+    index = load_index()
+    return PriceIndex(index, build_fare_model(index))
+
+
+_BENCH_QUERIES = (
+    "hostel wants ₹3000", "gem shop 20000 baht", "auto wants ₹400", "hotel 3 nights 4500", "water 60",
+    "street food 80 for 2 people", "taxi 250", "restaurant bill 900", "photo with elmo $40", "tuk tuk 300 baht",
+)
+
+
+def benchmark(count=20_000, seed=7):
+    """Checks per second over a mix of ride, food, lodging and shopping queries."""
+    rng = random.Random(seed)
+    index = load_price_index()
+    countries = list(index.tables)
+    started = time.perf_counter()
+    verdicts = {}
+    for _ in range(count):
+        result = index.check(rng.choice(_BENCH_QUERIES), rng.choice(countries), "")
+        verdicts[result.verdict] = verdicts.get(result.verdict, 0) + 1
+    elapsed = time.perf_counter() - started
+    return {"checks": count, "per_check_us": round(elapsed / count * 1e6, 1), "verdicts": verdicts}
+
+
+if __name__ == "__main__":
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
@@ -0,0 +1,377 @@
+import logging
+import math
+import os
+import queue
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from response_cache import CACHE_DIR
+
+logger = logging.getLogger("safewander.prices")
+
+OBSERVATIONS_PATH = os.getenv("SAFEWANDER_PRICE_LOG", os.path.join(CACHE_DIR, "price_observations.sqlite"))
+
+# Quantiles cover the last WINDOW_DAYS, kept as one digest per day
+WINDOW_DAYS = 14
+DAY = 86400
+COMPRESSION = 100
+# Live quantiles replace the static reference once a city/item has this many observations
+MIN_OBSERVATIONS = 30
+# A session's reports count at most this many times per city, item and day; the rest are stored
+# but left out of the quantiles, so one traveller can't fill a city's window on their own
+SESSION_DAILY_CAP = 3
+# Reports this far above the live median are stored but kept out of the quantiles,
+# so a burst of scam quotes can't drag the p90 up with it
+OUTLIER_FACTOR = 10.0
+
+# The outlier check's median is refreshed every this many adds, not on each one
+MEDIAN_REFRESH = 64
+
+WRITE_BATCH = 256
+QUEUE_SIZE = 10_000
+
+
+class TDigest:
+    """Merging t-digest (Dunning): approximate quantiles in at most ~compression centroids.
+
+    `add` appends to a buffer and merges it into the centroids once it
+    fills, so inserts are O(1) amortized. Centroids near the tails stay
+    small, which keeps p90/p99 accurate.
+    """
+
+    def __init__(self, compression=COMPRESSION):
+        self.compression = compression
+        self.centroids = []  # [mean, weight], sorted by mean
+        self.buffer = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1.0):
+        self.buffer.append([value, weight])
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other):
+        other._compress()
+        self.buffer.extend([m, w] for m, w in other.centroids)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _q_limit(self, q):
+        """Highest quantile a centroid starting at q may reach: one unit of the k1 scale,
+        k(q) = compression / 2pi * asin(2q - 1), which keeps the tails fine-grained."""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def _compress(self):
+        if not self.buffer:
+            return
+        points = sorted(self.centroids + self.buffer)
+        self.buffer = []
+        merged = [list(points[0])]
+        seen = 0.0
+        limit = self._q_limit(0.0)
+        for mean, weight in points[1:]:
+            last = merged[-1]
+            if (seen + last[1] + weight) / self.count <= limit:
+                last[0] += (mean - last[0]) * weight / (last[1] + weight)
+                last[1] += weight
+            else:
+                seen += last[1]
+                limit = self._q_limit(seen / self.count)
+                merged.append([mean, weight])
+        self.centroids = merged
+
+    def quantile(self, q):
+        self._compress()
+        if not self.centroids:
+            return None
+        target = q * self.count
+        cumulative = 0.0
+        previous_center, previous_mean = 0.0, self.min
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                return previous_mean + (mean - previous_mean) * ((target - previous_center) / span if span else 0)
+            cumulative += weight
+            previous_center, previous_mean = center, mean
+        span = self.count - previous_center
+        return previous_mean + (self.max - previous_mean) * ((target - previous_center) / span if span else 0)
+
+    def __len__(self):
+        self._compress()
+        return len(self.centroids)
+
+
+class RollingDigest:
+    """One t-digest per day for the last `window_days` days; quantiles are over the whole window."""
+
+    def __init__(self, window_days=WINDOW_DAYS, compression=COMPRESSION):
+        self.window_days = window_days
+        self.compression = compression
+        self.days = deque()  # (day number, TDigest), oldest first
+        self.count = 0.0
+        self._merged = None
+        self._median = None
+        self._adds = 0
+
+    def add(self, value, at):
+        day = int(at // DAY)
+        if not self.days or self.days[-1][0] < day:
+            self.days.append((day, TDigest(self.compression)))
+        self.days[-1][1].add(value)
+        self.count += 1
+        self._adds += 1
+        self._expire(day)
+        self._merged = None
+
+    def _expire(self, today):
+        while self.days and self.days[0][0] <= today - self.window_days:
+            self.count -= self.days.popleft()[1].count
+            self._merged = None
+
+    def median(self):
+        """Window median, recomputed at most every MEDIAN_REFRESH adds."""
+        if self._median is None or self._adds >= MEDIAN_REFRESH:
+            self._median = self.snapshot().quantile(0.5)
+            self._adds = 0
+        return self._median
+
+    def snapshot(self, now=None):
+        """The window's merged digest (cached until the next add)."""
+        self._expire(int((now or time.time()) // DAY))
+        if self._merged is None:
+            merged = TDigest(self.compression)
+            for _, digest in self.days:
+                merged.merge(digest)
+            self._merged = merged
+        return self._merged
+
+
+@dataclass(frozen=True)
+class Quantiles:
+    count: int
+    p10: float
+    p50: float
+    p90: float
+
+
+@dataclass(frozen=True)
+class Observation:
+    country: str
+    city: str
+    item: str  # price_check item or ride service
+    category: str
+    amount: float  # what the traveller typed
+    currency: str
+    value: float  # what is aggregated: per night / person, or per km for rides
+    created: float
+    session: str = None  # session token of the traveller who reported it
+
+
+class ObservationStore:
+    """Every scam-checker price, logged to SQLite and folded into rolling per-city quantiles.
+
+    `record` only enqueues, so the request path never waits on disk or on
+    digest maintenance; a background thread batches the inserts and updates
+    the digests. On start the thread replays the current window from disk.
+    """
+
+    def __init__(self, path=OBSERVATIONS_PATH, window_days=WINDOW_DAYS, min_observations=MIN_OBSERVATIONS,
+                 session_cap=SESSION_DAILY_CAP):
+        self.path = path
+        self.window_days = window_days
+        self.min_observations = min_observations
+        self.session_cap = session_cap
+        self.digests = {}  # (country, city, item) -> RollingDigest
+        self.stats = {"recorded": 0, "dropped": 0, "outliers": 0, "capped": 0}
+        self._session_day = None
+        self._session_reports = {}  # (country, city, item, session) -> reports counted on _session_day
+        self._queue = queue.Queue(QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.ready = threading.Event()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS observations ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL, country TEXT NOT NULL,"
+            " city TEXT NOT NULL, item TEXT NOT NULL, category TEXT NOT NULL, amount REAL NOT NULL,"
+            " currency TEXT, value REAL NOT NULL, session TEXT)"
+        )
+        # Logs written before reports were tied to a session
+        if "session" not in {row[1] for row in self._db.execute("PRAGMA table_info(observations)")}:
+            self._db.execute("ALTER TABLE observations ADD COLUMN session TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS observations_created ON observations (created)")
+        self.thread = threading.Thread(target=self._run, name="price-observations", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._queue.put(None)
+        self.thread.join(timeout)
+
+    def record(self, observation):
+        """Queue an observation; drops it (and counts the drop) if the writer is far behind."""
+        try:
+            self._queue.put_nowait(observation)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def quantiles(self, country, city, item, now=None):
+        """Live p10/p50/p90 for the city and item, or None until there are enough observations."""
+        with self._lock:
+            rolling = self.digests.get((country, city, item))
+            if rolling is None:
+                return None
+            digest = rolling.snapshot(now)
+            if digest.count < self.min_observations:
+                return None
+            return Quantiles(int(digest.count), digest.quantile(0.1), digest.quantile(0.5), digest.quantile(0.9))
+
+    def flush(self, timeout=5.0):
+        """Wait until everything queued so far is stored and aggregated (for tests and the CLI)."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _counted(self, o):
+        """False once the reporting session is over its cap for the city, item and day."""
+        if o.session is None:
+            return True
+        day = int(o.created // DAY)
+        if day != self._session_day:
+            self._session_day, self._session_reports = day, {}
+        key = (o.country, o.city, o.item, o.session)
+        reports = self._session_reports.get(key, 0)
+        if reports >= self.session_cap:
+            return False
+        self._session_reports[key] = reports + 1
+        return True
+
+    def _aggregate(self, observations):
+        with self._lock:
+            for o in observations:
+                if not self._counted(o):
+                    self.stats["capped"] += 1
+                    continue
+                rolling = self.digests.get((o.country, o.city, o.item))
+                if rolling is None:
+                    rolling = self.digests[(o.country, o.city, o.item)] = RollingDigest(self.window_days)
+                if rolling.count >= self.min_observations and o.value > rolling.median() * OUTLIER_FACTOR:
+                    self.stats["outliers"] += 1
+                    continue
+                rolling.add(o.value, o.created)
+
+    def _replay(self):
+        since = time.time() - self.window_days * DAY
+        rows = self._db.execute(
+            "SELECT country, city, item, category, amount, currency, value, created, session FROM observations"
+            " WHERE created > ? ORDER BY created",
+            (since,),
+        ).fetchall()
+        self._aggregate([Observation(*row) for row in rows])
+        logger.info("replayed %s price observations", len(rows))
+
+    def _run(self):
+        try:
+            self._replay()
+        except sqlite3.Error as error:
+            logger.warning("price observation replay failed: %s", error)
+        self.ready.set()
+        while not self._stop.is_set():
+            batch, waiters = [], []
+            item = self._queue.get()
+            while item is not None:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= WRITE_BATCH:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+                self._aggregate(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, batch):
+        try:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT INTO observations (created, country, city, item, category, amount, currency, value, session)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(o.created, o.country, o.city, o.item, o.category, o.amount, o.currency, o.value, o.session)
+                 for o in batch],
+            )
+            self._db.execute("COMMIT")
+            self.stats["recorded"] += len(batch)
+        except sqlite3.Error as error:
+            logger.warning("could not store %s price observations: %s", len(batch), error)
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+
+
+def benchmark(count=200_000, seed=7):
+    """t-digest accuracy and cost on lognormal prices, plus enqueue latency of the store."""
+    rng = random.Random(seed)
+    values = [rng.lognormvariate(5, 0.6) for _ in range(count)]
+    digest = TDigest()
+    started = time.perf_counter()
+    for v in values:
+        digest.add(v)
+    add_us = (time.perf_counter() - started) / count * 1e6
+    exact = sorted(values)
+    errors = {}
+    for q in (0.5, 0.9, 0.99):
+        # Error as a rank: how far the estimate's true quantile is from q
+        estimate = digest.quantile(q)
+        rank = sum(1 for v in exact if v <= estimate) / count
+        errors[f"p{round(q * 100)}_rank_error"] = round(abs(rank - q), 4)
+
+    import tempfile
+    store = ObservationStore(os.path.join(tempfile.mkdtemp(), "bench.sqlite")).start()
+    store.ready.wait()
+    now = time.time()
+    started = time.perf_counter()
+    for i, v in enumerate(values[:5_000]):
+        store.record(Observation("India", "Delhi", "auto", "transport", v, "INR", v, now - i))
+    enqueue_us = (time.perf_counter() - started) / 5_000 * 1e6
+    store.flush(30)
+    live = store.quantiles("India", "Delhi", "auto")
+    store.stop()
+    return {
+        "values": count,
+        "centroids": len(digest),
+        "add_us": round(add_us, 2),
+        **errors,
+        "record_us": round(enqueue_us, 2),
+        "stored": store.stats["recorded"],
+        "dropped": store.stats["dropped"],
+        "live_p90": round(live.p90, 1) if live else None,
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
@@ -0,0 +1,410 @@
+import random
+import re
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass, field, replace
+
+# Thai and Devanagari digits -> ASCII
+_DIGITS = str.maketrans("๐๑๒๓๔๕๖๗๘๙०१२३४५६७८९", "01234567890123456789")
+
+
+def _edge_class(ch):
+    """Characters of the same class may not touch a keyword edge ('taxi' in 'taxis' is fine, in 'maxtaxi' not)."""
+    if "฀" <= ch <= "๿":
+        return None  # Thai is written without spaces, so it never needs a boundary
+    if ch.isdigit():
+        return "digit"
+    if ch.isalpha() or unicodedata.category(ch).startswith("M"):
+        return "letter"
+    return None
+
+
+class KeywordTrie:
+    """Character trie for multi-word, multi-script keyword spotting.
+
+    `scan` finds the longest keyword at each position, left to right and
+    without overlaps, in one pass over the text. Latin/Devanagari keywords
+    must sit on word boundaries; Thai keywords may appear anywhere.
+    """
+
+    def __init__(self, entries=()):
+        self.root = {}
+        for phrase, value in entries:
+            self.add(phrase, value)
+
+    def add(self, phrase, value):
+        node = self.root
+        for ch in normalize(phrase):
+            node = node.setdefault(ch, {})
+        node[None] = value
+
+    def scan(self, text):
+        matches = []
+        i, n = 0, len(text)
+        while i < n:
+            cls = _edge_class(text[i])
+            if cls is not None and i > 0 and _edge_class(text[i - 1]) == cls:
+                i += 1
+                continue
+            node, j, found = self.root, i, None
+            while j < n and text[j] in node:
+                node = node[text[j]]
+                j += 1
+                if None in node:
+                    end_cls = _edge_class(text[j - 1])
+                    if end_cls is None or j == n or _edge_class(text[j]) != end_cls:
+                        found = (j, node[None])
+            if found:
+                matches.append((i, found[0], found[1]))
+                i = found[0]
+            else:
+                i += 1
+        return matches
+
+
+_SPACES = re.compile(r"[\s  \-–—_/]+")
+
+
+def normalize(text):
+    return _SPACES.sub(" ", text.translate(_DIGITS).lower())
+
+
+# Service types
+
+SERVICES = ("app_cab", "tuk_tuk", "auto", "boat", "taxi", "guide", "hotel")
+SERVICE_LABELS = {
+    "app_cab": "App cab", "tuk_tuk": "Tuk-tuk", "auto": "Auto/Rickshaw", "boat": "Boat",
+    "taxi": "Taxi/Cab", "guide": "Guide/Tour", "hotel": "Hotel/Room",
+}
+SERVICE_KEYWORDS = {
+    "app_cab": ("uber", "ola", "grab", "bolt", "lyft", "didi", "99pop", "99 app", "indrive", "indriver", "rapido", "cabify"),
+    "tuk_tuk": ("tuk tuk", "tuktuk", "tuk", "ตุ๊กตุ๊ก", "ตุ๊ก ตุ๊ก", "songthaew", "สองแถว", "mototaxi", "moto taxi",
+                "motorbike taxi", "วินมอเตอร์ไซค์"),
+    "auto": ("auto", "autos", "autorickshaw", "auto rickshaw", "rickshaw", "rikshaw", "tempo", "ऑटो", "रिक्शा",
+             "ऑटो रिक्शा"),
+    "boat": ("boat", "boats", "longtail", "long tail", "ferry", "speedboat", "speed boat", "barco", "lancha", "panga",
+             "trajinera", "เรือ", "shikara", "barqueiro"),
+    "taxi": ("taxi", "taxis", "táxi", "cab", "cabs", "car", "meter", "taximeter", "แท็กซี่", "टैक्सी", "carro", "coche"),
+    "guide": ("guide", "tour", "tours", "tour guide", "guía", "guia", "excursion", "excursión", "passeio", "ไกด์",
+              "ทัวร์", "गाइड"),
+    "hotel": ("hotel", "hostel", "room", "guesthouse", "guest house", "resort", "homestay", "airbnb", "dorm",
+              "pousada", "posada", "cuarto", "habitación", "quarto", "โรงแรม", "ห้อง", "होटल", "कमरा", "lodge"),
+}
+SERVICE_TRIE = KeywordTrie((kw, service) for service, words in SERVICE_KEYWORDS.items() for kw in words)
+# When a query names several (e.g. "hotel taxi"), the most specific transport wins
+_SERVICE_RANK = {service: rank for rank, service in enumerate(SERVICES)}
+
+
+def classify_service(text):
+    """Service type named in the text (see SERVICES), or None."""
+    found = [value for _, _, value in SERVICE_TRIE.scan(normalize(text))]
+    return min(found, key=_SERVICE_RANK.get) if found else None
+
+
+# Currencies
+
+CURRENCY_WORDS = {
+    "INR": ("₹", "rs", "rs.", "inr", "rupee", "rupees", "rupaye", "रुपये", "रुपए", "रु"),
+    "THB": ("฿", "baht", "thb", "บาท"),
+    "MXN": ("mx$", "mxn", "peso", "pesos"),
+    "USD": ("us$", "usd", "dollar", "dollars", "bucks"),
+    "BRL": ("r$", "brl", "real", "reais"),
+}
+CURRENCY_TRIE = KeywordTrie((kw, code) for code, words in CURRENCY_WORDS.items() for kw in words)
+LOCAL_CURRENCY = {"India": "INR", "Thailand": "THB", "Mexico": "MXN", "USA": "USD", "Brazil": "BRL"}
+
+
+# Number words (only the languages spoken at the destination are used)
+
+_EN = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20, "thirty": 30, "forty": 40,
+    "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90, "hundred": 100, "thousand": 1000,
+    "grand": 1000, "lakh": 100000, "lakhs": 100000, "lac": 100000, "crore": 10000000,
+}
+_HI = {
+    "ek": 1, "do": 2, "teen": 3, "char": 4, "chaar": 4, "paanch": 5, "panch": 5, "chhe": 6, "saat": 7,
+    "aath": 8, "nau": 9, "das": 10, "bees": 20, "tees": 30, "chalis": 40, "pachas": 50, "sau": 100,
+    "hazaar": 1000, "hazar": 1000, "hajar": 1000, "lakh": 100000,
+    "एक": 1, "दो": 2, "तीन": 3, "चार": 4, "पांच": 5, "पाँच": 5, "दस": 10, "बीस": 20, "पचास": 50,
+    "सौ": 100, "हज़ार": 1000, "हजार": 1000, "लाख": 100000,
+}
+_TH = {
+    "หนึ่ง": 1, "สอง": 2, "สาม": 3, "สี่": 4, "ห้า": 5, "หก": 6, "เจ็ด": 7, "แปด": 8, "เก้า": 9,
+    "สิบ": 10, "ยี่สิบ": 20, "ร้อย": 100, "พัน": 1000, "หมื่น": 10000, "แสน": 100000,
+}
+_ES = {
+    "un": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5, "seis": 6, "siete": 7, "ocho": 8,
+    "nueve": 9, "diez": 10, "quince": 15, "veinte": 20, "treinta": 30, "cuarenta": 40, "cincuenta": 50,
+    "sesenta": 60, "setenta": 70, "ochenta": 80, "noventa": 90, "cien": 100, "ciento": 100,
+    "doscientos": 200, "trescientos": 300, "cuatrocientos": 400, "quinientos": 500, "seiscientos": 600,
+    "setecientos": 700, "ochocientos": 800, "novecientos": 900, "mil": 1000,
+}
+_PT = {
+    "um": 1, "dois": 2, "duas": 2, "três": 3, "tres": 3, "quatro": 4, "cinco": 5, "seis": 6, "sete": 7,
+    "oito": 8, "nove": 9, "dez": 10, "quinze": 15, "vinte": 20, "trinta": 30, "quarenta": 40,
+    "cinquenta": 50, "sessenta": 60, "setenta": 70, "oitenta": 80, "noventa": 90, "cem": 100, "cento": 100,
+    "duzentos": 200, "trezentos": 300, "quatrocentos": 400, "quinhentos": 500, "seiscentos": 600,
+    "setecentos": 700, "oitocentos": 800, "novecentos": 900, "mil": 1000,
+}
+COUNTRY_NUMBER_WORDS = {
+    "India": (_EN, _HI), "Thailand": (_EN, _TH), "Mexico": (_EN, _ES), "USA": (_EN,), "Brazil": (_EN, _PT),
+}
+_NUMBER_TRIES = {
+    country: KeywordTrie((word, value) for table in tables for word, value in table.items())
+    for country, tables in COUNTRY_NUMBER_WORDS.items()
+}
+
+# Words allowed between number words ("two hundred and fifty", "dos mil y", "cento e vinte")
+_NUMBER_JOINERS = re.compile(r"^\s*(?:(?:and|y|e|aur|และ)\s*)?$")
+
+# 1,200 / 1.200 / 1 200 (grouping) with an optional 1-2 digit decimal part and k suffix
+_NUMBER_FORMAT = r"(?<!\d)(?<!\d[.,])(?P<int>{grouped}|\d+)(?:[.,](?P<frac>\d{{1,2}})(?!\d))?(?:\s?(?P<k>k)\b)?"
+_THOUSANDS = r"\d{1,3}(?:[,. ]\d{3})+(?!\d)"
+_NUMBER = re.compile(_NUMBER_FORMAT.format(grouped=_THOUSANDS))
+# India also groups by lakh and crore: 1,50,000 / 12,34,567
+_COUNTRY_NUMBERS = {
+    "India": re.compile(_NUMBER_FORMAT.format(grouped=r"\d{1,2}(?:,\d{2})+,\d{3}(?!\d)|" + _THOUSANDS)),
+}
+# Quantities that are not prices ("5 km", "20 mins", "2 nights")
+_UNITS = re.compile(
+    r"\s?(?P<unit>km|kms|kilomet(?:er|re)s?|kilómetros?|quilômetros?|กม|กิโลเมตร|mi|miles?"
+    r"|mins?|minutes?|minutos?|นาที|hrs?|hours?|horas?|ชั่วโมง|nights?|noches?|noites?|คืน"
+    r"|people|persons?|pax|personas?|pessoas?|คน)(?![a-z])"
+)
+# "dinner for two 900": a small count right after "for" is the party size
+_PARTY = re.compile(r"\b(?:for|para)\s+$")
+MAX_PARTY = 20
+UNIT_NAMES = {
+    "km": "km", "kms": "km", "kilometer": "km", "kilometers": "km", "kilometre": "km", "kilometres": "km",
+    "kilómetro": "km", "kilómetros": "km", "quilômetro": "km", "quilômetros": "km", "กม": "km", "กิโลเมตร": "km",
+    "mi": "miles", "mile": "miles", "miles": "miles",
+    "min": "minutes", "mins": "minutes", "minute": "minutes", "minutes": "minutes", "minuto": "minutes",
+    "minutos": "minutes", "นาที": "minutes",
+    "hr": "hours", "hrs": "hours", "hour": "hours", "hours": "hours", "hora": "hours", "horas": "hours",
+    "ชั่วโมง": "hours",
+    "night": "nights", "nights": "nights", "noche": "nights", "noches": "nights", "noite": "nights",
+    "noites": "nights", "คืน": "nights",
+    "people": "people", "person": "people", "persons": "people", "pax": "people", "persona": "people",
+    "personas": "people", "pessoa": "people", "pessoas": "people", "คน": "people",
+}
+
+
+@dataclass(frozen=True)
+class Amount:
+    value: float
+    start: int
+    end: int
+    currency: str = None
+    unit: str = None
+
+
+@dataclass(frozen=True)
+class ParsedQuery:
+    amount: float = None
+    currency: str = None
+    service: str = None
+    # Non-price quantities in the query, e.g. {"km": 5.0, "minutes": 20.0}
+    quantities: dict = field(default_factory=dict)
+    amounts: tuple = ()
+
+
+def _combine(values):
+    """Fold number words into a value: [2, 1000, 500] -> 2500, [5, 100] -> 500."""
+    total = current = 0
+    for v in values:
+        if v == 10 and 0 < current % 100 < 10:
+            # Thai tens: "สาม สิบ" is 3 x 10
+            current += current % 100 * 9
+        elif v == 100:
+            current = max(current, 1) * 100
+        elif v >= 1000:
+            total += max(current, 1) * v
+            current = 0
+        else:
+            current += v
+    return total + current
+
+
+def _word_numbers(text, country):
+    trie = _NUMBER_TRIES.get(country, _NUMBER_TRIES["USA"])
+    groups = []
+    for start, end, value in trie.scan(text):
+        if groups and _NUMBER_JOINERS.match(text[groups[-1][1]:start]):
+            groups[-1][1] = end
+            groups[-1][2].append(value)
+        else:
+            groups.append([start, end, [value]])
+    return [(start, end, values) for start, end, values in groups]
+
+
+def _numeric(text, country):
+    found = []
+    words = {start: (end, values) for start, end, values in _word_numbers(text, country)}
+    pattern, position = _COUNTRY_NUMBERS.get(country, _NUMBER), 0
+    while match := pattern.search(text, position):
+        position = match.end()
+        head = match.group("int").split(" ", 1)[0]
+        # "dinner for 2 900" is a party of two and a price, not 2900
+        if head != match.group("int") and int(head) <= MAX_PARTY and _PARTY.search(text, 0, match.start()):
+            found.append((match.start(), match.start() + len(head), float(head)))
+            position = match.start() + len(head)
+            continue
+        value = float(re.sub(r"[,. ]", "", match.group("int")))
+        if match.group("frac"):
+            value += float("0." + match.group("frac"))
+        end = match.end()
+        if match.group("k"):
+            value *= 1000
+        else:
+            # "2 mil", "1.5 lakh", "3 hazaar", "5 ร้อย"
+            gap = end + (1 if text[end:end + 1] == " " else 0)
+            if gap in words and all(v >= 100 for v in words[gap][1]):
+                multiplier_end, values = words[gap]
+                value *= _combine(values)
+                end = multiplier_end
+        found.append((match.start(), end, value))
+    return found, words
+
+
+def extract_amounts(query, country="India"):
+    """Every amount in the query with any adjacent currency or unit."""
+    text = normalize(query)
+    numeric, words = _numeric(text, country)
+    covered = [(s, e) for s, e, _ in numeric]
+    spans = list(numeric)
+    for start, (end, values) in words.items():
+        if any(s <= start < e for s, e in covered):
+            continue
+        spans.append((start, end, float(_combine(values))))
+    currencies = CURRENCY_TRIE.scan(text)
+    amounts = []
+    party = None
+    for start, end, value in sorted(spans):
+        currency = None
+        for c_start, c_end, code in currencies:
+            if 0 <= start - c_end <= 1 or 0 <= c_start - end <= 1:
+                currency = code
+                break
+        if currency is None and "$" in text[max(0, start - 1):start]:
+            currency = "$"
+        unit_match = _UNITS.match(text, end)
+        unit = UNIT_NAMES.get(unit_match.group("unit")) if unit_match else None
+        word = not text[start:end].strip().isdigit()
+        if (party is None and currency is None and unit is None and value <= MAX_PARTY and value.is_integer()
+                and _PARTY.search(text, 0, start)):
+            party = (len(amounts), word)
+        elif currency is None and unit is None and value < 10 and word:
+            # A lone small number word ("do", "un") is usually just a word
+            continue
+        amounts.append(Amount(value, start, end, currency, unit))
+    if party is not None:
+        index, word = party
+        # "for two" is always people; "for 2" only when another price follows ("taxi for 15" is a price)
+        if word or any(a.unit is None for i, a in enumerate(amounts) if i != index):
+            amounts[index] = replace(amounts[index], unit="people")
+    return amounts
+
+
+def parse_query(query, country="India"):
+    """Price, currency, service type and quantities from a free-text scam-checker query."""
+    amounts = extract_amounts(query, country)
+    local = LOCAL_CURRENCY.get(country)
+    prices = [a for a in amounts if a.unit is None]
+    # Prefer an amount written with a currency, then the first bare number
+    price = next((a for a in prices if a.currency), prices[0] if prices else None)
+    quantities = {}
+    for a in amounts:
+        if a.unit == "miles":
+            quantities.setdefault("km", a.value * 1.609)
+        elif a.unit == "hours":
+            quantities.setdefault("minutes", a.value * 60)
+        elif a.unit:
+            quantities.setdefault(a.unit, a.value)
+    currency = None
+    if price is not None:
+        currency = local if price.currency in (None, "$") and local else price.currency
+    return ParsedQuery(
+        amount=price.value if price else None,
+        currency=currency,
+        service=classify_service(query),
+        quantities=quantities,
+        amounts=tuple(amounts),
+    )
+
+
+def format_amount(value):
+    return f"{value:,.0f}" if float(value).is_integer() else f"{value:,.2f}"
+
+
+# Benchmark over generated queries in every destination language
+
+_BENCH_TEMPLATES = {
+    "India": ("{svc} wants ₹{n}", "{svc} driver asking Rs.{n} for 5 km", "{svc} charging {w} rupees",
+              "{n} rupaye maang raha hai {svc} wala", "{svc} ke liye {w}", "Is {n} INR fair for {svc}?"),
+    "Thailand": ("{svc} wants {n} baht", "{svc} {n} บาท", "{svc} ราคา {w}บาท", "฿{n} for {svc} 20 mins"),
+    "Mexico": ("{svc} quiere {w} pesos", "{svc} me cobra ${n}", "{svc} charging MX${n} for 3 km"),
+    "USA": ("{svc} wants ${n}", "{svc} charging {w} dollars", "is ${n} ok for a {svc}"),
+    "Brazil": ("{svc} cobrando R$ {n}", "{svc} quer {w} reais", "R${n} pelo {svc}"),
+}
+_BENCH_SERVICES = {
+    "India": {"auto": ("auto", "rickshaw", "ऑटो"), "taxi": ("taxi", "cab"), "app_cab": ("uber", "ola"),
+              "hotel": ("hotel", "room"), "guide": ("guide",), "boat": ("boat", "shikara")},
+    "Thailand": {"tuk_tuk": ("tuk-tuk", "ตุ๊กตุ๊ก"), "taxi": ("taxi", "แท็กซี่"), "app_cab": ("grab",),
+                 "boat": ("longtail boat", "เรือ"), "hotel": ("hotel", "โรงแรม")},
+    "Mexico": {"taxi": ("taxi", "taxis"), "app_cab": ("uber", "didi"), "boat": ("lancha", "trajinera"),
+               "guide": ("guía", "tour")},
+    "USA": {"taxi": ("taxi", "cab"), "app_cab": ("uber", "lyft"), "hotel": ("hotel", "hostel")},
+    "Brazil": {"taxi": ("táxi",), "app_cab": ("uber", "99pop"), "guide": ("passeio", "guia"), "hotel": ("pousada",)},
+}
+_BENCH_WORDS = {
+    "India": (("five hundred", 500), ("do sau", 200), ("teen hazaar", 3000), ("1.5k", 1500), ("2 lakh", 200000)),
+    "Thailand": (("ห้าร้อย", 500), ("สองพันห้าร้อย", 2500), ("สามร้อย", 300), ("๕๐๐", 500)),
+    "Mexico": (("dos mil", 2000), ("quinientos", 500), ("mil", 1000), ("ciento cincuenta", 150)),
+    "USA": (("fifty", 50), ("two hundred", 200), ("1.2k", 1200)),
+    "Brazil": (("cem", 100), ("duzentos", 200), ("mil e quinhentos", 1500), ("1.200,50", 1200.5)),
+}
+
+
+def _bench_number(rng, country):
+    n = rng.choice((rng.randint(20, 999), rng.randint(1000, 20000)))
+    if n >= 1000 and rng.random() < 0.5:
+        sep = "." if country == "Brazil" else ","
+        return f"{n // 1000}{sep}{n % 1000:03d}", n
+    return str(n), n
+
+
+def benchmark(count=5000, seed=7):
+    """Generate labelled queries in every destination language; report accuracy and speed."""
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        country = rng.choice(list(_BENCH_TEMPLATES))
+        service = rng.choice(list(_BENCH_SERVICES[country]))
+        template = rng.choice(_BENCH_TEMPLATES[country])
+        if "{w}" in template:
+            words, value = rng.choice(_BENCH_WORDS[country])
+            text = template.format(svc=rng.choice(_BENCH_SERVICES[country][service]), w=words)
+        else:
+            number, value = _bench_number(rng, country)
+            text = template.format(svc=rng.choice(_BENCH_SERVICES[country][service]), n=number)
+        cases.append((country, text, value, service))
+    started = time.perf_counter()
+    results = [parse_query(text, country) for country, text, _, _ in cases]
+    elapsed = time.perf_counter() - started
+    amount_ok = sum(r.amount == value for r, (_, _, value, _) in zip(results, cases))
+    service_ok = sum(r.service == service for r, (_, _, _, service) in zip(results, cases))
+    misses = [(text, r.amount, r.service) for r, (_, text, value, service) in zip(results, cases)
+              if r.amount != value or r.service != service]
+    return {
+        "queries": count,
+        "amount_accuracy": round(amount_ok / count, 4),
+        "service_accuracy": round(service_ok / count, 4),
+        "us_per_query": round(elapsed / count * 1e6, 1),
+        "sample_misses": misses[:5],
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,123 @@
+import logging
+from dataclasses import dataclass
+
+logger = logging.getLogger("safewander.prompt")
+
+# Rough token estimate for Llama-style tokenizers (~4 characters per token)
+CHARS_PER_TOKEN = 4
+DEFAULT_INPUT_BUDGET = 1200
+
+# Section priorities: lower numbers are kept longest, REQUIRED is never cut
+REQUIRED = 0
+HIGH = 1
+NORMAL = 2
+LOW = 3
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+@dataclass
+class Section:
+    name: str
+    text: str
+    priority: int = NORMAL
+
+    @property
+    def tokens(self):
+        return estimate_tokens(self.text)
+
+
+def _trim_lines(text, max_tokens):
+    """Keep whole lines from the top of a section while they fit."""
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line + "\n")
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept).rstrip()
+
+
+def _trim_chars(text, max_tokens):
+    return text[:max_tokens * CHARS_PER_TOKEN].rstrip()
+
+
+class PromptBuilder:
+    """Assembles the system prompt from named sections under an input token budget.
+
+    When the estimate exceeds the budget, the lowest-priority sections are
+    trimmed line by line (and dropped entirely if nothing fits) until the
+    prompt plus the user question fits. REQUIRED sections are never cut.
+    """
+
+    def __init__(self, budget=DEFAULT_INPUT_BUDGET):
+        self.budget = budget
+        self.sections = []
+
+    def add(self, name, text, priority=NORMAL):
+        if text:
+            self.sections.append(Section(name, text.strip("\n"), priority))
+        return self
+
+    def build(self, question=""):
+        """Return (messages, report) for the chat completion call."""
+        question_budget = max(self.budget // 4, 1)
+        if estimate_tokens(question) > question_budget:
+            question = _trim_chars(question, question_budget)
+        estimated = {s.name: s.tokens for s in self.sections}
+        total = sum(estimated.values()) + estimate_tokens(question)
+
+        for section in sorted(self.sections, key=lambda s: s.priority, reverse=True):
+            if total <= self.budget:
+                break
+            if section.priority == REQUIRED:
+                continue
+            before = section.tokens
+            allowed = max(before - (total - self.budget), 0)
+            section.text = _trim_lines(section.text, allowed)
+            total -= before - section.tokens
+
+        kept = [s for s in self.sections if s.text]
+        system_prompt = "\n\n".join(s.text for s in kept)
+        report = {
+            "budget": self.budget,
+            "estimated_tokens": estimated,
+            "kept_tokens": {s.name: s.tokens for s in kept},
+            "dropped": [s.name for s in self.sections if not s.text],
+            "prompt_tokens_est": estimate_tokens(system_prompt) + estimate_tokens(question),
+        }
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": question},
+        ]
+        return messages, report
+
+
+def usage_counts(usage):
+    """Extract (prompt_tokens, completion_tokens) from a Groq usage object or dict."""
+    if usage is None:
+        return None, None
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+    return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+
+
+def log_usage(report, usage, source="groq"):
+    """Log estimated vs. actual token counts for one assistant request."""
+    prompt_tokens, completion_tokens = usage_counts(usage)
+    logger.info(
+        "source=%s budget=%s prompt_est=%s prompt_tokens=%s completion_tokens=%s sections=%s dropped=%s",
+        source,
+        report.get("budget"),
+        report.get("prompt_tokens_est"),
+        prompt_tokens,
+        completion_tokens,
+        report.get("kept_tokens"),
+        report.get("dropped"),
+    )
+    return prompt_tokens, completion_tokens
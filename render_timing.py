@@ -0,0 +1,81 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("safewander.render")
+
+# Rolling window of runs kept per (kind, section) for the report
+HISTORY = 200
+
+
+class RerunTimer:
+    """Wall time of one script run ("full") or fragment rerun ("fragment"), split into named sections."""
+
+    def __init__(self, kind="full"):
+        self.kind = kind
+        self.sections = {}
+        self.started = time.perf_counter()
+        self.total_ms = None
+
+    @contextmanager
+    def section(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    @property
+    def finished(self):
+        return self.total_ms is not None
+
+    def finish(self):
+        if self.total_ms is None:
+            self.total_ms = (time.perf_counter() - self.started) * 1000
+        return self.total_ms
+
+    def describe(self):
+        parts = " ".join(f"{name}={ms:.1f}" for name, ms in self.sections.items())
+        return f"{self.kind} run {self.total_ms:.1f} ms ({parts})"
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class TimingStats:
+    """Rolling per-section timings across every session, for comparing full and fragment reruns."""
+
+    def __init__(self, history=HISTORY):
+        self.history = history
+        self.runs = {}  # (kind, section) -> deque of ms; section "total" is the whole run
+        self._lock = threading.Lock()
+
+    def record(self, timer):
+        total = timer.finish()
+        with self._lock:
+            for name, ms in (("total", total), *timer.sections.items()):
+                self.runs.setdefault((timer.kind, name), deque(maxlen=self.history)).append(ms)
+        logger.info("%s", timer.describe())
+
+    def summary(self):
+        """{kind: {section: {"runs", "p50_ms", "p95_ms"}}}."""
+        with self._lock:
+            snapshot = {key: sorted(values) for key, values in self.runs.items()}
+        report = {}
+        for (kind, name), ordered in snapshot.items():
+            report.setdefault(kind, {})[name] = {
+                "runs": len(ordered),
+                "p50_ms": round(_percentile(ordered, 0.5), 1),
+                "p95_ms": round(_percentile(ordered, 0.95), 1),
+            }
+        return report
+
+    def describe(self):
+        lines = []
+        for kind, sections in sorted(self.summary().items()):
+            total = sections.get("total", {})
+            lines.append(f"{kind}: p50 {total.get('p50_ms', 0)} ms, p95 {total.get('p95_ms', 0)} ms over {total.get('runs', 0)} runs")
+        return " · ".join(lines)
@@ -0,0 +1,195 @@
+import csv
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from geo_index import ROAD_FACTOR, KDTree
+
+RESPONDERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "responders.csv")
+
+# ETA model: straight-line distance times geo_index.ROAD_FACTOR at urban speed,
+# plus a fixed time to get moving
+URBAN_SPEED_KMH = 25.0
+DISPATCH_MINUTES = 2.0
+# Only responders this close are eligible
+MAX_RESPONSE_KM = 50.0
+# An assignment that is never released (abandoned session) frees the responder after this
+ASSIGNMENT_LEASE = 2 * 3600
+
+
+@dataclass(frozen=True)
+class Responder:
+    id: str
+    country: str
+    city: str
+    name: str
+    badge: str
+    gender: str
+    lat: float
+    lng: float
+
+
+@dataclass(frozen=True)
+class Assignment:
+    responder: Responder
+    km: float
+    eta_minutes: int
+    # False when no responder of the requested gender was free and another was sent
+    matched_gender: bool
+
+    def as_dict(self):
+        r = self.responder
+        return {"id": r.id, "name": r.name, "badge": r.badge, "gender": r.gender,
+                "km": round(self.km, 2), "eta_minutes": self.eta_minutes, "matched_gender": self.matched_gender}
+
+
+def eta_minutes(km):
+    return max(1, math.ceil(DISPATCH_MINUTES + km * ROAD_FACTOR / URBAN_SPEED_KMH * 60))
+
+
+class ResponderIndex:
+    """Assigns the nearest available responder, by country and gender.
+
+    One k-d tree per (country, gender) answers nearest-neighbour queries in
+    O(log n); busy responders are filtered during the search instead of
+    being removed, so releasing one is O(1). Assignment is check-and-mark
+    under a per-country lock, so concurrent SOS requests never get the same
+    responder.
+    """
+
+    def __init__(self, responders, lease=ASSIGNMENT_LEASE, max_km=MAX_RESPONSE_KM):
+        self.lease = lease
+        self.max_km = max_km
+        self.by_id = {}
+        grouped = {}
+        for responder in responders:
+            self.by_id[responder.id] = responder
+            grouped.setdefault((responder.country, responder.gender), []).append(responder)
+        self.trees = {key: KDTree(items) for key, items in grouped.items()}
+        self.genders = {}
+        for country, gender in self.trees:
+            self.genders.setdefault(country, []).append(gender)
+        self._busy = {}  # responder id -> lease expiry
+        self._locks = {country: threading.Lock() for country in self.genders}
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def _available(self, responder):
+        expires = self._busy.get(responder.id)
+        return expires is None or expires < time.monotonic()
+
+    def _nearest(self, country, gender, lat, lng):
+        best = None
+        for g in ([gender] if gender else self.genders.get(country, ())):
+            tree = self.trees.get((country, g))
+            found = tree.nearest(lat, lng, 1, self.max_km, self._available) if tree else []
+            if found and (best is None or found[0][0] < best[0]):
+                best = found[0]
+        return best
+
+    def assign(self, country, lat, lng, gender=None):
+        """Reserve the nearest free responder, preferring `gender`; None if nobody is in range."""
+        lock = self._locks.get(country)
+        if lock is None:
+            return None
+        with lock:
+            found = self._nearest(country, gender, lat, lng) if gender else None
+            matched = found is not None or gender is None
+            if found is None:
+                found = self._nearest(country, None, lat, lng)
+            if found is None:
+                return None
+            km, responder = found
+            self._busy[responder.id] = time.monotonic() + self.lease
+        return Assignment(responder, km, eta_minutes(km), matched)
+
+    def restore(self, assigned):
+        """Mark responders busy again after a restart: {responder id: wall-clock time assigned}."""
+        now, wall = time.monotonic(), time.time()
+        for responder_id, started in assigned.items():
+            responder = self.by_id.get(responder_id)
+            expires = now + self.lease - (wall - started)
+            if responder is not None and expires > now:
+                with self._locks[responder.country]:
+                    self._busy[responder_id] = expires
+
+    def release(self, responder_id):
+        responder = self.by_id.get(responder_id)
+        if responder is not None:
+            with self._locks[responder.country]:
+                self._busy.pop(responder_id, None)
+
+    @property
+    def busy(self):
+        now = time.monotonic()
+        return sum(1 for expires in list(self._busy.values()) if expires >= now)
+
+
+def load_responders(path=RESPONDERS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return [Responder(row["id"], row["country"], row["city"], row["name"], row["badge"], row["gender"],
+                          float(row["lat"]), float(row["lng"])) for row in csv.DictReader(f)]
+
+
+def load_responder_index(path=RESPONDERS_PATH):
+    return ResponderIndex(load_responders(path))
+
+
+def benchmark(responders=50_000, requests=20_000, workers=16, seed=7):
+    """Simulated load: concurrent assign/release over random responders across India.
+
+    Checks that no responder is ever held by two requests at once.
+    """
+    rng = random.Random(seed)
+    index = ResponderIndex(
+        [Responder(f"R{i}", "India", "", f"R{i}", f"R{i}", rng.choice(("Female", "Male")),
+                   rng.uniform(8, 35), rng.uniform(68, 97)) for i in range(responders)],
+        max_km=float("inf"),
+    )
+    holders = {}
+    conflicts = []
+    timings = []
+    guard = threading.Lock()
+
+    def one(_):
+        lat, lng = rng.uniform(8, 35), rng.uniform(68, 97)
+        started = time.perf_counter()
+        assignment = index.assign("India", lat, lng, rng.choice(("Female", None)))
+        elapsed = time.perf_counter() - started
+        rid = assignment.responder.id
+        with guard:
+            timings.append(elapsed)
+            if rid in holders:
+                conflicts.append(rid)
+            holders[rid] = True
+        time.sleep(0.0005)
+        with guard:
+            del holders[rid]
+        index.release(rid)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+    timings.sort()
+    return {
+        "responders": responders,
+        "requests": requests,
+        "workers": workers,
+        "throughput_per_s": round(requests / wall),
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "p99_ms": round(timings[int(len(timings) * 0.99)] * 1000, 3),
+        "double_assignments": len(conflicts),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark(*(int(v) for v in sys.argv[1:3])))
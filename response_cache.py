@@ -0,0 +1,152 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# On-disk cache location (override with SAFEWANDER_CACHE_DIR)
+CACHE_DIR = os.getenv(
+    "SAFEWANDER_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+)
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MEMORY_ENTRIES = 512
+# Expired rows are deleted on open and every this many stores; reads only drop the key they miss
+PURGE_EVERY = 256
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants share a key."""
+    text = _PUNCTUATION.sub(" ", question.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def profile_bucket(profile):
+    """Coarse profile attributes that change the answer (never the traveller's name)."""
+    return f"{profile.get('gender', '')}|{profile.get('age_range', '')}"
+
+
+def context_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(country, city, bucket, question, rag_hash):
+    raw = "\x1f".join((country or "", city or "", bucket, normalize_question(question), rag_hash))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier answer cache: in-process LRU in front of a SQLite store.
+
+    Entries expire after `ttl` seconds and every entry is tagged with the
+    knowledge-base version; switching to a new database.json version purges
+    the old answers. Expired rows are purged on open and every PURGE_EVERY
+    stores, so the file stays bounded by what one TTL window writes.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, memory_entries=DEFAULT_MEMORY_ENTRIES, kb_version=""):
+        self.path = path or os.path.join(CACHE_DIR, "responses.sqlite")
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.kb_version = kb_version
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "expired": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, answer TEXT NOT NULL,"
+            " kb_version TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self.set_kb_version(kb_version)
+        self.purge_expired()
+
+    def set_kb_version(self, kb_version):
+        """Drop every entry produced from a different database.json version."""
+        with self._lock:
+            self.kb_version = kb_version
+            self._memory.clear()
+            self._db.execute("DELETE FROM responses WHERE kb_version != ?", (kb_version,))
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                answer, created = entry
+                if now - created < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return answer
+                del self._memory[key]
+                self.stats["expired"] += 1
+
+            row = self._db.execute(
+                "SELECT answer, created FROM responses WHERE key = ? AND kb_version = ?",
+                (key, self.kb_version),
+            ).fetchone()
+            if row is not None:
+                answer, created = row
+                if now - created < self.ttl:
+                    self._remember(key, answer, created)
+                    self.stats["disk_hits"] += 1
+                    return answer
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.stats["expired"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, answer):
+        if not answer:
+            return
+        created = time.time()
+        with self._lock:
+            self._remember(key, answer, created)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, answer, kb_version, created) VALUES (?, ?, ?, ?)",
+                (key, answer, self.kb_version, created),
+            )
+            self.stats["stores"] += 1
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self._purge(created)
+
+    def purge_expired(self):
+        """Delete every expired entry. Returns how many rows were removed from SQLite."""
+        with self._lock:
+            return self._purge(time.time())
+
+    def _purge(self, now):
+        cutoff = now - self.ttl
+        removed = self._db.execute("DELETE FROM responses WHERE created < ?", (cutoff,)).rowcount
+        for key in [k for k, (_, created) in self._memory.items() if created < cutoff]:
+            del self._memory[key]
+        self.stats["expired"] += removed
+        return removed
+
+    def _remember(self, key, answer, created):
+        self._memory[key] = (answer, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
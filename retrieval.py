@@ -0,0 +1,172 @@
+import math
+from collections import Counter
+from dataclasses import dataclass
+
+from prompt_builder import estimate_tokens
+from semantic_cache import tokenize
+
+DEFAULT_CONTEXT_BUDGET = 600
+
+# Chunks about the traveller's own city get a relevance boost
+CITY_BOOST = 1.5
+
+# Chunks scoring below this fraction of the best match are treated as noise
+MIN_RELATIVE_SCORE = 0.25
+
+SECTION_TITLES = {
+    "transport_scams": "TRANSPORT SCAMS",
+    "accommodation_scams": "ACCOMMODATION SCAMS",
+    "shopping_scams": "SHOPPING SCAMS",
+    "harassment_safety": "HARASSMENT SAFETY",
+    "food_safety": "FOOD SAFETY",
+    "price_reference": "TYPICAL PRICES",
+    "area_specific_warnings": "AREA SAFETY",
+    "cultural_guidelines": "CULTURAL GUIDELINES",
+}
+
+
+@dataclass(frozen=True)
+class Chunk:
+    section: str
+    text: str
+    city: str = None
+    tokens: int = 0
+    entry: object = None
+
+
+def _join(values):
+    if isinstance(values, (list, tuple)):
+        return ", ".join(values)
+    return values
+
+
+def _scam_text(scam):
+    parts = [f"- {scam.get('scam_type', 'Scam')}"]
+    if scam.get("location"):
+        parts.append(f" ({scam['location']})")
+    parts.append(f": {scam.get('description', '')}")
+    if scam.get("normal_rate"):
+        parts.append(f" Normal: {scam['normal_rate']}.")
+    if scam.get("scam_rate"):
+        parts.append(f" Scam: {scam['scam_rate']}.")
+    if scam.get("red_flags"):
+        parts.append(f" Red flags: {_join(scam['red_flags'])}.")
+    if scam.get("safety_advice"):
+        parts.append(f" Safety: {scam['safety_advice']}")
+    return "".join(parts)
+
+
+def country_chunks(kb, country):
+    """Flatten every database.json section relevant to a country into retrievable chunks."""
+    local = kb.country(country)
+    chunks = []
+
+    def add(section, text, city=None, entry=None):
+        chunks.append(Chunk(section, text, city, estimate_tokens(text), entry))
+
+    for section in ("transport_scams", "accommodation_scams", "shopping_scams"):
+        for scam in getattr(local, section):
+            add(section, _scam_text(scam), scam.get("location"), scam)
+    for entry in kb.harassment:
+        text = f"- {entry.get('situation')}: {_join(entry.get('immediate_actions') or entry.get('prevention', ()))}"
+        if entry.get("symptoms"):
+            text += f". Symptoms: {entry['symptoms']}"
+        add("harassment_safety", text, entry=entry)
+    if local.food:
+        add("food_safety", f"- {local.food.get('guidelines', '')} Safe options: {local.food.get('safe_options', 'N/A')}",
+            entry=local.food)
+    for category, prices in local.prices.items():
+        add("price_reference", f"- {category.title()}: {prices}", entry={"category": category, "prices": prices})
+    for city, area in local.area_warnings.items():
+        add("area_specific_warnings",
+            f"- {city}: Avoid {area.get('avoid_areas', 'N/A')}. Safe areas: {area.get('safe_areas', 'N/A')}. "
+            f"Timing: {area.get('timing', 'N/A')}", city, area)
+    for key in ("dress", "gestures", "etiquette"):
+        if local.cultural.get(key):
+            add("cultural_guidelines", f"- {key.title()}: {local.cultural[key]}", entry={"topic": key, "text": local.cultural[key]})
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks with an inverted index."""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = list(chunks)
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = []
+        for doc_id, chunk in enumerate(self.chunks):
+            terms = Counter(tokenize(chunk.text))
+            self.lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+        count = len(self.chunks)
+        self.avg_length = (sum(self.lengths) / count) if count else 0.0
+        self.idf = {
+            term: math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def scores(self, query):
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / (self.avg_length or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+class Retriever:
+    """Ranks a country's chunks against the question and fills a token budget."""
+
+    def __init__(self, kb):
+        self.kb = kb
+        self._indexes = {country: BM25Index(country_chunks(kb, country)) for country in kb.countries}
+
+    def index(self, country):
+        found = self._indexes.get(country)
+        if found is None:
+            found = self._indexes[country] = BM25Index(country_chunks(self.kb, country))
+        return found
+
+    def retrieve(self, country, city, question, budget=DEFAULT_CONTEXT_BUDGET):
+        index = self.index(country)
+        scores = index.scores(question)
+        for doc_id in scores:
+            if index.chunks[doc_id].city == city:
+                scores[doc_id] *= CITY_BOOST
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        if ranked:
+            cutoff = scores[ranked[0]] * MIN_RELATIVE_SCORE
+            ranked = [doc_id for doc_id in ranked if scores[doc_id] >= cutoff]
+        else:
+            ranked = self._defaults(index, city)
+
+        selected, used = [], 0
+        for doc_id in ranked:
+            chunk = index.chunks[doc_id]
+            if used + chunk.tokens > budget:
+                continue
+            selected.append(chunk)
+            used += chunk.tokens
+        return selected
+
+    def _defaults(self, index, city):
+        """Question matched nothing: fall back to the city's area and scam info, then general safety."""
+        order = ("area_specific_warnings", "transport_scams", "harassment_safety", "food_safety")
+        picks = [i for section in order for i, c in enumerate(index.chunks)
+                 if c.section == section and c.city in (city, None)]
+        return picks
+
+
+def format_chunks(chunks):
+    """Group retrieved chunks under their section headings, in relevance order."""
+    grouped = {}
+    for chunk in chunks:
+        grouped.setdefault(chunk.section, []).append(chunk.text)
+    return "\n\n".join(f"{SECTION_TITLES.get(section, section.upper())}:\n" + "\n".join(lines)
+                       for section, lines in grouped.items())
@@ -0,0 +1,210 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from response_cache import normalize_question
+
+DEFAULT_THRESHOLD = float(os.getenv("SAFEWANDER_SEMANTIC_THRESHOLD", "0.8"))
+DEFAULT_DIM = 2048
+DEFAULT_MAX_PER_SCOPE = 500
+# Scopes include the knowledge-base version, so old ones stop being used; the least recently
+# used are dropped past this many (a full scope is max_per_scope x dim floats, ~4 MB)
+DEFAULT_MAX_SCOPES = 64
+# A scope's matrix starts with this many rows and doubles as it fills
+INITIAL_ROWS = 16
+
+# Words that carry no meaning for matching safety questions
+STOPWORDS = frozenset("""
+a an the is are am was were be been being do does did i me my we our you your it its this that
+these those to of in on at for from by with about as and or but if so can could should would will
+there here what which who whom how when where any some please tell know want need just also
+""".split())
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_SUFFIXES = ("ing", "ness", "ity", "ty", "ies", "es", "ed", "ly", "s", "y")
+
+
+def _stem(word):
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def _bucket(feature, dim):
+    return zlib.crc32(feature.encode("utf-8")) % dim
+
+
+def tokenize(question):
+    words = _TOKEN.findall(normalize_question(question))
+    return [_stem(w) for w in words if w not in STOPWORDS]
+
+
+def embed(question, dim=DEFAULT_DIM):
+    """Hashed TF vector (stems, bigrams, char 4-grams), sublinear and L2-normalised."""
+    terms = tokenize(question)
+    vec = np.zeros(dim, dtype=np.float32)
+    for term in terms:
+        vec[_bucket("w:" + term, dim)] += 1.0
+        padded = f"<{term}>"
+        for i in range(len(padded) - 3):
+            vec[_bucket("c:" + padded[i:i + 4], dim)] += 0.25
+    for left, right in zip(terms, terms[1:]):
+        vec[_bucket(f"b:{left} {right}", dim)] += 0.5
+    np.log1p(vec, out=vec)
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec /= norm
+    return vec
+
+
+class _ScopeIndex:
+    """Ring buffer of question vectors and their answers for one city/profile scope.
+
+    The matrix grows by doubling up to `capacity` rows; once full, the
+    oldest question is overwritten.
+    """
+
+    def __init__(self, dim, capacity):
+        self.capacity = capacity
+        self.matrix = np.zeros((min(INITIAL_ROWS, capacity), dim), dtype=np.float32)
+        self.answers = []
+        self.next = 0
+
+    @property
+    def size(self):
+        return len(self.answers)
+
+    def add(self, vec, answer):
+        if self.size < self.capacity:
+            if self.size == len(self.matrix):
+                grown = np.zeros((min(2 * self.size, self.capacity), self.matrix.shape[1]), dtype=np.float32)
+                grown[:self.size] = self.matrix
+                self.matrix = grown
+            self.matrix[self.size] = vec
+            self.answers.append(answer)
+            return
+        self.matrix[self.next] = vec
+        self.answers[self.next] = answer
+        self.next = (self.next + 1) % self.capacity
+
+    def best(self, vec):
+        if not self.size:
+            return None, 0.0
+        scores = self.matrix[:self.size] @ vec
+        i = int(np.argmax(scores))
+        return self.answers[i], float(scores[i])
+
+
+class SemanticCache:
+    """Returns a cached answer when a paraphrased question is similar enough.
+
+    Questions are embedded with a hashed TF vectorizer (CPU only, no model
+    download) and compared by cosine similarity against a per-scope matrix.
+    A scope is normally (country, city, profile bucket, knowledge-base version);
+    at most `max_scopes` are kept, least recently used dropped first.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, dim=DEFAULT_DIM, max_per_scope=DEFAULT_MAX_PER_SCOPE,
+                 max_scopes=DEFAULT_MAX_SCOPES):
+        self.threshold = threshold
+        self.dim = dim
+        self.max_per_scope = max_per_scope
+        self.max_scopes = max_scopes
+        self.stats = {"hits": 0, "misses": 0}
+        self._scopes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, scope, question):
+        """Return (answer, score); answer is None below the threshold."""
+        vec = embed(question, self.dim)
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is not None:
+                self._scopes.move_to_end(scope)
+            answer, score = index.best(vec) if index else (None, 0.0)
+            if answer is not None and score >= self.threshold:
+                self.stats["hits"] += 1
+                return answer, score
+            self.stats["misses"] += 1
+            return None, score
+
+    def add(self, scope, question, answer):
+        if not answer:
+            return
+        vec = embed(question, self.dim)
+        with self._lock:
+            index = self._scopes.get(scope)
+            if index is None:
+                index = self._scopes[scope] = _ScopeIndex(self.dim, self.max_per_scope)
+                while len(self._scopes) > self.max_scopes:
+                    self._scopes.popitem(last=False)
+            else:
+                self._scopes.move_to_end(scope)
+            index.add(vec, answer)
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+
+    @property
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+
+def _read_log(path):
+    """Question log: JSON lines with city, question and optional intent label, or plain text lines."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                yield entry.get("city", ""), entry["question"], entry.get("intent")
+            else:
+                yield "", line, None
+
+
+def benchmark(path, threshold=DEFAULT_THRESHOLD):
+    """Replay a recorded question log; every miss is treated as an LLM call whose answer is cached.
+
+    When the log carries intent labels, a hit that returns the answer of a
+    question with a different intent is counted as a false hit.
+    """
+    cache = SemanticCache(threshold=threshold)
+    timings = []
+    false_hits = 0
+    for city, question, intent in _read_log(path):
+        started = time.perf_counter()
+        cached, _ = cache.lookup(city, question)
+        timings.append(time.perf_counter() - started)
+        if cached is None:
+            cache.add(city, question, (intent,))
+        elif intent is not None and cached[0] != intent:
+            false_hits += 1
+    timings.sort()
+    count = len(timings)
+    return {
+        "questions": count,
+        "hits": cache.stats["hits"],
+        "false_hits": false_hits,
+        "hit_rate": round(cache.hit_rate, 3),
+        "p50_ms": round(timings[count // 2] * 1000, 3) if count else 0.0,
+        "p99_ms": round(timings[int(count * 0.99)] * 1000, 3) if count else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python semantic_cache.py QUESTION_LOG [THRESHOLD ...]")
+    for value in sys.argv[2:] or [DEFAULT_THRESHOLD]:
+        print(json.dumps({"threshold": float(value), **benchmark(sys.argv[1], float(value))}))
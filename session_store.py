@@ -0,0 +1,134 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+
+from response_cache import CACHE_DIR
+
+# memory (default, one process) or sqlite[:///path] (shared by every replica on the same volume)
+SESSION_STORE_URL = os.getenv("SAFEWANDER_SESSION_STORE", "memory")
+SESSION_TTL = int(os.getenv("SAFEWANDER_SESSION_TTL", str(24 * 3600)))
+
+# st.session_state keys that are saved server-side; everything else is per-connection
+PERSISTED_KEYS = ("profile_complete", "profile", "sos_active", "sos_reason", "sos_incident", "sos_assignment", "active_feature")
+
+# Payloads at least this big are zlib-compressed before storing
+COMPRESS_MIN_BYTES = 256
+
+
+def new_session_token():
+    return secrets.token_urlsafe(16)
+
+
+def encode_state(state):
+    """Compact JSON, prefixed b"j"; or zlib-compressed JSON, prefixed b"z", when that is smaller."""
+    raw = json.dumps(state, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return b"z" + packed
+    return b"j" + raw
+
+
+def decode_state(blob):
+    if blob[:1] == b"z":
+        return json.loads(zlib.decompress(blob[1:]))
+    return json.loads(blob[1:])
+
+
+class MemorySessionStore:
+    """In-process store; state survives websocket reconnects but not restarts or other replicas."""
+
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(token)
+            if entry is None:
+                return None
+            blob, expires = entry
+            if expires <= now:
+                del self._sessions[token]
+                return None
+            return blob
+
+    def put(self, token, blob):
+        now = time.time()
+        with self._lock:
+            self._sessions[token] = (blob, now + self.ttl)
+            # Evict lazily; sessions are tiny, so an occasional full scan is cheap
+            if len(self._sessions) % 256 == 0:
+                for key in [k for k, (_, expires) in self._sessions.items() if expires <= now]:
+                    del self._sessions[key]
+
+    def delete(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """SQLite-backed store (WAL) that replicas sharing the file can all read and write."""
+
+    def __init__(self, path=None, ttl=SESSION_TTL):
+        self.path = path or os.path.join(CACHE_DIR, "sessions.sqlite")
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " token TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def get(self, token):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM sessions WHERE token = ? AND expires > ?", (token, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, token, blob):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (token, data, expires) VALUES (?, ?, ?)",
+                (token, blob, now + self.ttl),
+            )
+            self._writes += 1
+            if self._writes % 256 == 0:
+                self._db.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+
+    def delete(self, token):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def make_session_store(url=SESSION_STORE_URL, ttl=SESSION_TTL):
+    """Build the backend named by `url`: "memory", "sqlite" or "sqlite:///path/to/file"."""
+    scheme, _, rest = url.partition(":")
+    if scheme == "memory":
+        return MemorySessionStore(ttl)
+    if scheme == "sqlite":
+        return SQLiteSessionStore(rest[2:] if rest.startswith("//") and rest[2:] else None, ttl)
+    raise ValueError(f"unknown session store: {url}")
@@ -0,0 +1,180 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger("safewander.single_flight")
+
+
+class _Flight:
+    """One in-flight LLM call whose tokens are shared by every waiting reader."""
+
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.result = None
+        self.usage = None
+        self.readers = 0
+        self.source = None
+        self.cond = threading.Condition()
+
+
+class FlightReader:
+    """Iterates the shared tokens of a flight from the start, waiting for new ones.
+
+    Exposes the same attributes the UI reads from AdviceStream (ttft, total,
+    text, usage, completed) so callers can treat both the same way.
+    """
+
+    def __init__(self, group, key, flight, leader):
+        self.group = group
+        self.key = key
+        self.flight = flight
+        self.leader = leader
+        self.started = time.perf_counter()
+        self.ttft = None
+        self.total = None
+        self.cancelled = False
+        self._detached = False
+
+    def __iter__(self):
+        flight = self.flight
+        position = 0
+        try:
+            while True:
+                with flight.cond:
+                    while position >= len(flight.tokens) and not flight.done:
+                        flight.cond.wait()
+                    pending = flight.tokens[position:]
+                    finished = flight.done
+                position += len(pending)
+                for token in pending:
+                    if self.ttft is None:
+                        self.ttft = time.perf_counter() - self.started
+                    yield token
+                if finished and position >= len(flight.tokens):
+                    break
+            if flight.error is not None:
+                raise flight.error
+        except GeneratorExit:
+            self.cancelled = True
+            raise
+        finally:
+            self.total = time.perf_counter() - self.started
+            self.close()
+
+    def close(self):
+        if not self._detached:
+            self._detached = True
+            self.group._detach(self.flight)
+
+    def cancel(self):
+        self.cancelled = True
+        self.close()
+
+    @property
+    def text(self):
+        return "".join(self.flight.tokens)
+
+    @property
+    def usage(self):
+        return self.flight.usage
+
+    @property
+    def completed(self):
+        return self.flight.done and self.flight.error is None and not self.cancelled
+
+
+class SingleFlight:
+    """Coalesces concurrent identical requests into one upstream call.
+
+    `stream(key, open_stream)` starts `open_stream()` in a background thread
+    for the first caller; callers arriving while it runs join the same flight
+    and receive every token. If all readers leave before the answer is
+    finished, the upstream stream is cancelled. `do(key, fn)` is the blocking
+    equivalent for non-streaming calls.
+    """
+
+    def __init__(self):
+        self.stats = {"flights": 0, "coalesced": 0}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def stream(self, key, open_stream, on_complete=None):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats["flights"] += 1
+            else:
+                self.stats["coalesced"] += 1
+            with flight.cond:
+                flight.readers += 1
+        if leader:
+            threading.Thread(target=self._produce, args=(key, flight, open_stream, on_complete),
+                             name="single-flight", daemon=True).start()
+        return FlightReader(self, key, flight, leader)
+
+    def do(self, key, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.stats["flights"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if leader:
+            try:
+                flight.result = fn()
+            except Exception as error:
+                flight.error = error
+            finally:
+                self._finish(key, flight)
+        else:
+            with flight.cond:
+                while not flight.done:
+                    flight.cond.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+    def _produce(self, key, flight, open_stream, on_complete):
+        try:
+            source = flight.source = open_stream()
+            for token in source:
+                with flight.cond:
+                    flight.tokens.append(token)
+                    flight.cond.notify_all()
+                    if flight.readers == 0:
+                        break
+            flight.usage = getattr(source, "usage", None)
+            abandoned = flight.readers == 0 or getattr(source, "cancelled", False)
+            if on_complete is not None and not abandoned:
+                on_complete("".join(flight.tokens), flight.usage)
+        except Exception as error:
+            flight.error = error
+            logger.warning("shared LLM call failed: %s", error)
+        finally:
+            self._finish(key, flight)
+
+    def _finish(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        with flight.cond:
+            flight.done = True
+            flight.cond.notify_all()
+
+    def _detach(self, flight):
+        with flight.cond:
+            flight.readers -= 1
+            abandoned = flight.readers == 0 and not flight.done
+        if abandoned and hasattr(flight.source, "cancel"):
+            flight.source.cancel()
@@ -0,0 +1,298 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+import httpx
+
+from response_cache import CACHE_DIR
+
+logger = logging.getLogger("safewander.sos")
+
+SOS_LOG_PATH = os.getenv("SAFEWANDER_SOS_LOG", os.path.join(CACHE_DIR, "sos_events.sqlite"))
+# "log" (default), "stub" (in-memory, for tests) or an http(s) webhook URL
+SOS_SINK = os.getenv("SAFEWANDER_SOS_SINK", "log")
+# Button press -> durable write must stay under this; slower writes are logged as warnings
+WRITE_BUDGET_MS = float(os.getenv("SAFEWANDER_SOS_WRITE_BUDGET_MS", "50"))
+
+POLL_INTERVAL = 1.0
+RETRY_BASE = 0.5
+RETRY_CAP = 30.0
+# Backoff stops doubling here (RETRY_BASE * 2**10 is well past RETRY_CAP); 2**attempts as a
+# float overflows after ~1024 failures, a few hours of outage
+RETRY_MAX_EXPONENT = 10
+WEBHOOK_TIMEOUT = httpx.Timeout(5.0, connect=2.0)
+
+
+def new_incident_id():
+    return uuid.uuid4().hex
+
+
+class EventLog:
+    """Append-only SOS event log in SQLite (WAL, synchronous=FULL, so every append is fsync'd).
+
+    Events are never updated; successful deliveries and events the sink
+    rejected for good (dead letters) go to separate tables, so the log
+    itself is a complete audit trail and pending events are simply those
+    in neither.
+    """
+
+    def __init__(self, path=SOS_LOG_PATH, write_budget_ms=WRITE_BUDGET_MS):
+        self.path = path
+        self.write_budget_ms = write_budget_ms
+        self.latencies = []
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL,"
+            " incident TEXT NOT NULL, kind TEXT NOT NULL, created REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS deliveries ("
+            " seq INTEGER PRIMARY KEY REFERENCES events(seq), delivered REAL NOT NULL, attempts INTEGER NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS dead_letters ("
+            " seq INTEGER PRIMARY KEY REFERENCES events(seq), failed REAL NOT NULL, attempts INTEGER NOT NULL,"
+            " error TEXT NOT NULL)"
+        )
+
+    def append(self, incident, kind, **fields):
+        """Durably record one event and return it (with its `seq`) once it is on disk."""
+        started = time.perf_counter()
+        event = {"id": uuid.uuid4().hex, "incident": incident, "kind": kind, "created": time.time(), **fields}
+        payload = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO events (id, incident, kind, created, payload) VALUES (?, ?, ?, ?, ?)",
+                (event["id"], incident, kind, event["created"], payload),
+            )
+            event["seq"] = cursor.lastrowid
+            elapsed = (time.perf_counter() - started) * 1000
+            self.latencies.append(elapsed)
+            del self.latencies[:-1000]
+        if elapsed > self.write_budget_ms:
+            logger.warning("SOS event %s took %.1f ms to persist (budget %.0f ms)", event["seq"], elapsed, self.write_budget_ms)
+        return event
+
+    def pending(self, limit=100):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT e.seq, e.payload FROM events e LEFT JOIN deliveries d ON d.seq = e.seq"
+                " LEFT JOIN dead_letters x ON x.seq = e.seq"
+                " WHERE d.seq IS NULL AND x.seq IS NULL ORDER BY e.seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(json.loads(payload), seq=seq) for seq, payload in rows]
+
+    def mark_delivered(self, seq, attempts):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO deliveries (seq, delivered, attempts) VALUES (?, ?, ?)",
+                (seq, time.time(), attempts),
+            )
+
+    def mark_dead(self, seq, attempts, error):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO dead_letters (seq, failed, attempts, error) VALUES (?, ?, ?, ?)",
+                (seq, time.time(), attempts, str(error)),
+            )
+
+    def dead_letters(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT e.seq, e.payload, x.error FROM events e JOIN dead_letters x ON x.seq = e.seq ORDER BY e.seq"
+            ).fetchall()
+        return [dict(json.loads(payload), seq=seq, error=error) for seq, payload, error in rows]
+
+    def incident(self, incident):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, payload FROM events WHERE incident = ? ORDER BY seq", (incident,)
+            ).fetchall()
+        return [dict(json.loads(payload), seq=seq) for seq, payload in rows]
+
+    def active_assignments(self, since):
+        """{responder id: assigned at} for incidents since `since` whose responder was never released.
+
+        An incident holds the responder of its latest "assigned" event until
+        it is cancelled or dispatched again; this rebuilds those holds after
+        a restart.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT incident, kind, created, payload FROM events"
+                " WHERE kind IN ('assigned', 'unassigned', 'cancelled') AND created >= ? ORDER BY seq",
+                (since,),
+            ).fetchall()
+        held = {}  # incident -> (responder id, assigned at)
+        for incident, kind, created, payload in rows:
+            responder = json.loads(payload).get("responder") if kind == "assigned" else None
+            if responder:
+                held[incident] = (responder["id"], created)
+            else:
+                held.pop(incident, None)
+        return dict(held.values())
+
+    def latency_ms(self, quantile):
+        with self._lock:
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * quantile))] if ordered else 0.0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Sinks: anything with send(event) that raises on failure. Events carry a unique
+# id, and delivery is at-least-once, so receivers should de-duplicate on it.
+# RejectedEvent means retrying cannot help; the event is dead-lettered so later ones still go out.
+
+class RejectedEvent(Exception):
+    pass
+
+
+class LogSink:
+    def send(self, event):
+        logger.warning("SOS %s incident=%s seq=%s", event["kind"], event["incident"], event["seq"])
+
+
+class StubSink:
+    """Collects events in memory; fails the first `failures` sends (for tests)."""
+
+    def __init__(self, failures=0):
+        self.events = []
+        self.failures = failures
+        self.received = threading.Event()
+
+    def send(self, event):
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("stub sink failure")
+        self.events.append(event)
+        self.received.set()
+
+
+class WebhookSink:
+    def __init__(self, url):
+        self.url = url
+        self._http = httpx.Client(timeout=WEBHOOK_TIMEOUT)
+
+    def send(self, event):
+        response = self._http.post(self.url, json=event, headers={"Idempotency-Key": event["id"]})
+        # Other 4xx answers will be the same on every retry; timeouts and rate limits may not
+        if 400 <= response.status_code < 500 and response.status_code not in (408, 425, 429):
+            raise RejectedEvent(f"HTTP {response.status_code} from {self.url}")
+        response.raise_for_status()
+
+
+def make_sink(spec=SOS_SINK):
+    if spec == "log":
+        return LogSink()
+    if spec == "stub":
+        return StubSink()
+    if spec.startswith(("http://", "https://")):
+        return WebhookSink(spec)
+    raise ValueError(f"unknown SOS sink: {spec}")
+
+
+class Dispatcher:
+    """Background worker delivering logged events to a sink, in order, with retries.
+
+    `notify()` wakes it right after an append; the poll interval only
+    matters for retries and for events left over from a previous run.
+    """
+
+    def __init__(self, log, sink, poll_interval=POLL_INTERVAL):
+        self.log = log
+        self.sink = sink
+        self.poll_interval = poll_interval
+        self.stats = {"delivered": 0, "failures": 0, "dead_letters": 0}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._attempts = {}
+        self.thread = threading.Thread(target=self._run, name="sos-dispatcher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        self.thread.join(timeout)
+
+    def _run(self):
+        delay = 0.0
+        while not self._stop.is_set():
+            self._wake.wait(delay or self.poll_interval)
+            self._wake.clear()
+            try:
+                delay = self._deliver_pending()
+            except Exception:
+                # Anything unexpected (a sqlite error, a bug) must not end SOS delivery for the process
+                logger.exception("SOS dispatcher error; retrying")
+                delay = self.poll_interval
+
+    def _deliver_pending(self):
+        """Deliver in seq order; on failure stop and return the backoff delay before retrying."""
+        for event in self.log.pending():
+            if self._stop.is_set():
+                return 0.0
+            seq = event["seq"]
+            attempts = self._attempts.get(seq, 0) + 1
+            try:
+                self.sink.send(event)
+            except RejectedEvent as error:
+                self.log.mark_dead(seq, attempts, error)
+                self._attempts.pop(seq, None)
+                self.stats["dead_letters"] += 1
+                logger.error("SOS event %s rejected by the sink, dead-lettered: %s", seq, error)
+                continue
+            except Exception as error:
+                self._attempts[seq] = attempts
+                self.stats["failures"] += 1
+                logger.warning("SOS event %s delivery failed (attempt %s): %s", seq, attempts, error)
+                backoff = RETRY_BASE * 2 ** min(attempts, RETRY_MAX_EXPONENT)
+                return random.uniform(0, min(RETRY_CAP, backoff))
+            self.log.mark_delivered(seq, attempts)
+            self._attempts.pop(seq, None)
+            self.stats["delivered"] += 1
+        return 0.0
+
+
+def benchmark(count=500, path=None):
+    """Append `count` events to a scratch log and report durable-write latency."""
+    import tempfile
+    path = path or os.path.join(tempfile.mkdtemp(), "sos_bench.sqlite")
+    log = EventLog(path, write_budget_ms=float("inf"))
+    incident = new_incident_id()
+    for i in range(count):
+        log.append(incident, "activated", reason="benchmark", coords=[28.6139, 77.2090], n=i)
+    result = {
+        "events": count,
+        "p50_ms": round(log.latency_ms(0.5), 3),
+        "p99_ms": round(log.latency_ms(0.99), 3),
+        "max_ms": round(max(log.latencies), 3),
+        "budget_ms": WRITE_BUDGET_MS,
+    }
+    log.close()
+    return result
+
+
+if __name__ == "__main__":
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,119 @@
+import base64
+import hashlib
+import os
+import re
+import sys
+from dataclasses import dataclass
+
+from tile_cache import ASSET_DIR
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STYLE_PATH = os.path.join(ROOT, "style.css")
+LOGO_PATH = os.path.join(ROOT, "logo.png")
+# Built files live under the map server's /static root, at /static/build/<name>.<hash>.<ext>
+BUILD_DIR = os.path.join(ASSET_DIR, "build")
+HASH_LENGTH = 10
+
+_COMMENTS = re.compile(r"/\*.*?\*/", re.S)
+_SPACES = re.compile(r"\s+")
+_PUNCTUATION = re.compile(r"\s*([{}:;,>])\s*")
+_LAST_SEMICOLON = re.compile(r";}")
+
+
+def minify_css(css):
+    """Strip comments and optional whitespace (enough for style.css: no selectors like "a :hover")."""
+    css = _COMMENTS.sub("", css)
+    css = _SPACES.sub(" ", css)
+    css = _PUNCTUATION.sub(r"\1", css)
+    return _LAST_SEMICOLON.sub("}", css).strip()
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+@dataclass(frozen=True)
+class BuiltAsset:
+    name: str  # path under the /static root, e.g. "build/style.1a2b3c4d5e.css"
+    data: bytes
+    content_type: str
+
+    def data_uri(self):
+        """Inline fallback for when there is no server to fetch the file from."""
+        return f"data:{self.content_type};base64,{base64.b64encode(self.data).decode()}"
+
+
+def publish(data, stem, ext, build_dir, content_type):
+    name = f"{stem}.{content_hash(data)}.{ext}"
+    target = os.path.join(build_dir, name)
+    if not os.path.exists(target):
+        os.makedirs(build_dir, exist_ok=True)
+        # Write-then-rename so a concurrent reader never sees half a file
+        partial = f"{target}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(data)
+        os.replace(partial, target)
+    return BuiltAsset(f"{os.path.basename(build_dir)}/{name}", data, content_type)
+
+
+def build_assets(build_dir=BUILD_DIR, style_path=STYLE_PATH, logo_path=LOGO_PATH):
+    """Minify style.css and copy logo.png into build_dir under content-hashed names.
+
+    Returns {"style": BuiltAsset, "logo": BuiltAsset or None}. A changed
+    source gets a new name, so the files can be cached forever.
+    """
+    with open(style_path, encoding="utf-8") as f:
+        css = minify_css(f.read()).encode("utf-8")
+    built = {"style": publish(css, "style", "css", build_dir, "text/css"), "logo": None}
+    if os.path.exists(logo_path):
+        with open(logo_path, "rb") as f:
+            built["logo"] = publish(f.read(), "logo", "png", build_dir, "image/png")
+    return built
+
+
+def rerun_payload(built, asset_base=None):
+    """The markup the app sends on every rerun for its styles and logo (navbar or hero).
+
+    With `asset_base` it is a <link> and an <img src> URL; without, the
+    minified CSS and the logo are inlined.
+    """
+    logo = built["logo"]
+    if asset_base:
+        style = f'<link rel="stylesheet" href="{asset_base}/{built["style"].name}">'
+        logo_src = f"{asset_base}/{logo.name}" if logo else ""
+    else:
+        style = f"<style>{built['style'].data.decode('utf-8')}</style>"
+        logo_src = logo.data_uri() if logo else ""
+    return style + f'<img src="{logo_src}" class="nav-logo" alt="SafeWander">'
+
+
+def benchmark(style_path=STYLE_PATH, logo_path=LOGO_PATH):
+    """Bytes per rerun for styles and logos: inline source (before), inline minified, and static URLs."""
+    import tempfile
+    with open(style_path, encoding="utf-8") as f:
+        source_css = f.read()
+    logo = ""
+    if os.path.exists(logo_path):
+        with open(logo_path, "rb") as f:
+            logo = base64.b64encode(f.read()).decode()
+    before = len(f"<style>{source_css}</style>".encode("utf-8")) + len(
+        f'<img src="data:image/png;base64,{logo}" class="nav-logo" alt="SafeWander">')
+    built = build_assets(tempfile.mkdtemp(), style_path, logo_path)
+    inline = len(rerun_payload(built).encode("utf-8"))
+    linked = len(rerun_payload(built, "http://localhost:8502/static").encode("utf-8"))
+    return {
+        "css_source_bytes": len(source_css.encode("utf-8")),
+        "css_minified_bytes": len(built["style"].data),
+        "before_bytes": before,
+        "inline_minified_bytes": inline,
+        "static_url_bytes": linked,
+        "saved_pct": round((1 - linked / before) * 100, 2),
+    }
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["build"]:
+        for key, asset in build_assets().items():
+            print(key, asset.name if asset else "-")
+    else:
+        print(benchmark())
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Caches, logs and the map server port are set before any app module reads them
+_scratch = tempfile.mkdtemp(prefix="safewander-tests-")
+os.environ.setdefault("SAFEWANDER_CACHE_DIR", _scratch)
+os.environ.setdefault("SAFEWANDER_SOS_LOG", os.path.join(_scratch, "sos_events.sqlite"))
+os.environ.setdefault("SAFEWANDER_PRICE_LOG", os.path.join(_scratch, "price_observations.sqlite"))
+os.environ.setdefault("SAFEWANDER_MAP_PORT", "0")
+os.environ.setdefault("SAFEWANDER_PHRASE_AUDIO", "0")
+os.environ.setdefault("SAFEWANDER_LOG_LEVEL", "WARNING")
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT
+from geo_index import GeoIndex, Place
+
+APP = os.path.join(ROOT, "app.py")
+
+
+def sos_app(country, city):
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.session_state.profile_complete = True
+    at.session_state.profile = {"name": "A", "gender": "Female", "age_range": "25-34",
+                                "destination_country": country, "destination_city": city}
+    at.run()
+    at.button(key="sos_main").click().run()
+    at.button(key="theft").click().run()
+    assert not at.exception, at.exception
+    return at
+
+
+def test_nearest_is_limited_to_country():
+    index = GeoIndex([
+        Place("police", "India", "Delhi", "India Gate Police Post", 28.6129, 77.2295),
+        Place("police", "Nepal", "Kathmandu", "Kathmandu Police", 27.7172, 85.3240),
+    ])
+    # From the Indian side of the border the Nepali station is closer
+    found = index.nearest("police", 27.6, 84.9, 1, country="India")
+    assert [place.name for _, place in found] == ["India Gate Police Post"]
+    assert index.nearest("police", 27.6, 84.9, 1, country="Thailand") == []
+
+
+def test_city_without_coordinates():
+    import app
+    assert app.city_coords("USA", "Miami") is None
+    assert app.city_coords("India", "Delhi") == [28.6139, 77.2090]
+
+
+@pytest.mark.parametrize("country, city, police", [
+    ("USA", "Miami", "911"), ("Brazil", "Salvador", "190"), ("India", "Agra", "100"),
+])
+def test_sos_without_coordinates_shows_emergency_number(country, city, police):
+    at = sos_app(country, city)
+    text = " ".join(m.value for m in at.markdown)
+    assert f"call police on <strong>{police}</strong>" in text
+    assert "India Gate" not in text and "Delhi" not in text
+    # No responder is picked by distance from a made-up point
+    assert at.session_state.sos_assignment is None
+    assert 'class="officer-card"' not in text
+
+
+def test_sos_with_coordinates_shows_station_in_country():
+    at = sos_app("India", "Delhi")
+    text = " ".join(m.value for m in at.markdown)
+    assert "Nearest station:" in text and "Nearest station: call" not in text
+    assert at.session_state.sos_assignment is not None
+
+
+def test_trip_destinations_need_coordinates():
+    import app
+    assert app.trip_destinations("USA", "Miami") == {}
+    options = app.trip_destinations("India", "Delhi")
+    assert "Mumbai" in options
+    places = app.get_geo_index().nearest("hospital", 28.6139, 77.2090, 2, country="India")
+    assert all(f"{place.name} (" in " ".join(options) for _, place in places)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from groq import APIConnectionError, APIStatusError
+
+import groq_pool
+from groq_pool import CircuitBreaker, PooledGroq
+
+
+def chunks(count, fail=False):
+    for i in range(count):
+        yield i
+    if fail:
+        raise APIConnectionError(request=httpx.Request("POST", "https://api.groq.com"))
+
+
+def pool_with(stream):
+    pool = PooledGroq("test-key", breaker=CircuitBreaker(failures=2), max_concurrent=1)
+    pool.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: stream())))
+    return pool
+
+
+def test_stream_failing_midway_trips_the_breaker():
+    pool = pool_with(lambda: chunks(3, fail=True))
+    for _ in range(2):
+        with pytest.raises(APIConnectionError):
+            list(pool.create(stream=True))
+    assert pool.breaker.state == "open"
+    # Each failed stream gave its concurrency slot back
+    assert pool._slots.acquire(blocking=False)
+
+
+def test_finished_stream_resets_failures():
+    pool = pool_with(lambda: chunks(3))
+    pool.breaker.record_failure()
+    stream = pool.create(stream=True)
+    assert pool.breaker.consecutive == 1
+    assert list(stream) == [0, 1, 2]
+    assert pool.breaker.consecutive == 0
+
+
+def test_cancelled_stream_is_not_a_failure():
+    pool = pool_with(lambda: chunks(3))
+    stream = iter(pool.create(stream=True))
+    next(stream)
+    stream.close()
+    assert pool.breaker.consecutive == 0
+    assert pool._slots.acquire(blocking=False)
+
+
+# Against a local stub of the Groq HTTP API: real httpx transport, pool limits and timeouts
+
+class StubGroq(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled connections can be counted
+    statuses = []  # status codes to answer with before succeeding
+    requests = []  # (client port, path)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append((self.client_address[1], self.path))
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status != 200:
+            self.reply(status, "application/json", json.dumps({"error": {"message": "stub"}}).encode())
+        elif body.get("stream"):
+            events = [{"choices": [{"index": 0, "delta": {"content": word}}]} for word in ("Stay", " safe")]
+            payload = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+            self.reply(200, "text/event-stream", payload.encode())
+        else:
+            message = {"role": "assistant", "content": "Stay safe"}
+            completion = {"id": "stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                          "choices": [{"index": 0, "message": message, "finish_reason": "stop"}]}
+            self.reply(200, "application/json", json.dumps(completion).encode())
+
+    def reply(self, status, content_type, payload):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(groq_pool, "BACKOFF_BASE", 0)
+    StubGroq.statuses, StubGroq.requests = [], []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGroq)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+MESSAGES = [{"role": "user", "content": "Is Delhi safe?"}]
+
+
+def test_calls_reuse_one_pooled_connection(stub):
+    pool = PooledGroq("test-key", base_url=stub)
+    for _ in range(3):
+        result = pool.create(model="stub-model", messages=MESSAGES)
+        assert result.choices[0].message.content == "Stay safe"
+    pool.close()
+    assert {path for _, path in StubGroq.requests} == {"/openai/v1/chat/completions"}
+    assert len({port for port, _ in StubGroq.requests}) == 1
+
+
+def test_retries_count_once_toward_the_breaker(stub):
+    pool = PooledGroq("test-key", base_url=stub, max_retries=2, breaker=CircuitBreaker(failures=2))
+    StubGroq.statuses = [500, 429]
+    pool.create(model="stub-model", messages=MESSAGES)
+    assert pool.breaker.consecutive == 0
+    StubGroq.statuses = [503] * 3
+    with pytest.raises(APIStatusError):
+        pool.create(model="stub-model", messages=MESSAGES)
+    assert len(StubGroq.requests) == 6
+    assert (pool.breaker.consecutive, pool.breaker.state) == (1, "closed")
+    pool.close()
+
+
+def test_client_errors_are_not_retried(stub):
+    pool = PooledGroq("test-key", base_url=stub)
+    StubGroq.statuses = [400]
+    with pytest.raises(APIStatusError):
+        pool.create(model="stub-model", messages=MESSAGES)
+    assert len(StubGroq.requests) == 1
+    assert pool.breaker.consecutive == 0
+    pool.close()
+
+
+def test_stream_over_http(stub):
+    pool = PooledGroq("test-key", base_url=stub, max_concurrent=1)
+    words = [chunk.choices[0].delta.content for chunk in pool.create(model="stub-model", messages=MESSAGES, stream=True)]
+    assert words == ["Stay", " safe"]
+    assert pool._slots.acquire(blocking=False)
+    pool.close()
+
+
+def test_async_create(stub):
+    async def ask(pool):
+        StubGroq.statuses = [502]
+        results = await asyncio.gather(*(pool.acreate(model="stub-model", messages=MESSAGES) for _ in range(3)))
+        stream = await pool.acreate(model="stub-model", messages=MESSAGES, stream=True)
+        words = [chunk.choices[0].delta.content async for chunk in stream]
+        await pool.aclose()
+        return [r.choices[0].message.content for r in results], words
+
+    pool = PooledGroq("test-key", base_url=stub, max_concurrent=2)
+    # Each event loop gets its own client, so the pool works from more than one asyncio.run()
+    for _ in range(2):
+        assert asyncio.run(ask(pool)) == (["Stay safe"] * 3, ["Stay", " safe"])
+    assert pool.breaker.consecutive == 0
+    pool.close()
@@ -0,0 +1,57 @@
+import os
+
+import httpx
+
+import app
+from map_server import MapServer
+from tile_cache import TileCache
+
+
+def test_server_is_private_without_public_url():
+    server = MapServer("127.0.0.1", 0, None)
+    try:
+        assert not server.public
+        assert server.public_url.startswith("http://localhost:")
+    finally:
+        server.close()
+    server = MapServer("127.0.0.1", 0, "https://maps.example.org/")
+    try:
+        assert server.public
+        assert server.tile_url() == "https://maps.example.org/tiles/{z}/{x}/{y}.png"
+    finally:
+        server.close()
+
+
+def test_map_uses_online_tiles_and_cdn_by_default():
+    assert app.get_map_server() is not None
+    html = app.build_map_html("India", "Delhi", app.places_version())
+    assert "tile.openstreetmap.org" in html
+    assert f"{app.CDN_BASE}/leaflet/1.9.4/leaflet.js" in html
+    assert "localhost" not in html and "127.0.0.1" not in html
+
+
+def test_styles_and_logo_are_inlined_by_default():
+    assert app.static_base() is None
+    assert app.logo_src().startswith("data:image/png;base64,")
+
+
+def test_tile_route_never_fetches_upstream(monkeypatch):
+    tiles = TileCache(":memory:")
+    fetched = []
+    monkeypatch.setattr(tiles, "fetch", lambda *zxy: fetched.append(zxy) or b"upstream")
+    tiles.put(12, 2925, 1711, b"cached")
+    server = MapServer("127.0.0.1", 0, None, tile_cache=tiles)
+    try:
+        assert httpx.get(server.tile_url().format(z=12, x=2925, y=1711)).content == b"cached"
+        assert httpx.get(server.tile_url().format(z=19, x=1, y=1)).status_code == 404
+    finally:
+        server.close()
+        tiles.close()
+    assert fetched == []
+
+
+def test_static_assets_are_rebuilt_after_the_build_dir_is_cleaned():
+    style = app.get_static_assets()["style"]
+    os.remove(os.path.join(os.path.dirname(app.BUILD_DIR), style.name))
+    assert app.get_static_assets()["style"].name == style.name
+    assert os.path.exists(os.path.join(os.path.dirname(app.BUILD_DIR), style.name))
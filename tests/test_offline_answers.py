@@ -0,0 +1,63 @@
+import pytest
+
+from knowledge_base import load_index
+from offline_answers import FAST_PATH_CONFIDENCE, INTENT_KEYWORDS, INTENT_WORDS, OfflineAnswerEngine, classify
+from semantic_cache import tokenize
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return OfflineAnswerEngine(load_index())
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("What is the women helpline?", "emergency"),
+    ("What number do I dial for an ambulance?", "emergency"),
+    ("I was injured in an accident", "emergency"),
+    ("Street harassment", "harassment"),
+    ("I was mugged", "harassment"),
+    ("Someone is following me", "harassment"),
+    ("My phone was stolen by a pickpocket", "harassment"),
+    ("The taxi driver overcharged me", "scam"),
+    ("Is the gem shop a scam?", "scam"),
+    ("Are rickshaw touts cheating tourists?", "scam"),
+    ("Is street food safe to eat?", "food"),
+    ("Which cuisine is vegetarian?", "food"),
+    ("Which areas should I avoid at night?", "area"),
+    ("Is the neighbourhood safe for walking late?", "area"),
+])
+def test_classify(question, intent):
+    found, confidence = classify(question)
+    assert found == intent
+    assert confidence > 0
+
+
+@pytest.mark.parametrize("question, heading", [
+    ("I was mugged", "**Street robbery attempt - what to do now:**"),
+    ("Someone groped me on the bus", "**Unwanted touching/harassment - what to do now:**"),
+    ("Someone is following me", "**Being followed - what to do now:**"),
+    ("What is the women helpline?", "**Emergency numbers in India:**"),
+    ("The taxi driver overcharged me", "**Auto rickshaw overcharging (Delhi)**"),
+])
+def test_fast_path_answers_fit_the_question(engine, question, heading):
+    answer = engine.answer("India", "Delhi", question)
+    assert answer.confidence >= FAST_PATH_CONFIDENCE
+    assert answer.text.startswith(heading)
+
+
+def test_unmatched_entries_go_to_the_llm(engine):
+    # "scammed" picks the scam intent, but no scam entry shares a word with the question
+    answer = engine.answer("India", "Delhi", "I got scammed")
+    assert (answer.intent, answer.confidence) == ("general", 0.0)
+
+
+def test_every_keyword_can_match():
+    for intent, words in INTENT_WORDS.items():
+        for word in words:
+            terms = tokenize(word)
+            assert terms, f"{word!r} is a stopword"
+            assert all(term in INTENT_KEYWORDS[intent] for term in terms)
+
+
+def test_no_keywords():
+    assert classify("Hello there") == (None, 0.0)
@@ -0,0 +1,30 @@
+import os
+
+import app
+
+
+def test_phrases_use_speech_synthesis_without_public_asset_base():
+    phrases = app.get_phrase_index().get(range(2))
+    assert app.static_base() is None
+    assert app.phrase_clips(phrases, None) == (None, None)
+    html = app.build_phrase_bundle("test", tuple(p.id for p in phrases), (None, None), None)
+    assert "data-audio" not in html and "localhost" not in html
+    assert all(f'data-lang="{p.lang}"' in html for p in phrases)
+
+
+def test_clip_urls_use_public_asset_base():
+    phrases = app.get_phrase_index().get(range(1))
+    html = app.build_phrase_bundle("test", (phrases[0].id,), ("phrases/abc.mp3",), "https://maps.example.org/static")
+    assert 'data-audio="https://maps.example.org/static/phrases/abc.mp3"' in html
+
+
+def test_bundle_is_written_again_after_the_build_dir_is_cleaned(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "BUILD_DIR", str(tmp_path / "build"))
+    phrases = app.get_phrase_index().get(range(1))
+    html = app.build_phrase_bundle("test", (phrases[0].id,), (None,), "https://maps.example.org/static")
+    name = app.publish_phrase_bundle(html, phrases[0].lang)
+    target = tmp_path / name
+    assert target.read_text(encoding="utf-8") == html
+    os.remove(target)
+    assert app.publish_phrase_bundle(html, phrases[0].lang) == name
+    assert target.exists()
@@ -0,0 +1,43 @@
+import pytest
+
+from price_check import load_price_index
+from price_parser import parse_query
+
+
+@pytest.fixture(scope="module")
+def index():
+    return load_price_index()
+
+
+@pytest.mark.parametrize("query", ["SIM card 500", "500", "souvenir magnet 300"])
+def test_bare_amount_is_unknown(index, query):
+    check = index.check(query, "India", "Delhi")
+    assert (check.item, check.verdict, check.amount) == (None, "unknown", 500 if "500" in query else 300)
+    assert check.observed_value is None
+
+
+def test_rides_are_still_judged(index):
+    assert index.check("auto wants 900", "India", "Delhi").verdict == "scam"
+
+
+@pytest.mark.parametrize("query, people", [
+    ("dinner for two 900", 2), ("dinner for 2 900", 2), ("dinner 900 for two", 2), ("dinner for two people 900", 2), ("street food 80 for 2 people", 2),
+])
+def test_party_size_in_words(index, query, people):
+    parsed = parse_query(query, "India")
+    assert parsed.quantities.get("people") == people
+    check = index.check(query, "India", "Delhi")
+    assert check.unit_amount == check.amount / people
+
+
+def test_dinner_for_two_is_not_a_scam(index):
+    assert index.check("dinner for two 900", "India", "Delhi").verdict != "scam"
+
+
+def test_lone_for_number_is_a_price():
+    parsed = parse_query("taxi for 15", "USA")
+    assert parsed.amount == 15 and "people" not in parsed.quantities
+
+
+def test_space_grouped_thousands_without_party():
+    assert parse_query("hotel 2 900", "India").amount == 2900
@@ -0,0 +1,47 @@
+import time
+
+from price_check import load_price_index
+from price_observations import MIN_OBSERVATIONS, SESSION_DAILY_CAP, Observation, ObservationStore, Quantiles
+
+
+def hotel_report(value, session, at):
+    return Observation("India", "Delhi", "hotel", "accommodation", value, "INR", value, at, session)
+
+
+def test_one_session_cannot_fill_the_window(tmp_path):
+    store = ObservationStore(str(tmp_path / "prices.sqlite")).start()
+    now = time.time()
+    for i in range(MIN_OBSERVATIONS):
+        store.record(hotel_report(3000, "attacker", now + i))
+    store.flush()
+    assert store.quantiles("India", "Delhi", "hotel", now) is None
+    assert store.stats["capped"] == MIN_OBSERVATIONS - SESSION_DAILY_CAP
+    assert store.stats["recorded"] == MIN_OBSERVATIONS
+    store.stop()
+
+    # The cap holds when the window is replayed from disk
+    replayed = ObservationStore(str(tmp_path / "prices.sqlite")).start()
+    replayed.ready.wait(5)
+    assert replayed.stats["capped"] == MIN_OBSERVATIONS - SESSION_DAILY_CAP
+    replayed.stop()
+
+
+def test_many_sessions_are_counted(tmp_path):
+    store = ObservationStore(str(tmp_path / "prices.sqlite")).start()
+    now = time.time()
+    for i in range(MIN_OBSERVATIONS):
+        store.record(hotel_report(1500, f"s{i}", now + i))
+    store.flush()
+    assert store.quantiles("India", "Delhi", "hotel", now).count == MIN_OBSERVATIONS
+    store.stop()
+
+
+def test_static_reference_stays_the_ceiling():
+    check = load_price_index().check("hotel 3000", "India", "Delhi")
+    assert check.verdict == "high"
+    live = check.with_quantiles(Quantiles(MIN_OBSERVATIONS, 3000, 3000, 3000))
+    assert live.verdict == "high"
+    assert live.high == check.high and live.low <= live.high
+    # Reports can still narrow the range
+    tighter = load_price_index().check("hotel 1500", "India", "Delhi").with_quantiles(Quantiles(40, 700, 1000, 1200))
+    assert (tighter.low, tighter.high, tighter.verdict) == (700, 1200, "high")
@@ -0,0 +1,29 @@
+import pytest
+
+from price_check import load_price_index
+from price_parser import parse_query
+
+
+@pytest.mark.parametrize("query, amount", [
+    ("hotel ₹1,50,000", 150000),
+    ("hotel 2,50,000 rupees", 250000),
+    ("auto 1,20,000", 120000),
+    ("taxi 12,34,567", 1234567),
+    ("hotel 1,500", 1500),
+    ("hotel 1,234,567", 1234567),
+    ("tea 12.50", 12.5),
+    ("dinner 1.5 lakh", 150000),
+])
+def test_indian_grouping(query, amount):
+    assert parse_query(query, "India").amount == amount
+
+
+def test_lakh_grouping_is_only_read_in_india():
+    assert parse_query("hotel 1,50,000", "USA").amount != 150000
+    assert parse_query("R$ 1.200,50", "Brazil").amount == 1200.5
+
+
+def test_lakh_quote_is_not_fair():
+    check = load_price_index().check("hotel ₹1,50,000", "India", "Delhi")
+    assert check.amount == 150000
+    assert check.verdict == "scam"
@@ -0,0 +1,44 @@
+import time
+
+from responders import ResponderIndex, Responder
+from sos_events import EventLog, new_incident_id
+
+DELHI = (28.6139, 77.2090)
+
+
+def responders():
+    return [Responder("near", "India", "Delhi", "Near", "D1", "Female", 28.62, 77.21),
+            Responder("far", "India", "Delhi", "Far", "D2", "Female", 28.70, 77.30)]
+
+
+def assigned(log, incident, assignment):
+    log.append(incident, "assigned", responder=assignment.as_dict() if assignment else None)
+
+
+def test_open_assignments_survive_a_restart():
+    log, index = EventLog(":memory:"), ResponderIndex(responders())
+    held, cancelled = new_incident_id(), new_incident_id()
+    assigned(log, held, index.assign("India", *DELHI))
+    assigned(log, cancelled, index.assign("India", *DELHI))
+    log.append(cancelled, "cancelled")
+
+    restarted = ResponderIndex(responders())
+    restarted.restore(log.active_assignments(time.time() - restarted.lease))
+    assert restarted.busy == 1
+    assert restarted.assign("India", *DELHI).responder.id == "far"
+
+
+def test_redispatch_holds_only_the_latest_responder():
+    log, index = EventLog(":memory:"), ResponderIndex(responders())
+    incident = new_incident_id()
+    first = index.assign("India", *DELHI)
+    assigned(log, incident, first)
+    index.release(first.responder.id)
+    assigned(log, incident, index.assign("India", 28.70, 77.30))
+    assert log.active_assignments(0) == {"far": log.incident(incident)[-1]["created"]}
+
+
+def test_expired_leases_are_not_restored():
+    index = ResponderIndex(responders(), lease=60)
+    index.restore({"near": time.time() - 120, "unknown": time.time()})
+    assert index.busy == 0
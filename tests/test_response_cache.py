@@ -0,0 +1,38 @@
+import time
+
+import response_cache
+from response_cache import ResponseCache
+
+
+def age(cache, key, seconds):
+    cache._db.execute("UPDATE responses SET created = ? WHERE key = ?", (time.time() - seconds, key))
+    cache._memory.pop(key, None)
+
+
+def rows(cache):
+    return cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def test_expired_rows_are_purged_on_open(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    cache = ResponseCache(path, ttl=60)
+    cache.put("old", "stale answer")
+    cache.put("new", "fresh answer")
+    age(cache, "old", 120)
+    cache.close()
+    cache = ResponseCache(path, ttl=60)
+    assert rows(cache) == 1
+    assert cache.get("new") == "fresh answer"
+    cache.close()
+
+
+def test_expired_rows_are_purged_while_storing(monkeypatch):
+    monkeypatch.setattr(response_cache, "PURGE_EVERY", 4)
+    cache = ResponseCache(":memory:", ttl=60)
+    for n in range(3):
+        cache.put(f"old{n}", "stale answer")
+        age(cache, f"old{n}", 120)
+    assert rows(cache) == 3
+    cache.put("new", "fresh answer")
+    assert rows(cache) == 1
+    assert cache.stats["expired"] == 3
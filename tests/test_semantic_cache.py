@@ -0,0 +1,26 @@
+from semantic_cache import INITIAL_ROWS, SemanticCache, _ScopeIndex, embed
+
+
+def test_scope_matrix_grows_lazily_then_wraps():
+    index = _ScopeIndex(64, 40)
+    assert index.matrix.shape == (INITIAL_ROWS, 64)
+    for i in range(INITIAL_ROWS + 1):
+        index.add(embed(f"question {i}", 64), i)
+    assert index.matrix.shape == (2 * INITIAL_ROWS, 64)
+    for i in range(INITIAL_ROWS + 1, 45):
+        index.add(embed(f"question {i}", 64), i)
+    assert index.matrix.shape == (40, 64) and index.size == 40
+    # The five oldest were overwritten
+    assert sorted(index.answers) == list(range(5, 45))
+    assert index.best(embed("question 44", 64))[0] == 44
+
+
+def test_scopes_are_bounded_least_recently_used_first():
+    cache = SemanticCache(max_scopes=2)
+    cache.add("kb-v1", "is street food safe", "old")
+    cache.add("kb-v2", "is street food safe", "a")
+    cache.lookup("kb-v1", "is street food safe")
+    cache.add("kb-v3", "is street food safe", "b")
+    assert list(cache._scopes) == ["kb-v1", "kb-v3"]
+    assert cache.lookup("kb-v2", "is street food safe") == (None, 0.0)
+    assert cache.lookup("kb-v1", "is street food safe")[0] == "old"
@@ -0,0 +1,72 @@
+import httpx
+import pytest
+
+from sos_events import RETRY_CAP, Dispatcher, EventLog, RejectedEvent, StubSink, WebhookSink, new_incident_id
+
+
+class RejectingSink(StubSink):
+    """Rejects events of one kind for good and accepts the rest."""
+
+    def __init__(self, rejected_kind):
+        super().__init__()
+        self.rejected_kind = rejected_kind
+
+    def send(self, event):
+        if event["kind"] == self.rejected_kind:
+            raise RejectedEvent("HTTP 422")
+        super().send(event)
+
+
+@pytest.mark.parametrize("status, error", [(400, RejectedEvent), (404, RejectedEvent), (429, httpx.HTTPStatusError),
+                                           (503, httpx.HTTPStatusError)])
+def test_webhook_only_rejects_client_errors(status, error):
+    sink = WebhookSink("https://sos.example.org/hook")
+    sink._http = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(status)))
+    with pytest.raises(error):
+        sink.send({"id": "e1", "kind": "activated"})
+
+
+def test_backoff_does_not_overflow_after_long_outage():
+    log = EventLog(":memory:")
+    event = log.append(new_incident_id(), "activated")
+    dispatcher = Dispatcher(log, StubSink(failures=1))
+    dispatcher._attempts[event["seq"]] = 5000
+    assert 0 <= dispatcher._deliver_pending() <= RETRY_CAP
+    assert dispatcher._deliver_pending() == 0.0
+    assert [e["seq"] for e in dispatcher.sink.events] == [event["seq"]]
+
+
+def test_rejected_event_is_dead_lettered_and_later_events_go_out():
+    log = EventLog(":memory:")
+    incident = new_incident_id()
+    bad = log.append(incident, "malformed")
+    good = log.append(incident, "activated")
+    dispatcher = Dispatcher(log, RejectingSink("malformed"))
+    assert dispatcher._deliver_pending() == 0.0
+    assert [e["seq"] for e in dispatcher.sink.events] == [good["seq"]]
+    assert [e["seq"] for e in log.dead_letters()] == [bad["seq"]]
+    assert log.pending() == []
+    assert dispatcher.stats["dead_letters"] == 1
+
+
+def test_dispatcher_survives_errors():
+    log = EventLog(":memory:")
+    pending = log.pending
+    calls = []
+
+    def flaky_pending(limit=100):
+        calls.append(limit)
+        if len(calls) == 1:
+            raise OverflowError("boom")
+        return pending(limit)
+
+    log.pending = flaky_pending
+    sink = StubSink()
+    dispatcher = Dispatcher(log, sink, poll_interval=0.01).start()
+    try:
+        log.append(new_incident_id(), "activated")
+        dispatcher.notify()
+        assert sink.received.wait(5)
+        assert dispatcher.thread.is_alive()
+    finally:
+        dispatcher.stop()
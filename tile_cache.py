@@ -0,0 +1,198 @@
+import logging
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import httpx
+
+from response_cache import CACHE_DIR
+
+logger = logging.getLogger("safewander.tiles")
+
+TILE_DB_PATH = os.getenv("SAFEWANDER_TILE_DB", os.path.join(CACHE_DIR, "tiles.mbtiles"))
+# Use a provider whose terms allow caching for bulk seeding (tile.openstreetmap.org does not)
+UPSTREAM_URL = os.getenv("SAFEWANDER_TILE_UPSTREAM", "https://tile.openstreetmap.org/{z}/{x}/{y}.png")
+USER_AGENT = "SafeWander/1.0 (offline safety map)"
+FETCH_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+# Cached tiles older than this are refreshed when we are online
+TILE_MAX_AGE = 30 * 24 * 3600
+
+SEED_ZOOMS = range(11, 16)
+SEED_RADIUS_KM = 3.0
+SEED_DELAY = 0.25
+
+# Pinned CDN files mirrored to ASSET_DIR so the map page loads without cdnjs
+CDN_BASE = "https://cdnjs.cloudflare.com/ajax/libs"
+ASSET_DIR = os.path.join(CACHE_DIR, "assets")
+ASSETS = (
+    "leaflet/1.9.4/leaflet.js",
+    "leaflet/1.9.4/leaflet.css",
+    "leaflet/1.9.4/images/marker-icon.png",
+    "leaflet/1.9.4/images/marker-icon-2x.png",
+    "leaflet/1.9.4/images/marker-shadow.png",
+    "font-awesome/6.4.0/css/all.min.css",
+    "font-awesome/6.4.0/webfonts/fa-solid-900.woff2",
+    "font-awesome/6.4.0/webfonts/fa-regular-400.woff2",
+    "font-awesome/6.4.0/webfonts/fa-brands-400.woff2",
+)
+
+
+def tile_range(lat, lng, zoom, radius_km):
+    """Inclusive (x0, x1, y0, y1) slippy-map tile range covering radius_km around a point."""
+    n = 2 ** zoom
+    dlat = math.degrees(radius_km / 6371.0)
+    dlng = dlat / max(math.cos(math.radians(lat)), 0.01)
+
+    def to_tile(la, ln):
+        la = max(min(la, 85.05112878), -85.05112878)
+        x = int((ln + 180.0) / 360.0 * n)
+        y = int((1 - math.asinh(math.tan(math.radians(la))) / math.pi) / 2 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    x0, y0 = to_tile(lat + dlat, lng - dlng)
+    x1, y1 = to_tile(lat - dlat, lng + dlng)
+    return x0, x1, y0, y1
+
+
+class TileCache:
+    """Raster tiles in an MBTiles (SQLite) file, filled from an upstream server by `seed`.
+
+    Reads never touch the network when the tile is cached, so the map keeps
+    working offline for every seeded area. The map server reads with
+    fetch=False; only `seed` (rate limited, bounded areas) downloads tiles.
+    """
+
+    def __init__(self, path=TILE_DB_PATH, upstream=UPSTREAM_URL, max_age=TILE_MAX_AGE):
+        self.path = path
+        self.upstream = upstream
+        self.max_age = max_age
+        self.stats = {"hits": 0, "fetched": 0, "stale": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._http = httpx.Client(timeout=FETCH_TIMEOUT, headers={"User-Agent": USER_AGENT})
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tiles ("
+            " zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB,"
+            " fetched REAL NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (zoom_level, tile_column, tile_row))"
+        )
+        self._db.executemany(
+            "INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)",
+            (("name", "SafeWander offline map"), ("format", "png"), ("type", "baselayer"),
+             ("attribution", "© OpenStreetMap contributors")),
+        )
+
+    def get(self, z, x, y):
+        """(tile bytes, fetched timestamp) or (None, None). MBTiles rows are TMS, so y is flipped."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT tile_data, fetched FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (z, x, 2 ** z - 1 - y),
+            ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def put(self, z, x, y, data):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data, fetched) VALUES (?, ?, ?, ?, ?)",
+                (z, x, 2 ** z - 1 - y, data, time.time()),
+            )
+
+    def tile(self, z, x, y, fetch=True):
+        """Cached tile bytes, fetching (and storing) it when missing or stale; None if unavailable."""
+        if not (0 <= z <= 19 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return None
+        data, fetched = self.get(z, x, y)
+        if data is not None and time.time() - fetched < self.max_age:
+            self.stats["hits"] += 1
+            return data
+        fresh = self.fetch(z, x, y) if fetch else None
+        if fresh is not None:
+            self.put(z, x, y, fresh)
+            self.stats["fetched"] += 1
+            return fresh
+        # Offline: an old tile is much better than a blank square
+        self.stats["stale" if data is not None else "misses"] += 1
+        return data
+
+    def fetch(self, z, x, y):
+        if not self.upstream:
+            return None
+        try:
+            response = self._http.get(self.upstream.format(z=z, x=x, y=y))
+        except httpx.HTTPError as error:
+            logger.info("tile %s/%s/%s unavailable: %s", z, x, y, error)
+            return None
+        if response.status_code != 200:
+            logger.info("tile %s/%s/%s: HTTP %s", z, x, y, response.status_code)
+            return None
+        return response.content
+
+    def seed(self, centers, zooms=SEED_ZOOMS, radius_km=SEED_RADIUS_KM, delay=SEED_DELAY):
+        """Download every missing tile within radius_km of each (lat, lng). Returns tiles fetched."""
+        fetched = 0
+        for lat, lng in centers:
+            for z in zooms:
+                x0, x1, y0, y1 = tile_range(lat, lng, z, radius_km)
+                for x in range(x0, x1 + 1):
+                    for y in range(y0, y1 + 1):
+                        if self.get(z, x, y)[0] is not None:
+                            continue
+                        data = self.fetch(z, x, y)
+                        if data is None:
+                            continue
+                        self.put(z, x, y, data)
+                        fetched += 1
+                        # Stay well inside tile servers' fair-use limits
+                        time.sleep(delay)
+        logger.info("seeded %s tiles", fetched)
+        return fetched
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM tiles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+        self._http.close()
+
+
+def assets_vendored(asset_dir=ASSET_DIR):
+    return all(os.path.exists(os.path.join(asset_dir, name)) for name in ASSETS)
+
+
+def vendor_assets(asset_dir=ASSET_DIR, cdn_base=CDN_BASE):
+    """Mirror the pinned Leaflet and Font Awesome files into asset_dir (keeping CDN paths)."""
+    with httpx.Client(timeout=FETCH_TIMEOUT, headers={"User-Agent": USER_AGENT}, follow_redirects=True) as http:
+        for name in ASSETS:
+            target = os.path.join(asset_dir, name)
+            if os.path.exists(target):
+                continue
+            response = http.get(f"{cdn_base}/{name}")
+            response.raise_for_status()
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(response.content)
+            logger.info("vendored %s", name)
+
+
+if __name__ == "__main__":
+    # python tile_cache.py vendor | python tile_cache.py seed LAT,LNG [LAT,LNG ...]
+    logging.basicConfig(level=logging.INFO)
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("", [])
+    if command == "vendor":
+        vendor_assets()
+    elif command == "seed" and args:
+        cache = TileCache()
+        cache.seed([tuple(float(v) for v in arg.split(",")) for arg in args])
+        print(f"{len(cache)} tiles in {cache.path}")
+    else:
+        print("usage: tile_cache.py vendor | seed LAT,LNG [LAT,LNG ...]")